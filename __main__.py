@@ -1,5 +1,8 @@
-from src.app import Application
+import time
 
 if __name__ == '__main__':
-    app = Application()
+    started = time.perf_counter()
+    # imported after the clock starts so the import time counts towards the startup times
+    from src.app import Application
+    app = Application(started)
     app.run()
\ No newline at end of file
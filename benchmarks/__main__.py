@@ -0,0 +1,194 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from src.config import Config
+from src.telescopes.telescope_mock import TelescopeMock
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.utils.profiler import Profiler
+from src.utils.resource_loader import ResourceLoader
+from benchmarks.multi_telescope_benchmark import CountingPublisher
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader, OfflineCelestialDataLoader
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+PAN = 0.01
+TILT = 0.005
+ZOOM = 0.1
+
+
+def script():
+    """
+    One cycle of scripted commands: pan, tilt, zoom in, spot, zoom out, idle. Every step is one frame.
+    """
+    steps = [("move", (PAN, 0, 0))] * 30 + [("move", (0, TILT, 0))] * 10
+    steps += [("zoom", (0, 0, ZOOM))] * 15
+    steps += [("spot", (["moon", "venus"],)), ("spot", ([],))]
+    steps += [("zoom", (0, 0, -ZOOM))] * 15 + [("move", (0, -TILT, 0))] * 10
+    steps += [("idle", ())] * 8
+    return steps
+
+
+class Scene:
+    def __init__(self, config, resource_loader, loader):
+        self.profiler = Profiler()
+        self.telescope = TelescopeMock(config, resource_loader, loader, self.profiler)
+        self.assistant = TelescopeAssistant(self.telescope, celestial_data_loader=loader, profiler=self.profiler)
+        self.publisher = CountingPublisher()
+        self.start = self.telescope.get_orientation()
+
+    def reset(self):
+        self.telescope.set_zoom(1)
+        self.telescope.set_orientation(*self.start)
+        self.assistant.set_interesting([])
+        self.publisher.feed_frame(self.assistant.get_frame())
+
+    def step(self, command, args):
+        # what a TelescopeSession does for the command, with the render done in line instead of on a render thread
+        if command == "spot":
+            self.assistant.set_interesting(*args)
+            self.telescope.move(0, 0, 0)
+        elif command != "idle":
+            self.telescope.move(*args)
+        self.publisher.feed_frame(self.assistant.get_frame())
+
+
+def timed(scene, steps, repeats):
+    scene.reset()
+    times = {command: [] for command, _ in steps}
+    frame_times = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for command, args in steps:
+            step_start = time.perf_counter()
+            scene.step(command, args)
+            elapsed = time.perf_counter() - step_start
+            times[command].append(elapsed)
+            frame_times.append(elapsed)
+    return time.perf_counter() - start, frame_times, times
+
+
+def allocated(scene, steps):
+    """
+    :return: Mean bytes allocated per frame over one script cycle, traced separately as tracing slows frames down.
+    """
+    scene.reset()
+    tracemalloc.start()
+    total = 0
+    for command, args in steps:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        scene.step(command, args)
+        total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return total / len(steps)
+
+
+def percentiles(samples):
+    return {"p50": float(np.percentile(samples, 50)), "p99": float(np.percentile(samples, 99)), "count": len(samples)}
+
+
+def run(config, resource_loader, loader, resolution, repeats):
+    width, height = RESOLUTIONS[resolution]
+    config = dict(config, TELESCOPE_STREAM_WIDTH=width, TELESCOPE_STREAM_HEIGHT=height)
+    scene = Scene(config, resource_loader, loader)
+    steps = script()
+    elapsed, frame_times, times = timed(scene, steps, repeats)
+    stages = {stage: histogram.percentile(50) for stage, histogram in sorted(scene.profiler.stages.items())}
+    return {
+        "resolution": resolution,
+        "width": width,
+        "height": height,
+        "objects": len(scene.telescope.sky),
+        "frames": len(frame_times),
+        "fps": len(frame_times) / elapsed,
+        "frame_time": percentiles(frame_times),
+        "commands": {command: percentiles(samples) for command, samples in times.items()},
+        "allocated_per_frame": allocated(scene, steps),
+        "stage_p50": stages,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    previous = {(result["resolution"], result["objects"]): result for result in baseline["results"]}
+    print(f"against {baseline_path} ({baseline['meta'].get('commit')}):")
+    for result in results:
+        before = previous.get((result["resolution"], result["objects"]))
+        if before is None:
+            continue
+        fps = result["fps"] / before["fps"] - 1
+        p99 = result["frame_time"]["p99"] / before["frame_time"]["p99"] - 1
+        print(f"{result['resolution']:>6} {result['objects']:6d} objects: fps {fps:+.1%}, p99 frame time {p99:+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Headless render benchmark on a deterministic sky, results saved as JSON.")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--objects", nargs="+", type=int, default=[300, 3000], help="Synthetic catalogue sizes.")
+    parser.add_argument("--catalogue", help="Offline star catalogue to use instead of the synthetic ones.")
+    parser.add_argument("--repeats", type=int, default=2, help="Script cycles timed per configuration.")
+    parser.add_argument("--output", help="JSON file, bench-<commit>.json by default.")
+    parser.add_argument("--baseline", help="Earlier JSON output to compare with.")
+    args = parser.parse_args()
+
+    config = Config()
+    config["SKY_ATLAS"] = False
+    coords = (config["LATITUDE"], config["LONGITUDE"])
+    if args.catalogue:
+        loaders = [OfflineCelestialDataLoader(coords, args.catalogue)]
+    else:
+        loaders = [SyntheticCelestialDataLoader(coords, count) for count in args.objects]
+    resource_loader = ResourceLoader(2 * TelescopeMock.STAR_SIZE)
+
+    results = []
+    for loader in loaders:
+        for resolution in args.resolutions:
+            result = run(config, resource_loader, loader, resolution, args.repeats)
+            results.append(result)
+            commands = ", ".join(f"{command} {stats['p50'] * 1000:.2f}" for command, stats in result["commands"].items())
+            print(f"{resolution:>6} {result['objects']:6d} objects: {result['fps']:6.1f} fps, "
+                  f"frame p50 {result['frame_time']['p50'] * 1000:.2f} ms p99 {result['frame_time']['p99'] * 1000:.2f} ms, "
+                  f"{result['allocated_per_frame'] / 2**10:.0f} KiB/frame, per command ms: {commands}")
+
+    commit = git_commit()
+    output = args.output or f"bench-{commit or 'local'}.json"
+    meta = {
+        "commit": commit,
+        "time": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "repeats": args.repeats,
+        "catalogue": args.catalogue,
+    }
+    with open(output, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2)
+    print(f"saved to {output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
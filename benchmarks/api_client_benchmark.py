@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+from src.utils.api import ApiClient, Location, Specifications, TelescopeData, TelescopeResponse, DeleteResponse
+
+
+class StubTelescopeServer:
+    """
+    In-process stand-in for the telescope API with injectable latency, 503 answers, non-JSON errors and hangs.
+    statuses lists error statuses the next requests are answered with, in order.
+    """
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.telescopes = {}
+        self.updates = {}
+        self.requests = 0
+        self.broken = False
+        self.statuses = []
+        self.hang = 0.0
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/telescopes/", self.post)
+        app.router.add_get("/telescopes/{tid}", self.get)
+        app.router.add_put("/telescopes/{tid}", self.put)
+        app.router.add_delete("/telescopes/{tid}", self.delete)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def answer(self):
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.hang)
+        if self.statuses:
+            return web.Response(status=self.statuses.pop(0), text="scripted error")
+        if self.broken:
+            return web.Response(status=500, text="<html>internal error</html>")
+        if self.random.random() < self.failure_rate:
+            return web.Response(status=503, text="busy")
+        return None
+
+    async def post(self, request):
+        data = await request.json()
+        failure = await self.answer()
+        if failure is not None:
+            return failure
+        tid = uuid.uuid4().hex
+        self.telescopes[tid] = data
+        return web.json_response({"telescope_id": tid, "publish_token": f"publish-{tid}", "subscribe_token": f"subscribe-{tid}"})
+
+    async def get(self, request):
+        failure = await self.answer()
+        if failure is not None:
+            return failure
+        data = self.telescopes.get(request.match_info["tid"])
+        if data is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        return web.json_response(data)
+
+    async def put(self, request):
+        data = await request.json()
+        failure = await self.answer()
+        if failure is not None:
+            return failure
+        tid = request.match_info["tid"]
+        if tid not in self.telescopes:
+            return web.json_response({"detail": "not found"}, status=404)
+        self.telescopes[tid] = data
+        self.updates[tid] = self.updates.get(tid, 0) + 1
+        return web.json_response({"telescope_id": tid})
+
+    async def delete(self, request):
+        failure = await self.answer()
+        if failure is not None:
+            return failure
+        if self.telescopes.pop(request.match_info["tid"], None) is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        return web.json_response({"message": "deleted"})
+
+
+def telescope_data(i):
+    location = Location("null", "null", 50.0, 20.0)
+    specifications = Specifications(150, 1200, 8, 10, 1.5, 0.5, 0.5, "EQUATORIAL", "Refractor")
+    return TelescopeData(f"bench {i}", location, specifications, 1.0, "FREE")
+
+
+async def lifecycle(server, telescopes, connections):
+    """
+    Register, heartbeat and deregister a batch of telescopes.
+    """
+    async with ApiClient(server.url, timeout=2.0, retries=5, backoff=0.05, connections=connections) as client:
+        start = time.perf_counter()
+        responses = await client.register_telescopes([telescope_data(i) for i in range(telescopes)])
+        register_time = time.perf_counter() - start
+        tids = [response.telescope_id for response in responses if type(response) is TelescopeResponse]
+
+        server.updates.clear()
+        heartbeat = asyncio.ensure_future(client.heartbeat(lambda: {tid: telescope_data(0) for tid in tids}, 0.2))
+        start = time.perf_counter()
+        while min(server.updates.get(tid, 0) for tid in tids) < 2:
+            await asyncio.sleep(0.05)
+        heartbeat_time = (time.perf_counter() - start) / 2
+        heartbeat.cancel()
+
+        responses = await client.deregister_telescopes(tids)
+        deregistered = sum(type(response) is DeleteResponse for response in responses)
+        return register_time, heartbeat_time, client.retried, deregistered
+
+
+async def failures(server):
+    """
+    Time until a request to a hung server gives up.
+    """
+    async with ApiClient(server.url, timeout=0.3, retries=2, backoff=0.01) as client:
+        server.hang = 1.0
+        start = time.perf_counter()
+        await client.update_telescope("missing", telescope_data(0))
+        hang_time = time.perf_counter() - start
+        server.hang = 0.0
+        return hang_time, client.retried
+
+
+async def main(telescopes, latency, failure_rate):
+    server = StubTelescopeServer(latency, failure_rate)
+    await server.start()
+    try:
+        for connections in (1, 16):
+            register_time, heartbeat_time, retried, deregistered = await lifecycle(server, telescopes, connections)
+            print(f"{connections:2d} connections: registered {telescopes} telescopes in {register_time * 1000:.0f} ms "
+                  f"with {retried} retries, {heartbeat_time * 1000:.0f} ms per heartbeat round, "
+                  f"{deregistered} deregistered")
+        hang_time, retried = await failures(server)
+        print(f"hung PUT gave up after {hang_time:.2f}s and {retried} retries")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ApiClient lifecycle against a local stub telescope API.")
+    parser.add_argument("--telescopes", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency per request in seconds.")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="Share of requests answered with 503.")
+    args = parser.parse_args()
+    asyncio.run(main(args.telescopes, args.latency, args.failure_rate))
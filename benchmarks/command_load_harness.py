@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import collections
+import json
+import math
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.config import Config
+from src.telescope_host import TelescopeHost
+from src.utils.command_router import CommandError, decode_move, pack_move
+from src.utils.mqtt_client import MQTTClient
+from benchmarks.command_log import CommandLogWriter, read_command_log
+from benchmarks.command_router_benchmark import Message
+from benchmarks.multi_telescope_benchmark import CountingPublisher
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+RECORDED_COMMANDS = ("move", "spot")
+JOYSTICK_RATE = 20.0
+SPOT_NAMES = ["moon", "venus", "jupiter"]
+
+
+def topic_matches(pattern, topic):
+    patterns = pattern.split("/")
+    levels = topic.split("/")
+    for index, level in enumerate(patterns):
+        if level == "#":
+            return True
+        if index >= len(levels) or (level != "+" and level != levels[index]):
+            return False
+    return len(patterns) == len(levels)
+
+
+class InProcessBroker:
+    """
+    Stand-in for the MQTT broker and the application's MQTTClient in one. Publishes are delivered in order on a single
+    network thread to the subscribers of matching topics, QoS 0, a full queue drops them like a congested broker.
+    """
+    def __init__(self, max_queue=10000):
+        self.topics = []
+        self.subscribers = []
+        self.queue = queue.Queue(max_queue)
+        self.connected = False
+        self.thread = None
+        self.published = 0
+        self.dropped = 0
+        self.delivered = 0
+
+    def add_subscriber(self, subscriber):
+        self.subscribers.append(subscriber)
+
+    def subscribe(self, topic):
+        self.topics.append(topic)
+
+    def connect(self):
+        self.thread = threading.Thread(target=self.deliver, name="broker", daemon=True)
+        self.thread.start()
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+        self.queue.put(None)
+        self.thread.join()
+
+    def publish(self, topic, payload, qos=0):
+        """
+        :return: False when the message was dropped.
+        """
+        try:
+            self.queue.put_nowait(Message(topic, payload))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.published += 1
+        return True
+
+    def deliver(self):
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                return
+            if not any(topic_matches(topic, msg.topic) for topic in self.topics):
+                continue
+            self.delivered += 1
+            for subscriber in self.subscribers:
+                subscriber.on_message(None, None, msg)
+
+
+def synthesize(clients, telescopes, duration, rate=JOYSTICK_RATE, binary=False, seed=0):
+    """
+    Commands of joystick clients: bursts of moves at the joystick rate with jitter, pauses between bursts and now and
+    then a spot, clients spread evenly over the telescopes.
+    :return: List of (seconds since the start, topic, payload) in time order.
+    """
+    rng = np.random.default_rng(seed)
+    commands = []
+    for client in range(clients):
+        tid = f"load-{client % telescopes}"
+        offset = rng.uniform(0, 2)
+        while offset < duration:
+            burst_end = min(offset + rng.uniform(2, 6), duration)
+            axis = rng.choice(["DX", "DY", "ZOOM"])
+            while offset < burst_end:
+                value = float(rng.normal(0, 0.05 if axis == "ZOOM" else 0.02))
+                if binary:
+                    payload = pack_move(*[value if axis == name else 0.0 for name in ("DX", "DY", "ZOOM")])
+                else:
+                    payload = json.dumps({"type": axis, "value": value}).encode()
+                commands.append((offset, f"{tid}/move", payload))
+                offset += rng.uniform(0.8, 1.2) / rate
+            if rng.uniform() < 0.3:
+                interesting = [name for name in SPOT_NAMES if rng.uniform() < 0.5]
+                commands.append((offset, f"{tid}/spot", json.dumps({"interesting": interesting}).encode()))
+            offset += rng.uniform(1, 3)
+    commands.sort(key=lambda command: command[0])
+    return commands
+
+
+def replay_schedule(path, telescopes, speed=1.0):
+    """
+    Commands of a recording, the recorded telescopes mapped onto the harness ones in order of appearance.
+    :param speed: Replay speed, 2 sends the recording in half the time.
+    """
+    tids = {}
+    commands = []
+    for offset, topic, payload in read_command_log(path):
+        tid, _, command = topic.rpartition("/")
+        if tid not in tids:
+            tids[tid] = f"load-{len(tids) % telescopes}"
+        commands.append((offset / speed, f"{tids[tid]}/{command}", payload))
+    start = commands[0][0] if commands else 0.0
+    return [(offset - start, topic, payload) for offset, topic, payload in commands]
+
+
+class LoadHarness:
+    def __init__(self, config, loader, telescopes, max_queue=10000):
+        """
+        Telescopes of a TelescopeHost driven through an in-process broker, timing every move from its publish
+        to the first published frame showing it.
+        """
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.host = TelescopeHost(config, self.loop, loader)
+        # keep the statistics of the whole run instead of resetting them at every periodic report
+        self.host.router.next_report = math.inf
+        self.broker = InProcessBroker(max_queue)
+        self.broker.add_subscriber(self.host)
+        self.sent = {}
+        self.send_lag = 0.0
+        for index in range(telescopes):
+            tid = f"load-{index}"
+            session = self.host.add_telescope(f"load {index}")
+            session.publisher = CountingPublisher()
+            self.trace(tid, session)
+            self.host.route(tid, session)
+            for topic in self.host.router.topics(tid):
+                self.broker.subscribe(topic)
+
+    def trace(self, tid, session):
+        # moves reach the controller in publish order, stamp them with their publish time
+        sent = self.sent[f"{tid}/move"] = collections.deque()
+        enqueue = session.motion.enqueue
+        session.motion.enqueue = lambda da, de, dz: enqueue(da, de, dz, sent.popleft())
+        session.motion.latencies = collections.deque()
+        session.motion.next_report = math.inf
+
+    def send(self, commands):
+        """
+        Publish the commands at their offsets, stands in for all clients at once.
+        """
+        traced = []
+        for offset, topic, payload in commands:
+            sent = self.sent.get(topic)
+            if sent is not None:
+                try:
+                    decode_move(payload)
+                except CommandError:
+                    # rejected by the router, never reaches the controller
+                    sent = None
+            traced.append((offset, topic, payload, sent))
+        start = time.monotonic()
+        for offset, topic, payload, sent in traced:
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.monotonic()
+            self.send_lag = max(self.send_lag, now - start - offset)
+            if sent is not None:
+                sent.append(now)
+            if not self.broker.publish(topic, payload) and sent is not None:
+                sent.pop()
+
+    def run(self, commands, drain=1.0, stall=1.0):
+        """
+        :param drain: Seconds after the last command for its frame to come out.
+        :param stall: Command to frame latency above which a move counts as stalled.
+        """
+        async def run():
+            scheduler = asyncio.ensure_future(self.host.run())
+            # settle the first renders before sending
+            await asyncio.sleep(0.5)
+            for session in self.host.sessions:
+                session.publisher.frames = 0
+            self.broker.connect()
+            sender = threading.Thread(target=self.send, args=(commands,), name="clients")
+            start = time.perf_counter()
+            sender.start()
+            while sender.is_alive():
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            frames = [session.publisher.frames for session in self.host.sessions]
+            await asyncio.sleep(drain)
+            scheduler.cancel()
+            try:
+                await scheduler
+            except asyncio.CancelledError:
+                pass
+            return elapsed, frames
+
+        elapsed, frames = self.loop.run_until_complete(run())
+        self.broker.disconnect()
+        self.host.close()
+        self.loop.close()
+        return self.report(len(commands), elapsed, frames, stall)
+
+    def report(self, commands, elapsed, frames, stall):
+        latencies = np.array([latency for session in self.host.sessions for latency in session.motion.latencies])
+        # handled moves whose frame never came out, and delivered moves no handler took
+        unshown = sum(len(session.motion.queue) + sum(len(received) for _, received in session.motion.waiting)
+                      for session in self.host.sessions)
+        lost = sum(len(sent) for sent in self.sent.values())
+        router = self.host.router.snapshot()
+        result = {
+            "commands": commands,
+            "seconds": elapsed,
+            "published": self.broker.published,
+            "broker_dropped": self.broker.dropped,
+            "max_send_lag": self.send_lag,
+            "unknown_topic": router.pop("unknown"),
+            "dispatch": router,
+            "moves_shown": len(latencies),
+            "stalled": int(np.count_nonzero(latencies > stall)) + unshown,
+            "lost": lost,
+            "fps_min": min(frames) / elapsed if frames else 0.0,
+            "fps_mean": sum(frames) / len(frames) / elapsed if frames else 0.0,
+        }
+        if len(latencies) > 0:
+            for percentile in (50, 90, 99):
+                result[f"frame_latency_p{percentile}"] = float(np.percentile(latencies, percentile))
+            result["frame_latency_max"] = float(latencies.max())
+        return result
+
+
+def record(config, path, duration):
+    """
+    Record the commands of the real broker until duration passes or Ctrl-C.
+    """
+    mqtt = MQTTClient(config["MQTT_URL"], config["MQTT_PORT"], config["MQTT_USER"], config["MQTT_PASSWORD"])
+    log = CommandLogWriter(path)
+    mqtt.add_subscriber(log)
+    mqtt.connect()
+    for command in RECORDED_COMMANDS:
+        mqtt.subscribe(f"+/{command}")
+    try:
+        time.sleep(duration if duration > 0 else math.inf)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mqtt.disconnect()
+        log.close()
+    print(f"recorded {log.count} commands to {path}")
+
+
+def print_report(result):
+    print(f"{result['commands']} commands in {result['seconds']:.1f} s, {result['broker_dropped']} dropped by the broker, "
+          f"{result['unknown_topic']} on unknown topics, send lag up to {result['max_send_lag'] * 1000:.1f} ms")
+    for command, stats in result["dispatch"].items():
+        if stats["received"] == 0:
+            continue
+        print(f"{command:>8}: {stats['received']} received, {stats['rejected']} rejected, {stats['handled']} handled, "
+              f"dispatch p50 {stats['latency_p50'] * 1000:.2f} ms p99 {stats['latency_p99'] * 1000:.2f} ms")
+    if "frame_latency_p50" in result:
+        print(f"   moves: command to frame p50 {result['frame_latency_p50'] * 1000:.1f} ms "
+              f"p90 {result['frame_latency_p90'] * 1000:.1f} ms p99 {result['frame_latency_p99'] * 1000:.1f} ms "
+              f"max {result['frame_latency_max'] * 1000:.1f} ms")
+    print(f"   {result['moves_shown']} moves shown, {result['stalled']} stalled, {result['lost']} lost, "
+          f"{result['fps_min']:.1f} fps worst, {result['fps_mean']:.1f} fps mean")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, replay or synthesize MQTT command traffic and measure "
+                                                 "command to frame latency against an in-process broker.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    recorder = subparsers.add_parser("record", help="Record move and spot commands from the configured broker.")
+    recorder.add_argument("--output", default="commands.tcl")
+    recorder.add_argument("--duration", type=float, default=0.0, help="Seconds to record, until Ctrl-C when 0.")
+    replay = subparsers.add_parser("replay", help="Replay a recording.")
+    replay.add_argument("log")
+    replay.add_argument("--speed", type=float, default=1.0)
+    synthetic = subparsers.add_parser("synthesize", help="Simulate joystick clients.")
+    synthetic.add_argument("--clients", type=int, default=10)
+    synthetic.add_argument("--duration", type=float, default=10.0)
+    synthetic.add_argument("--rate", type=float, default=JOYSTICK_RATE, help="Moves per second of a client in a burst.")
+    synthetic.add_argument("--binary", action="store_true", help="Send packed binary moves instead of JSON.")
+    synthetic.add_argument("--seed", type=int, default=0)
+    for subparser in (replay, synthetic):
+        subparser.add_argument("--telescopes", type=int, default=1)
+        subparser.add_argument("--fps", type=float, default=30.0, help="Target frames per second per telescope.")
+        subparser.add_argument("--max-queue", type=int, default=10000, help="Broker messages in flight before drops.")
+        subparser.add_argument("--stall", type=float, default=1.0, help="Seconds of command to frame latency that count as stalled.")
+        subparser.add_argument("--output", help="Save the report as JSON.")
+    args = parser.parse_args()
+
+    config = Config()
+    if args.mode == "record":
+        record(config, args.output, args.duration)
+        return
+    config.update({"FRAME_PERIOD": 1 / args.fps, "EPHEMERIS_PERIOD": 0})
+    if args.mode == "replay":
+        commands = replay_schedule(args.log, args.telescopes, args.speed)
+    else:
+        commands = synthesize(args.clients, args.telescopes, args.duration, args.rate, args.binary, args.seed)
+    loader = SyntheticCelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]))
+    harness = LoadHarness(config, loader, args.telescopes, args.max_queue)
+    result = harness.run(commands, stall=args.stall)
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
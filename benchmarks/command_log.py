@@ -0,0 +1,59 @@
+import struct
+import threading
+import time
+
+MAGIC = b"TCL1"
+# seconds since the start of the recording, topic length, payload length, then the topic and payload bytes
+RECORD = struct.Struct("<dHH")
+
+
+class CommandLogWriter:
+    """
+    Appends MQTT commands to a compact binary log, safe to call from the paho network thread.
+    """
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, topic, payload, received=None):
+        topic = topic.encode()
+        offset = (time.monotonic() if received is None else received) - self.start
+        with self.lock:
+            self.file.write(RECORD.pack(offset, len(topic), len(payload)))
+            self.file.write(topic)
+            self.file.write(payload)
+            self.count += 1
+
+    def on_message(self, client, userdata, msg):
+        self.write(msg.topic, msg.payload)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def read_command_log(path):
+    """
+    :return: List of (seconds since the start, topic, payload) in recording order.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a command log")
+    records = []
+    position = len(MAGIC)
+    while position + RECORD.size <= len(data):
+        offset, topic_length, payload_length = RECORD.unpack_from(data, position)
+        position += RECORD.size
+        topic = data[position:position + topic_length].decode()
+        position += topic_length
+        payload = data[position:position + payload_length]
+        position += payload_length
+        if len(payload) < payload_length:
+            # a recording cut off mid record
+            break
+        records.append((offset, topic, payload))
+    return records
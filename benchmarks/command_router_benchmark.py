@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import timeit
+
+from src.config import Config
+from src.telescope_host import TelescopeHost
+from src.utils.command_router import decode_move, pack_move
+from benchmarks.multi_telescope_benchmark import CountingPublisher
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+JSON_MOVE = json.dumps({"type": "DX", "value": 0.001}).encode()
+BINARY_MOVE = pack_move(0.001, 0.0, 0.0)
+
+
+def decode_cost(number=100000):
+    for name, payload in [("json", JSON_MOVE), ("binary", BINARY_MOVE)]:
+        seconds = timeit.timeit(lambda: decode_move(payload), number=number)
+        print(f"{name} move: {len(payload)} bytes, {seconds / number * 1e6:.2f} us to validate and decode")
+
+
+def produce(host, topic, payload, rate, duration, sent):
+    """
+    Stand-in for the paho network thread, submits commands at a fixed rate in 1 ms bursts.
+    """
+    burst = max(1, int(rate / 1000))
+    interval = burst / rate
+    end = time.perf_counter() + duration
+    next_burst = time.perf_counter()
+    while time.perf_counter() < end:
+        for _ in range(burst):
+            host.on_message(None, None, Message(topic, payload))
+            sent[0] += 1
+        next_burst += interval
+        time.sleep(max(0.0, next_burst - time.perf_counter()))
+
+
+class Message:
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+def sustained(config, loader, payload, rate, duration):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    host = TelescopeHost(config, loop, loader)
+    session = host.add_telescope("bench")
+    host.route("bench", session)
+    session.publisher = CountingPublisher()
+    stats = host.router.stats["move"]
+    sent = [0]
+
+    async def run():
+        scheduler = asyncio.ensure_future(host.run())
+        await asyncio.sleep(0.5)
+        session.publisher.frames = 0
+        handled = stats.handled
+        stats.latency.reset()
+        start = time.perf_counter()
+        producer = threading.Thread(target=produce, args=(host, "bench/move", payload, rate, duration, sent))
+        producer.start()
+        while producer.is_alive():
+            await asyncio.sleep(0.05)
+        # let the last batch drain before stopping the clock
+        await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        scheduler.cancel()
+        try:
+            await scheduler
+        except asyncio.CancelledError:
+            pass
+        return elapsed, stats.handled - handled
+
+    elapsed, handled = loop.run_until_complete(run())
+    fps = session.publisher.frames / elapsed
+    host.close()
+    loop.close()
+    return sent[0] / elapsed, handled / elapsed, stats.latency.percentile(50), stats.latency.percentile(99), fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command dispatch throughput next to frame production.")
+    parser.add_argument("--rate", type=float, default=5000.0, help="Move commands per second.")
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    decode_cost()
+    config = Config()
+    config.update({"FRAME_PERIOD": 1 / 30, "EPHEMERIS_PERIOD": 0})
+    loader = SyntheticCelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]))
+    # a 20 Hz joystick keeps the mount slewing, the baseline frame rate the command floods are compared with
+    for name, payload, rate in [("joystick", JSON_MOVE, 20), ("json", JSON_MOVE, args.rate), ("binary", BINARY_MOVE, args.rate)]:
+        sent, handled, p50, p99, fps = sustained(config, loader, payload, rate, args.duration)
+        print(f"{name:>8}: {sent:7.0f} sent/s, {handled:7.0f} handled/s, dispatch p50 {p50 * 1000:.2f} ms "
+              f"p99 {p99 * 1000:.2f} ms, {fps:.1f} fps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import time
+import tracemalloc
+
+from livekit import rtc
+
+from src.config import Config
+from src.telescopes.telescope_mock import TelescopeMock
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.render.frame_pool import frame_memoryview
+from src.utils.profiler import Profiler
+from src.utils.resource_loader import ResourceLoader
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+WIDTH = 1920
+HEIGHT = 1080
+PAN = 0.01
+
+
+def publish(frame):
+    # what LiveKitPublisher.feed_frame hands to LiveKit
+    height, width = frame.shape[:2]
+    return rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, frame_memoryview(frame))
+
+
+def step(telescope, assistant, moving):
+    if moving:
+        telescope.move(PAN, 0, 0)
+    return publish(assistant.get_frame())
+
+
+def measure(telescope, assistant, profiler, moving, frames):
+    """
+    Run frames through TelescopeMock.draw and TelescopeAssistant.get_frame as a session does, renders in line.
+    :return: Tuple of (seconds per frame, bytes allocated per frame, bytes copied per frame by the assistant).
+    """
+    step(telescope, assistant, moving)
+    copies = profiler.stages.get("assistant.copy")
+    copied_before = copies.count if copies else 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        step(telescope, assistant, moving)
+    elapsed = (time.perf_counter() - start) / frames
+    copies = profiler.stages.get("assistant.copy")
+    copied = ((copies.count if copies else 0) - copied_before) * assistant.frame.nbytes / frames
+
+    # traced separately, tracing slows frames down
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(frames):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        video_frame = step(telescope, assistant, moving)
+        del video_frame
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return elapsed, allocated / frames, copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations and copies per frame of the real render and overlay path.")
+    parser.add_argument("--objects", type=int, default=300, help="Synthetic catalogue size.")
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    config = Config()
+    config.update(TELESCOPE_STREAM_WIDTH=WIDTH, TELESCOPE_STREAM_HEIGHT=HEIGHT, SKY_ATLAS=False)
+    loader = SyntheticCelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]), args.objects)
+    profiler = Profiler()
+    telescope = TelescopeMock(config, ResourceLoader(2 * TelescopeMock.STAR_SIZE), loader, profiler)
+    assistant = TelescopeAssistant(telescope, celestial_data_loader=loader, profiler=profiler)
+    for name, moving in [("moving", True), ("idle", False)]:
+        frame_time, allocated, copied = measure(telescope, assistant, profiler, moving, args.frames)
+        print(f"{name}: {allocated / 2**20:.2f} MiB allocated/frame, {copied / 2**20:.2f} MiB copied/frame by the "
+              f"assistant, {frame_time * 1000:.2f} ms/frame")
+    for stage, histogram in sorted(profiler.stages.items()):
+        print(f"  {stage}: p50 {histogram.percentile(50) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import json
+import time
+
+from livekit import rtc
+
+from src.config import Config
+from src.render.frame_pool import frame_memoryview
+from src.telescope_host import TelescopeHost
+from src.telescope_supervisor import TelescopeSupervisor
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+WIDTH = 1920
+HEIGHT = 1080
+# a joystick at 20 Hz asking for more than the slew rate, so every mount moves on every frame
+JOYSTICK_PERIOD = 0.05
+MOVE = json.dumps({"type": "DX", "value": 0.2}).encode()
+
+
+class CountingPublisher:
+    """
+    Wraps frames like LiveKitPublisher does and counts them instead of sending them.
+    """
+    def __init__(self):
+        self.frames = 0
+        self.layer_frames = {}
+
+    def feed_frame(self, frame, layer=None):
+        height, width = frame.shape[:2]
+        rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, frame_memoryview(frame))
+        if layer is None:
+            self.frames += 1
+        else:
+            self.layer_frames[layer] = self.layer_frames.get(layer, 0) + 1
+
+
+async def drive(host, duration):
+    # every telescope slews the whole time, the worst case for the shared render threads
+    tids = list(host.routes)
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        for tid in tids:
+            host.handle_message(f"{tid}/move", MOVE)
+        await asyncio.sleep(JOYSTICK_PERIOD)
+
+
+def measure(config, loader, telescopes, duration, workers=0):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if workers > 0:
+        host = TelescopeSupervisor(config, loop, workers, loader)
+    else:
+        host = TelescopeHost(config, loop, loader)
+    publishers = []
+    for i in range(telescopes):
+        session = host.add_telescope(f"bench {i}")
+        host.route(f"bench-{i}", session)
+        session.publisher = CountingPublisher()
+        publishers.append(session.publisher)
+
+    async def run():
+        scheduler = asyncio.ensure_future(host.run())
+        # settle worker start up, the first sky update and renders before counting
+        while min(publisher.frames for publisher in publishers) == 0:
+            if scheduler.done():
+                scheduler.result()
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+        for publisher in publishers:
+            publisher.frames = 0
+        start = time.perf_counter()
+        await drive(host, duration)
+        elapsed = time.perf_counter() - start
+        scheduler.cancel()
+        try:
+            await scheduler
+        except asyncio.CancelledError:
+            pass
+        return elapsed
+
+    elapsed = loop.run_until_complete(run())
+    missed = host.scheduler.stats()["missed_deadlines"]
+    if workers > 0:
+        detail = f"{host.stats()['torn_frames']} torn frames"
+    else:
+        renders = sum(session.telescope.render_queue.renders for session in host.sessions)
+        detail = f"{renders / elapsed:6.1f} renders/s"
+        host.close()
+    loop.close()
+    fps = [publisher.frames / elapsed for publisher in publishers]
+    return min(fps), sum(fps) / len(fps), detail, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="How many 1080p telescopes one process sustains at a target fps.")
+    parser.add_argument("--fps", type=float, default=30.0, help="Target frames per second per telescope.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds measured per telescope count.")
+    parser.add_argument("--max-telescopes", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None, help="Render threads, config RENDER_THREADS by default.")
+    parser.add_argument("--workers", type=int, default=0, help="Render worker processes, 0 renders in this process.")
+    args = parser.parse_args()
+
+    config = Config()
+    config.update({
+        "TELESCOPE_STREAM_WIDTH": WIDTH,
+        "TELESCOPE_STREAM_HEIGHT": HEIGHT,
+        "FRAME_PERIOD": 1 / args.fps,
+        "EPHEMERIS_PERIOD": 10.0,
+    })
+    if args.threads is not None:
+        config["RENDER_THREADS"] = args.threads
+    loader = SyntheticCelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]))
+
+    def fits(telescopes):
+        worst, mean, detail, missed = measure(config, loader, telescopes, args.duration, args.workers)
+        ok = worst >= 0.9 * args.fps
+        print(f"{telescopes:3d} telescopes: worst {worst:5.1f} fps, mean {mean:5.1f} fps, "
+              f"{detail}, {missed} missed deadlines {'ok' if ok else 'too slow'}")
+        return ok
+
+    # double until the target is missed, then bisect between the last fitting and the first failing count
+    fitting = 0
+    failing = None
+    telescopes = 1
+    while telescopes <= args.max_telescopes:
+        if not fits(telescopes):
+            failing = telescopes
+            break
+        fitting = telescopes
+        telescopes *= 2
+    if failing is not None:
+        while failing - fitting > 1:
+            telescopes = (fitting + failing) // 2
+            if fits(telescopes):
+                fitting = telescopes
+            else:
+                failing = telescopes
+    where = f"{args.workers} worker processes" if args.workers > 0 else "one process"
+    print(f"{fitting} telescopes at {WIDTH}x{HEIGHT} sustain {args.fps:.0f} fps in {where} "
+          f"with {config.get('RENDER_THREADS', 2)} render threads each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+import cv2
+
+from src.config import Config
+from src.telescopes.telescope_mock import TelescopeMock
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.utils.resource_loader import ResourceLoader
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+WIDTH = 1920
+HEIGHT = 1080
+PAN = 0.01
+
+
+def visible(assistant):
+    fov = assistant.telescope.get_fov()
+    orientation = assistant.telescope.get_orientation()
+    return len(assistant.sky.index.query(orientation[0], orientation[1], fov[0], fov[1], WIDTH, HEIGHT)[0])
+
+
+def overlay_time(telescope, assistant, frames):
+    # moving changes the overlay every frame, the path a slew takes
+    start = time.perf_counter()
+    for _ in range(frames):
+        telescope.move(PAN, 0, 0)
+        assistant.get_frame()
+    return (time.perf_counter() - start) / frames
+
+
+def direct_time(telescope, assistant, frames):
+    # reference: the circles drawn straight onto a copy of every frame, without an overlay layer
+    frame = np.empty((HEIGHT, WIDTH, 4), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(frames):
+        telescope.move(PAN, 0, 0)
+        np.copyto(frame, telescope.get_frame())
+        fov = telescope.get_fov()
+        orientation = telescope.get_orientation()
+        _, xs, ys = assistant.sky.index.query(orientation[0], orientation[1], fov[0], fov[1], WIDTH, HEIGHT)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            cv2.circle(frame, (x, y), 80, (0, 255, 0, 255), 10)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the assistant overlay while moving, by visible objects.")
+    parser.add_argument("--objects", nargs="+", type=int, default=[300, 3000], help="Synthetic catalogue sizes, 3000 puts about 500 objects in view.")
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    config = Config()
+    config.update(TELESCOPE_STREAM_WIDTH=WIDTH, TELESCOPE_STREAM_HEIGHT=HEIGHT, SKY_ATLAS=False)
+    coords = (config["LATITUDE"], config["LONGITUDE"])
+    resource_loader = ResourceLoader(2 * TelescopeMock.STAR_SIZE)
+    for count in args.objects:
+        loader = SyntheticCelestialDataLoader(coords, count)
+        telescope = TelescopeMock(config, resource_loader, loader)
+        assistant = TelescopeAssistant(telescope, celestial_data_loader=loader)
+        objects = visible(assistant)
+        layered = overlay_time(telescope, assistant, args.frames)
+        direct = direct_time(telescope, assistant, args.frames)
+        print(f"{objects:5d} visible objects: move and overlay {layered * 1000:6.2f} ms/frame, "
+              f"drawn directly on a frame copy {direct * 1000:6.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import time
+
+import cv2
+
+from src.config import Config
+from src.telescope_host import TelescopeHost
+from src.telescopes.telescope_mock import TelescopeMock
+from src.utils.resource_loader import ResourceLoader
+from benchmarks.multi_telescope_benchmark import CountingPublisher, drive
+from benchmarks.sky_fixtures import SyntheticCelestialDataLoader
+
+WIDTH = 1920
+HEIGHT = 1080
+# (width, height, interval) of the lower layers
+LAYERS = [(960, 540, 2), (480, 270, 4)]
+PAN = 0.01
+
+
+def render_time(telescope, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        telescope.move(PAN, 0, 0)
+    return (time.perf_counter() - start) / frames
+
+
+def downscaled_time(telescope, width, height, frames):
+    # what the encoder's internal simulcast does: the full resolution render, then a downscale per layer
+    start = time.perf_counter()
+    for _ in range(frames):
+        telescope.move(PAN, 0, 0)
+        cv2.resize(telescope.get_frame(), (width, height), interpolation=cv2.INTER_AREA)
+    return (time.perf_counter() - start) / frames
+
+
+def compare(config, loader, frames):
+    resource_loader = ResourceLoader(2 * TelescopeMock.STAR_SIZE)
+    full = TelescopeMock(config, resource_loader, loader)
+    print(f"{WIDTH}x{HEIGHT} render: {render_time(full, frames) * 1000:6.2f} ms")
+    for width, height, _ in LAYERS:
+        layer_config = dict(config, TELESCOPE_STREAM_WIDTH=width, TELESCOPE_STREAM_HEIGHT=height)
+        native = TelescopeMock(layer_config, resource_loader, loader, scale=height / HEIGHT)
+        print(f"{width}x{height} native render: {render_time(native, frames) * 1000:6.2f} ms, "
+              f"full render and downscale: {downscaled_time(full, width, height, frames) * 1000:6.2f} ms")
+
+
+def stream(config, loader, duration):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    host = TelescopeHost(dict(config, SIMULCAST_LAYERS=LAYERS), loop, loader)
+    session = host.add_telescope("bench")
+    host.route("bench", session)
+    session.publisher = CountingPublisher()
+
+    async def run():
+        scheduler = asyncio.ensure_future(host.run())
+        await asyncio.sleep(0.5)
+        session.telemetry_metrics()
+        await drive(host, duration)
+        metrics = session.telemetry_metrics()
+        scheduler.cancel()
+        try:
+            await scheduler
+        except asyncio.CancelledError:
+            pass
+        return metrics
+
+    metrics = loop.run_until_complete(run())
+    host.close()
+    loop.close()
+    print(f"{HEIGHT}p: {metrics['fps']:5.1f} fps, render p50 {metrics.get('render_time_p50', 0) * 1000:6.2f} ms")
+    for layer in session.layers:
+        print(f"{layer.name}: {metrics[f'{layer.name}_fps']:5.1f} fps, "
+              f"render p50 {metrics.get(f'{layer.name}_render_time_p50', 0) * 1000:6.2f} ms, "
+              f"publish p50 {metrics.get(f'{layer.name}_publish_time_p50', 0) * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of natively rendered simulcast layers against downscaling.")
+    parser.add_argument("--frames", type=int, default=30, help="Frames timed per resolution.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds one telescope streams all layers.")
+    parser.add_argument("--fps", type=float, default=30.0, help="Target frames per second of the full resolution.")
+    args = parser.parse_args()
+
+    config = Config()
+    config.update({
+        "TELESCOPE_STREAM_WIDTH": WIDTH,
+        "TELESCOPE_STREAM_HEIGHT": HEIGHT,
+        "FRAME_PERIOD": 1 / args.fps,
+        "SKY_ATLAS": False,
+    })
+    loader = SyntheticCelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]))
+    compare(config, loader, args.frames)
+    stream(config, loader, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.utils.celestial_data_loader import CelestialDataLoader
+
+# every fixture is evaluated at this instant, so runs on different days draw the same sky
+FIXTURE_TIME = datetime(2024, 3, 20, 22, 0, tzinfo=timezone.utc)
+
+
+class SyntheticCelestialDataLoader(CelestialDataLoader):
+    """
+    Almanac shaped like the USNO response with seeded random objects, so benchmarks run offline.
+    """
+    def __init__(self, coords, count=300, seed=0):
+        self.count = count
+        self.seed = seed
+        super().__init__(coords)
+
+    def fetch_data(self):
+        self.fetch_time = FIXTURE_TIME
+        self.ephemeris = None
+        rng = np.random.default_rng(self.seed)
+        names = ["Moon", "Venus", "Jupiter"] + [f"Star {i}" for i in range(self.count)]
+        gha = rng.uniform(1, 359, len(names))
+        hc = rng.uniform(1, 89, len(names))
+        dec = rng.uniform(-60, 60, len(names))
+        # faint stars outnumber bright ones, magnitudes from -1 to 8
+        magnitude = 9 * rng.uniform(0, 1, len(names)) ** 0.25 - 1
+        self.raw_data = {"properties": {"data": [
+            {"object": name, "almanac_data": {"dec": d, "gha": g, "hc": h, "zn": 180.0, "magnitude": m}}
+            for name, d, g, h, m in zip(names, dec.tolist(), gha.tolist(), hc.tolist(), magnitude.tolist())]}}
+
+    def refresh_data(self):
+        pass
+
+
+class OfflineCelestialDataLoader(CelestialDataLoader):
+    """
+    Objects of an offline star catalogue at FIXTURE_TIME, without the almanac service.
+    """
+    def __init__(self, coords, catalogue_path):
+        super().__init__(coords, catalogue_path)
+        if self.catalogue is None:
+            raise FileNotFoundError(catalogue_path)
+
+    def fetch_data(self):
+        self.fetch_time = FIXTURE_TIME
+        self.ephemeris = None
+        self.raw_data = None
+
+    def refresh_data(self):
+        pass
+
+    def parse_data(self):
+        return self.celestials_at(FIXTURE_TIME)
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from src.render.sprite_compositor import SpriteCompositor
+from src.utils.resource_loader import ResourceLoader
+
+SKY_COLOR = (25, 25, 112)
+WIDTH = 1920
+HEIGHT = 1080
+STAR_SIZE = 30
+
+
+def draw_transparent_object_float(canvas, x, y, image):
+    size = image.shape[0]
+    half_size = size // 2
+    y_min = y - half_size
+    y_max = y + half_size
+    x_min = x - half_size
+    x_max = x + half_size
+    canvas_h, canvas_w = canvas.shape[:2]
+    if y_min < 0 or y_max > canvas_h or x_min < 0 or x_max > canvas_w:
+        return
+    alpha = image[:, :, 3] / 255.0
+    for c in range(3):
+        canvas[y_min:y_max, x_min:x_max, c] = (
+            alpha * image[:, :, c] + (1 - alpha) * canvas[y_min:y_max, x_min:x_max, c]
+        )
+
+
+def main(counts=(100, 500, 2000), repeats=5):
+    resource_loader = ResourceLoader(2 * STAR_SIZE)
+    image = resource_loader.get_image("star")
+    sprite = resource_loader.get_sprite("star")
+    compositor = SpriteCompositor()
+    sky = np.full((HEIGHT, WIDTH, 3), fill_value=SKY_COLOR, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+
+    for count in counts:
+        margin = STAR_SIZE
+        positions = np.stack([rng.integers(margin, WIDTH - margin, count),
+                              rng.integers(margin, HEIGHT - margin, count)], axis=1).tolist()
+
+        expected = sky.copy()
+        actual = sky.copy()
+        for x, y in positions:
+            draw_transparent_object_float(expected, x, y, image)
+        compositor.blend_many(actual, sprite, positions)
+        max_error = int(np.abs(expected.astype(np.int16) - actual).max())
+
+        canvas = sky.copy()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for x, y in positions:
+                draw_transparent_object_float(canvas, x, y, image)
+        reference = (time.perf_counter() - start) / repeats
+
+        canvas = sky.copy()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            compositor.blend_many(canvas, sprite, positions)
+        premultiplied = (time.perf_counter() - start) / repeats
+
+        print(f"{count} sprites: float {reference * 1000:.2f} ms, premultiplied {premultiplied * 1000:.2f} ms, "
+              f"speedup {reference / premultiplied:.1f}x, max channel error {max_error}")
+
+
+if __name__ == "__main__":
+    main()
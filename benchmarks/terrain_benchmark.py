@@ -0,0 +1,57 @@
+import math
+import time
+
+import numpy as np
+
+from src.render.terrain_renderer import TerrainRenderer
+
+LAND_COLOR = (0, 100, 0)
+SKY_COLOR = (25, 25, 112)
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+FOVX = 1.6755160819
+FOVY = 0.9424777961
+
+
+def draw_terrain_loop(canvas, azimuth, elevation, fovx, fovy):
+    height, width = canvas.shape[:2]
+    land_height = height * (1 - (2 * elevation / fovy))
+    amplitude = width / 20
+    for w in range(width):
+        az = azimuth + w * fovx / width
+        land_first_pixel = int(land_height + amplitude * math.sin(2 * az))
+        if land_first_pixel < height:
+            canvas[land_first_pixel:, w] = LAND_COLOR
+
+
+def measure(draw, sky, orientations):
+    canvas = sky.copy()
+    start = time.perf_counter()
+    for azimuth, elevation in orientations:
+        draw(canvas, azimuth, elevation, FOVX, FOVY)
+    return (time.perf_counter() - start) / len(orientations)
+
+
+def main(repeats=50):
+    rng = np.random.default_rng(0)
+    orientations = list(zip(rng.uniform(-math.pi, math.pi, repeats), rng.uniform(0, FOVY, repeats)))
+    for name, (width, height) in RESOLUTIONS.items():
+        sky = np.full((height, width, 3), fill_value=SKY_COLOR, dtype=np.uint8)
+        renderer = TerrainRenderer(width, height, LAND_COLOR)
+
+        for azimuth, elevation in orientations[:5]:
+            expected = sky.copy()
+            actual = sky.copy()
+            draw_terrain_loop(expected, azimuth, elevation, FOVX, FOVY)
+            renderer.draw(actual, azimuth, elevation, FOVX, FOVY)
+            assert np.array_equal(expected, actual), "vectorized terrain differs from loop"
+
+        loop = measure(draw_terrain_loop, sky, orientations)
+        vectorized = measure(renderer.draw, sky, orientations)
+        print(f"{name}: loop {loop * 1000:.2f} ms, vectorized {vectorized * 1000:.2f} ms, speedup {loop / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,172 @@
 import asyncio
-import json
+import importlib
+import time
 from src.config import Config
-from src.utils.livekit_publisher import LiveKitPublisher, Resolution
-from src.telescopes.telescope_mock import TelescopeMock
-from src.assistant.telescope_assistant import TelescopeAssistant
-from livekit import api
-from src.utils.api import ApiClient, Location, Specifications, TelescopeData, TelescopeResponse
+from src.telescope_host import TelescopeHost
+from src.telescope_supervisor import TelescopeSupervisor
+from src.utils.api import ApiClient, Location, Specifications, TelescopeData, TelescopeResponse, DeleteResponse
 from src.utils.mqtt_client import MQTTClient
+from src.utils.telemetry_publisher import TelemetryPublisher
 
 class Application:
-    def __init__(self):
+    def __init__(self, started=None):
+        """
+        :param started: perf_counter() value startup times count from, taken by the launcher before importing this
+        module so the imports are included. Now when None.
+        """
+        self.started = time.perf_counter() if started is None else started
         self.config = Config()
         self.loop = asyncio.new_event_loop()
-        self.api = ApiClient(self.config["SERVER_URL"])
-        self.publisher = None
-        self.tid = None
-        self.telescope = TelescopeMock(self.config)
-        self.telescope_assitant = TelescopeAssistant(self.telescope)
+        self.api = ApiClient(self.config["SERVER_URL"], self.config.get("API_TIMEOUT", 10.0), self.config.get("API_RETRIES", 3))
+        self.serve_task = None
+        self.host = None
+        self.telescope_ids = []
         self.mqtt = MQTTClient(self.config["MQTT_URL"], self.config["MQTT_PORT"], self.config["MQTT_USER"], self.config["MQTT_PASSWORD"])
+        self.telemetry = TelemetryPublisher(self.mqtt, self.config.get("TELEMETRY_STATE_PERIOD", 0.5),
+                                            self.config.get("TELEMETRY_METRICS_PERIOD", 5.0),
+                                            self.config.get("TELEMETRY_KEYFRAME_INTERVAL", 20))
+        count = self.config.get("TELESCOPE_COUNT", 1)
+        self.names = [self.config["TELESCOPE_NAME"] if count == 1 else f"{self.config['TELESCOPE_NAME']} {i + 1}"
+                      for i in range(count)]
+        self.startup = {"imports": time.perf_counter() - self.started}
 
     def run(self):
-        tid, token = self.announce_telescope()
-        if tid is None or token is None:
-            print("failed to announce telescope")
-            return
-        self.tid = tid
-        print("got connection to server, tid: ", tid)
-        self.mqtt.add_subscriber(self)
-        self.mqtt.connect()
-        self.mqtt.subscribe(f"{tid}/#")
-        self.publisher = LiveKitPublisher(
-            self.loop, self.config["LIVEKIT_URL"], token)
-        if self.loop.run_until_complete(self.publisher.connect()):
-            print("connected to livekit")
+        try:
+            if not self.loop.run_until_complete(self.start()):
+                return
+            self.serve_task = self.loop.create_task(self.serve())
+            self.loop.run_until_complete(self.serve_task)
+        except KeyboardInterrupt:
+            print("shutting down")
+        finally:
+            self.loop.run_until_complete(self.shutdown())
+
+    def create_host(self):
+        """
+        Sky data, sprites and the first render of every telescope, runs off the event loop.
+        """
+        start = time.perf_counter()
+        workers = self.config.get("RENDER_WORKERS", 0)
+        if workers > 0:
+            host = TelescopeSupervisor(self.config, self.loop, workers)
         else:
+            host = TelescopeHost(self.config, self.loop)
+        for name in self.names:
+            host.add_telescope(name)
+        self.startup["host"] = time.perf_counter() - start
+        return host
+
+    def connect_mqtt(self):
+        start = time.perf_counter()
+        self.mqtt.connect()
+        self.startup["mqtt"] = time.perf_counter() - start
+
+    async def announce_telescopes(self):
+        start = time.perf_counter()
+        responses = await self.api.register_telescopes([self.telescope_data(name) for name in self.names])
+        self.startup["announce"] = time.perf_counter() - start
+        return responses
+
+    async def start(self):
+        """
+        Announce the telescopes, connect MQTT, build the host and import LiveKit at the same time, then join all
+        LiveKit rooms at once.
+        :return: False when a telescope could not be announced or streamed.
+        """
+        start = time.perf_counter()
+        # LiveKit is only needed once the telescopes are announced, its import overlaps the network round trips
+        responses, host, connected, _ = await asyncio.gather(
+            self.announce_telescopes(), self.loop.run_in_executor(None, self.create_host),
+            self.loop.run_in_executor(None, self.connect_mqtt),
+            self.loop.run_in_executor(None, importlib.import_module, "src.utils.livekit_publisher"), return_exceptions=True)
+        if not isinstance(responses, BaseException):
+            for response in responses:
+                if type(response) is TelescopeResponse and response.telescope_id is not None:
+                    self.telescope_ids.append(response.telescope_id)
+        # a host built while another step failed still owns render workers
+        for result in (responses, host, connected):
+            if isinstance(result, BaseException):
+                if not isinstance(host, BaseException):
+                    host.close()
+                raise result
+        self.host = host
+
+        from src.utils.livekit_publisher import LiveKitPublisher
+        announced = True
+        for session, response in zip(self.host.sessions, responses):
+            if type(response) is not TelescopeResponse or response.telescope_id is None or response.publish_token is None:
+                print("failed to announce telescope", session.name, response)
+                announced = False
+                continue
+            self.host.route(response.telescope_id, session)
+            print("got connection to server, tid: ", response.telescope_id)
+            session.publisher = LiveKitPublisher(self.loop, self.config["LIVEKIT_URL"], response.publish_token)
+        if not announced:
+            return False
+
+        self.mqtt.add_subscriber(self.host)
+        for tid in self.host.routes:
+            for topic in self.host.router.topics(tid):
+                self.mqtt.subscribe(topic)
+        streaming = await asyncio.gather(*(self.start_streaming(session) for session in self.host.sessions))
+        self.startup["network"] = time.perf_counter() - start
+        return all(streaming)
+
+    async def start_streaming(self, session):
+        from src.utils.livekit_publisher import Resolution
+        if not await session.publisher.connect():
             print("failed to connect to livekit")
-            return
-        
-        resolution = self.telescope.get_resolution()
-        self.loop.run_until_complete(self.publisher.start_streaming(
-            Resolution(resolution[0], resolution[1])))
-        
-        self.loop.run_until_complete(self.process_frame(self.config["FRAME_PERIOD"]))
+            return False
+        print("connected to livekit")
+        layers = [(layer.name, Resolution(*layer.telescope.get_resolution())) for layer in session.layers]
+        await session.publisher.start_streaming(
+            Resolution(self.config["TELESCOPE_STREAM_WIDTH"], self.config["TELESCOPE_STREAM_HEIGHT"]), layers)
+        return True
+
+    async def report_startup(self):
+        while not any(session.published for session in self.host.sessions):
+            await asyncio.sleep(self.config["FRAME_PERIOD"])
+        self.startup["first_frame"] = time.perf_counter() - self.started
+        for phase, seconds in self.startup.items():
+            self.host.profiler.record(f"startup.{phase}", seconds)
+        phases = ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in self.startup.items() if phase != "first_frame")
+        print(f"first frame published {self.startup['first_frame']:.2f} s after start ({phases})")
 
-    async def process_frame(self, period):
-        while True:
-            start_time = asyncio.get_event_loop().time()
+    async def serve(self):
+        heartbeat = asyncio.ensure_future(self.api.heartbeat(self.registered_telescopes, self.config.get("HEARTBEAT_PERIOD", 30.0)))
+        tasks = [heartbeat, asyncio.ensure_future(self.telemetry.run(lambda: self.host.routes)),
+                 asyncio.ensure_future(self.report_startup())]
+        if self.config.get("PROFILING_PORT", 0):
+            tasks.append(asyncio.ensure_future(self.host.profiler.serve(self.config["PROFILING_PORT"])))
+        if self.config.get("PROFILING_DUMP_PATH"):
+            tasks.append(asyncio.ensure_future(self.host.profiler.dump_periodically(
+                self.config["PROFILING_DUMP_PATH"], self.config.get("PROFILING_DUMP_PERIOD", 10.0))))
+        try:
+            await self.host.run()
+        finally:
+            for task in tasks:
+                task.cancel()
 
-            frame = self.telescope_assitant.get_frame()
-            self.publisher.feed_frame(frame)
+    def registered_telescopes(self):
+        return {tid: self.telescope_data(session.name) for tid, session in self.host.routes.items()}
 
-            code_duration = asyncio.get_event_loop().time() - start_time
-            await asyncio.sleep(period - code_duration)
+    async def shutdown(self):
+        if self.serve_task is not None and not self.serve_task.done():
+            self.serve_task.cancel()
+            try:
+                await self.serve_task
+            except asyncio.CancelledError:
+                pass
+        if self.host is not None:
+            self.host.close()
+        if self.mqtt.connected:
+            self.mqtt.disconnect()
+        for response in await self.api.deregister_telescopes(self.telescope_ids):
+            if type(response) is not DeleteResponse:
+                print("failed to deregister telescope", response)
+        await self.api.close()
 
-    def announce_telescope(self):
+    def telescope_data(self, name):
         location = Location("null", "null", self.config["LATITUDE"], self.config["LONGITUDE"]) 
         specifications = Specifications(
             aperture=150,
@@ -66,57 +179,10 @@ class Application:
             mount_type="EQUATORIAL",
             optical_design="Refractor"
         )
-        telescope_data = TelescopeData(
-            name=self.config["TELESCOPE_NAME"],
+        return TelescopeData(
+            name=name,
             location=location,
             specifications=specifications,
             price_per_minute=self.config["PRICE_PER_MINUTE"],
             status="FREE"
         )
-        response = self.api.post_telescope(telescope_data)
-        if type(response) is TelescopeResponse:
-            return response.telescope_id, response.publish_token
-        else:
-            return None, None
-        
-    def mqtt_command_move(self, payload):
-        if "type" not in payload or "value" not in payload:
-            return
-        da = 0.0
-        de = 0.0
-        dz = 0.0
-        match payload["type"]:
-            case "DX":
-                da = payload["value"]
-            case "DY":
-                de = payload["value"]
-            case "ZOOM":
-                dz = payload["value"]
-            case _:
-                return
-        self.telescope.move(da, de, dz)
-
-    def mqtt_command_spot(self, payload):
-        if not "interesting" in payload:
-            return
-        interesting = payload["interesting"]
-        self.telescope_assitant.set_interesting(interesting)
-        self.telescope.move(0, 0, 0)
-    
-    def on_message(self, client, userdata, msg):
-        topic = msg.topic.split('/')
-
-        if len(topic) != 2 or topic[0] != self.tid:
-            return
-        command = topic[1]
-        try:
-            payload = json.loads(msg.payload)
-        except json.JSONDecodeError:
-            return
-        match command: 
-            case "move":
-                self.mqtt_command_move(payload)
-            case "spot":
-                self.mqtt_command_spot(payload)
-            case _:
-                return
@@ -3,23 +3,49 @@ from ..telescopes.telescope import Telescope
 import numpy as np
 import math
 import cv2
-from livekit import rtc
-from src.utils.noise_generator import NoiseGenerator
 from src.utils.celestial_data_loader import CelestialDataLoader
+from src.render.celestial_sky import CelestialSky
+from src.render.overlay_layer import OverlayLayer, FrameOverlay
+from src.utils.profiler import Profiler
 
 
 class TelescopeAssistant():
-    def __init__(self, telescope: Telescope):
+    def __init__(self, telescope: Telescope, catalogue_path=None, celestial_data_loader=None, profiler=None, scale=1.0,
+                 stage="assistant"):
+        """
+        :param scale: Overlay size relative to the full resolution stream, below 1 for lower simulcast layers.
+        :param stage: Profiler stage prefix of the overlay and composite timings.
+        """
         self.telescope = telescope
-        self.celestial_data_loader = CelestialDataLoader(telescope.get_location())
-        self.celestials = self.celestial_data_loader.parse_data()
+        self.scale = scale
+        self.stage = stage
+        self.profiler = profiler or Profiler()
+        self.celestial_data_loader = celestial_data_loader or CelestialDataLoader(telescope.get_location(), catalogue_path)
+        self.set_sky(CelestialSky.from_celestials(self.celestial_data_loader.parse_data()))
         self.interesting = []
 
+        resolution = telescope.get_resolution()
+        self.overlay = OverlayLayer(resolution[0], resolution[1])
+        self.frame = np.empty((resolution[1], resolution[0], 4), dtype=np.uint8)
+        self.frame_number = None
+        self.frame_version = 0
+        self.frame_state = None
+        self.overlay_state = None
+        self.direct = False
+
+    def set_sky(self, sky: CelestialSky):
+        self.sky = sky
+        self.overlay_state = self.frame_state = None
+
+    def update_sky(self, time):
+        self.set_sky(self.celestial_data_loader.sky_at(time))
+
     def set_interesting(self, interesting : list[str]):
         self.interesting = interesting
+        self.overlay_state = self.frame_state = None
 
-    def spot_celestial(self,canvas, x, y):
-        cv2.circle(canvas, (x, y), 80, (0, 255, 0), 10)
+    def spot_celestial(self, overlay, x, y):
+        overlay.circle((x, y), max(int(80 * self.scale), 4), (0, 255, 0, 255), max(int(10 * self.scale), 1))
 
     def circular_diff(self, base_angle, target_angle):
         diff = target_angle - base_angle
@@ -29,22 +55,14 @@ class TelescopeAssistant():
             diff += 2 * math.pi
         return diff
 
-    def get_frame(self):
-        resolution = self.telescope.get_resolution()
-        fov = self.telescope.get_fov()
-        orientation = self.telescope.get_orientation()
-        canvas = self.telescope.get_frame()
-
-        for celestial in self.celestials:
-            if len(self.interesting) > 0 and not celestial.object_name in self.interesting:
-                continue
-            relative_azimuth = self.circular_diff(orientation[0], celestial.gha)
-            relative_elevation = celestial.hc - orientation[1]
-            if abs(relative_azimuth) > fov[0] / 2 or abs(relative_elevation) > fov[1] / 2:
-                continue
-            x = int(resolution[0] * (0.5 + relative_azimuth / fov[0]))
-            y = int(resolution[1] * (0.5 - relative_elevation / fov[1]))
-            self.spot_celestial(canvas, x, y)
+    def draw_overlay(self, overlay, resolution, fov, orientation):
+        sky = self.sky
+        indices, xs, ys = sky.index.query(orientation[0], orientation[1], fov[0], fov[1], resolution[0], resolution[1])
+        if len(self.interesting) > 0:
+            spotted = np.isin(sky.names[indices], self.interesting)
+            xs, ys = xs[spotted], ys[spotted]
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.spot_celestial(overlay, x, y)
 
         def rad2deg(rad):
             deg = rad * 180 / math.pi
@@ -55,15 +73,48 @@ class TelescopeAssistant():
         azimuth_text = f"AZIMUT: {rad2deg(orientation[0]):.1f}°"
         elevation_text = f"ELEVATION: {rad2deg(orientation[1]):.1f}°"
         font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 1
-        color = (255, 255, 255)
-        thickness = 2
-        cv2.putText(canvas, azimuth_text, (10, resolution[1] - 60), font, font_scale, color, thickness, cv2.LINE_AA)
-        cv2.putText(canvas, elevation_text, (10, resolution[1] - 30), font, font_scale, color, thickness, cv2.LINE_AA)
-          
-        argb_frame = cv2.cvtColor(canvas, cv2.COLOR_BGR2BGRA)
-        argb_frame[:, :, 3] = 255
-        argb_frame = argb_frame.tobytes()
-        return rtc.VideoFrame(resolution[0], resolution[1], rtc.VideoBufferType.RGBA, argb_frame)
+        font_scale = self.scale
+        color = (255, 255, 255, 255)
+        thickness = max(int(2 * self.scale), 1)
+        margin = int(10 * self.scale)
+        overlay.text(azimuth_text, (margin, resolution[1] - int(60 * self.scale)), font, font_scale, color, thickness)
+        overlay.text(elevation_text, (margin, resolution[1] - int(30 * self.scale)), font, font_scale, color, thickness)
+        overlay.finish()
+
+    def get_frame(self):
+        resolution = self.telescope.get_resolution()
+        canvas, frame_number, orientation, fov = self.telescope.get_frame_info()
+
+        state = (orientation, fov)
+        new_frame = frame_number != self.frame_number
+        if not new_frame and state == self.frame_state:
+            return self.frame
 
-    
\ No newline at end of file
+        if new_frame and state != self.overlay_state:
+            # slewing changes the overlay with every frame, a layer would only add a composite to drawing it
+            # the telescope renders into the next pooled frame, the overlay goes onto a copy the assistant owns
+            with self.profiler.span(f"{self.stage}.copy"):
+                np.copyto(self.frame, canvas)
+            with self.profiler.span(f"{self.stage}.overlay"):
+                self.draw_overlay(FrameOverlay(self.frame), resolution, fov, orientation)
+            self.direct = True
+        else:
+            dirty = []
+            if state != self.overlay_state:
+                with self.profiler.span(f"{self.stage}.overlay"):
+                    dirty = self.overlay.clear()
+                    self.draw_overlay(self.overlay, resolution, fov, orientation)
+                    dirty += self.overlay.rects
+                self.overlay_state = state
+            # a directly drawn overlay is not in the layer's rectangles, the whole frame is redone
+            redo = new_frame or self.direct
+            if redo:
+                with self.profiler.span(f"{self.stage}.copy"):
+                    np.copyto(self.frame, canvas)
+            with self.profiler.span(f"{self.stage}.composite"):
+                self.overlay.composite(canvas, self.frame, self.overlay.rects if redo else dirty)
+            self.direct = False
+        self.frame_number = frame_number
+        self.frame_state = state
+        self.frame_version += 1
+        return self.frame
@@ -30,7 +30,40 @@ class Config(dict):
             "TELESCOPE_FOVX": 1.6,
             "TELESCOPE_FOVY": 0.9,
             "TELESCOPE_STREAM_WIDTH": 1920,
-            "TELESCOPE_STREAM_HEIGHT": 1080
+            "TELESCOPE_STREAM_HEIGHT": 1080,
+            "SKY_ATLAS": False,
+            "SKY_ATLAS_ZOOM_LEVELS": [1, 2],
+            "STAR_CATALOGUE": "",
+            "EPHEMERIS_PERIOD": 10.0,
+            "IDLE_FRAME_PERIOD": 1.0,
+            "ACTIVE_FRAME_HOLD": 2.0,
+            "RENDER_THREADS": 2,
+            "SLEW_RATE": 2.0,
+            "SLEW_ACCELERATION": 8.0,
+            "ZOOM_RATE": 4.0,
+            "ZOOM_ACCELERATION": 16.0,
+            "TELESCOPE_COUNT": 1,
+            "RENDER_WORKERS": 0,
+            "CELESTIAL_CACHE_DIR": ".celestial_cache",
+            "CELESTIAL_CACHE_TTL": 3600.0,
+            "CELESTIAL_CACHE_MAX_STALE": 604800.0,
+            "API_TIMEOUT": 10.0,
+            "API_RETRIES": 3,
+            "HEARTBEAT_PERIOD": 30.0,
+            "TELEMETRY_STATE_PERIOD": 0.5,
+            "TELEMETRY_METRICS_PERIOD": 5.0,
+            "TELEMETRY_KEYFRAME_INTERVAL": 20,
+            "PROFILING_PORT": 0,
+            "PROFILING_DUMP_PATH": "",
+            "PROFILING_DUMP_PERIOD": 10.0,
+            "PROFILING_SAMPLING": False,
+            "PROFILING_DIR": "profiles",
+            "SKY_TEXTURE": False,
+            "TERRAIN_TEXTURE": False,
+            "TEXTURE_SEED": 0,
+            "STAR_PSF": True,
+            "SIMULCAST_LAYERS": [],
+            "WARM_START_PATH": ""
         }
         return default_config
 
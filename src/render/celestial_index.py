@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+
+
+class CelestialIndex:
+    def __init__(self, azimuths, altitudes, cell_size=math.radians(1)):
+        """
+        Wrapped grid over (azimuth, altitude) for field of view queries.
+        :param azimuths: Azimuth of every object in radians.
+        :param altitudes: Altitude of every object in radians.
+        :param cell_size: Grid cell size in radians.
+        """
+        self.azimuths = np.mod(np.asarray(azimuths, dtype=np.float64), 2 * math.pi)
+        self.altitudes = np.asarray(altitudes, dtype=np.float64)
+        self.cell_size = cell_size
+        self.columns = int(math.ceil(2 * math.pi / cell_size))
+        # columns evenly split the full circle so ranges wrap around cleanly
+        self.column_size = 2 * math.pi / self.columns
+        self.rows = int(math.ceil(math.pi / cell_size)) + 1
+
+        cells = self.cell_row(self.altitudes) * self.columns + self.cell_column(self.azimuths)
+        # objects sorted by cell, cell_start[c]:cell_start[c + 1] are the objects of cell c
+        self.order = np.argsort(cells, kind="stable")
+        self.cell_start = np.searchsorted(cells[self.order], np.arange(self.rows * self.columns + 1))
+        self.sorted_azimuths = self.azimuths[self.order]
+        self.sorted_altitudes = self.altitudes[self.order]
+
+    @classmethod
+    def from_celestials(cls, celestials, cell_size=math.radians(1)):
+        return cls([celestial.gha for celestial in celestials], [celestial.hc for celestial in celestials], cell_size)
+
+    def __len__(self):
+        return len(self.azimuths)
+
+    def cell_row(self, altitude):
+        return np.clip(((altitude + math.pi / 2) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+
+    def cell_column(self, azimuth):
+        return np.clip((azimuth // self.column_size).astype(np.int64), 0, self.columns - 1)
+
+    def candidate_ranges(self, azimuth, elevation, fovx, fovy):
+        first_row, last_row = self.cell_row(np.array([elevation - fovy / 2, elevation + fovy / 2]))
+        span = int(math.ceil(fovx / self.column_size)) + 1
+        if span >= self.columns:
+            column_ranges = [(0, self.columns)]
+        else:
+            first_column = min(int(((azimuth - fovx / 2) % (2 * math.pi)) // self.column_size), self.columns - 1)
+            if first_column + span <= self.columns:
+                column_ranges = [(first_column, first_column + span)]
+            else:
+                column_ranges = [(first_column, self.columns), (0, first_column + span - self.columns)]
+        for row in range(first_row, last_row + 1):
+            for first, last in column_ranges:
+                yield self.cell_start[row * self.columns + first], self.cell_start[row * self.columns + last]
+
+    def query(self, azimuth, elevation, fovx, fovy, width, height):
+        """
+        Find the objects inside the field of view and project them to pixels.
+        :return: Tuple of (indices, x, y) arrays, indices refer to the construction order.
+        """
+        slices = [slice(start, stop) for start, stop in self.candidate_ranges(azimuth, elevation, fovx, fovy) if stop > start]
+        if not slices:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        candidates = np.concatenate([np.arange(s.start, s.stop) for s in slices])
+
+        relative_azimuth = np.mod(self.sorted_azimuths[candidates] - azimuth + math.pi, 2 * math.pi) - math.pi
+        relative_elevation = self.sorted_altitudes[candidates] - elevation
+        visible = (np.abs(relative_azimuth) <= fovx / 2) & (np.abs(relative_elevation) <= fovy / 2)
+
+        x = (width * (0.5 + relative_azimuth[visible] / fovx)).astype(np.int64)
+        y = (height * (0.5 - relative_elevation[visible] / fovy)).astype(np.int64)
+        return self.order[candidates[visible]], x, y
@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.render.celestial_index import CelestialIndex
+from src.utils.ephemeris import PLANETS
+
+
+def sprite_kinds(names):
+    """
+    :param names: Array of lowercase object names.
+    :return: Array of the sprite each object is drawn with, "moon", "planet" or "star".
+    """
+    names = np.asarray(names)
+    return np.where(names == "moon", "moon", np.where(np.isin(names, PLANETS), "planet", "star"))
+
+
+class CelestialSky:
+    def __init__(self, names, gha, hc, magnitudes, index=None):
+        """
+        Objects above the horizon at one instant as arrays, with the index and sprite kinds every telescope and
+        assistant of a host shares. Never modified, an update replaces it whole.
+        :param names: Lowercase object names.
+        :param gha: Greenwich hour angle of every object in radians, drawn as its azimuth.
+        :param hc: Altitude of every object in radians.
+        :param magnitudes: Apparent magnitude of every object.
+        :param index: Index over gha and hc, built here when None.
+        """
+        self.names = np.asarray(names, dtype=str)
+        self.gha = np.asarray(gha, dtype=np.float64)
+        self.hc = np.asarray(hc, dtype=np.float64)
+        self.magnitudes = np.asarray(magnitudes, dtype=np.float32)
+        self.sprites = sprite_kinds(self.names)
+        self.index = index if index is not None else CelestialIndex(self.gha, self.hc)
+
+    @classmethod
+    def from_celestials(cls, celestials, index=None):
+        return cls([celestial.object_name for celestial in celestials], [celestial.gha for celestial in celestials],
+                   [celestial.hc for celestial in celestials], [celestial.magnitude for celestial in celestials], index)
+
+    def __len__(self):
+        return len(self.names)
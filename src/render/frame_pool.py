@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class FramePool:
+    def __init__(self, width, height, size=3):
+        """
+        Ring of preallocated RGBA frames reused across renders.
+        :param size: Number of frames, a frame is reused after size further acquires.
+        """
+        self.width = width
+        self.height = height
+        self.frames = []
+        for _ in range(size):
+            frame = np.empty((height, width, 4), dtype=np.uint8)
+            frame[:, :, 3] = 255
+            self.frames.append(frame)
+        self.next = 0
+
+    def acquire(self):
+        frame = self.frames[self.next]
+        self.next = (self.next + 1) % len(self.frames)
+        return frame
+
+
+def frame_memoryview(frame):
+    """
+    Flat memoryview over a contiguous frame, accepted by rtc.VideoFrame without copying.
+    """
+    return memoryview(frame.reshape(-1))
@@ -0,0 +1,102 @@
+import numpy as np
+import cv2
+
+
+def row_bands(rects):
+    """
+    Merge rectangles into disjoint bands of rows covering all of them, so pixels under overlapping rectangles are
+    processed once.
+    :param rects: List of (x0, y0, x1, y1).
+    :return: List of (x0, y0, x1, y1), no two of them share a row.
+    """
+    bands = []
+    for x0, y0, x1, y1 in sorted(rects, key=lambda rect: rect[1]):
+        if bands and y0 < bands[-1][3]:
+            band_x0, band_y0, band_x1, band_y1 = bands[-1]
+            bands[-1] = (min(band_x0, x0), band_y0, max(band_x1, x1), max(band_y1, y1))
+        else:
+            bands.append((x0, y0, x1, y1))
+    return bands
+
+
+class OverlayLayer:
+    def __init__(self, width, height):
+        """
+        Premultiplied RGBA layer drawn over frames, tracking the rectangles it covers.
+        """
+        self.width = width
+        self.height = height
+        self.layer = np.zeros((height, width, 4), dtype=np.uint8)
+        self.inverse_alpha = np.full((height, width, 4), 255, dtype=np.uint8)
+        self.scratch = np.empty((height, width, 4), dtype=np.uint8)
+        self.rects = []
+
+    def clear(self):
+        """
+        Erase everything drawn so far.
+        :return: Rectangles that were covered, they need compositing again.
+        """
+        for x0, y0, x1, y1 in self.rects:
+            self.layer[y0:y1, x0:x1] = 0
+            self.inverse_alpha[y0:y1, x0:x1] = 255
+        rects, self.rects = self.rects, []
+        return rects
+
+    def add_rect(self, x0, y0, x1, y1):
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x0 < x1 and y0 < y1:
+            self.rects.append((x0, y0, x1, y1))
+
+    # drawing on a transparent black layer leaves premultiplied colour and coverage in alpha
+    def circle(self, center, radius, color, thickness):
+        cv2.circle(self.layer, center, radius, color, thickness)
+        reach = radius + thickness
+        self.add_rect(center[0] - reach, center[1] - reach, center[0] + reach + 1, center[1] + reach + 1)
+
+    def text(self, text, origin, font, font_scale, color, thickness):
+        cv2.putText(self.layer, text, origin, font, font_scale, color, thickness, cv2.LINE_AA)
+        (width, height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        self.add_rect(origin[0] - thickness, origin[1] - height - thickness,
+                      origin[0] + width + thickness, origin[1] + baseline + thickness)
+
+    def finish(self):
+        """
+        Done drawing, the covered rectangles become disjoint bands and the coverage is updated under them.
+        """
+        self.rects = row_bands(self.rects)
+        for x0, y0, x1, y1 in self.rects:
+            inverse = cv2.bitwise_not(cv2.extractChannel(self.layer[y0:y1, x0:x1], 3))
+            # broadcast into all four channels, frames are opaque so alpha saturates to 255 either way
+            cv2.cvtColor(inverse, cv2.COLOR_GRAY2RGBA, self.inverse_alpha[y0:y1, x0:x1])
+
+    def composite(self, base, out, rects):
+        """
+        Recompute out = layer over base inside the given rectangles only.
+        """
+        for x0, y0, x1, y1 in rects:
+            background = cv2.multiply(base[y0:y1, x0:x1], self.inverse_alpha[y0:y1, x0:x1],
+                                      self.scratch[y0:y1, x0:x1], 1 / 255)
+            cv2.add(background, self.layer[y0:y1, x0:x1], out[y0:y1, x0:x1])
+
+
+class FrameOverlay:
+    def __init__(self, frame):
+        """
+        The drawing calls of OverlayLayer straight onto a frame, for overlays that change with every frame.
+        """
+        self.frame = frame
+
+    def circle(self, center, radius, color, thickness):
+        cv2.circle(self.frame, center, radius, color, thickness)
+
+    def text(self, text, origin, font, font_scale, color, thickness):
+        cv2.putText(self.frame, text, origin, font, font_scale, color, thickness, cv2.LINE_AA)
+        # antialiasing writes coverage into the alpha channel too, frames stay opaque
+        (width, height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        y0, y1 = max(origin[1] - height - thickness, 0), max(origin[1] + baseline + thickness, 0)
+        x0, x1 = max(origin[0] - thickness, 0), max(origin[0] + width + thickness, 0)
+        self.frame[y0:y1, x0:x1, 3] = 255
+
+    def finish(self):
+        pass
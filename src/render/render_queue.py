@@ -0,0 +1,48 @@
+import threading
+import time
+from src.utils.latency_histogram import LatencyHistogram
+
+
+class RenderQueue:
+    def __init__(self, render, executor):
+        """
+        Runs render on an executor, coalescing requests that arrive while a render is in flight.
+        :param render: Callable doing one full render and publishing its result.
+        :param executor: concurrent.futures executor the renders run on.
+        """
+        self.render = render
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.running = False
+        self.pending = False
+        self.renders = 0
+        self.coalesced = 0
+        self.render_time = LatencyHistogram()
+
+    def request(self):
+        """
+        Ask for a render of the latest state, safe to call from any thread and never blocks.
+        """
+        with self.lock:
+            if self.running:
+                if self.pending:
+                    self.coalesced += 1
+                self.pending = True
+                return
+            self.running = True
+        self.executor.submit(self.run)
+
+    def run(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                self.render()
+            except Exception as e:
+                print(f"render failed: {e}")
+            self.render_time.record(time.perf_counter() - start)
+            self.renders += 1
+            with self.lock:
+                if not self.pending:
+                    self.running = False
+                    return
+                self.pending = False
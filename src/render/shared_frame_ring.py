@@ -0,0 +1,72 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedFrameRing:
+    HEADER_SIZE = 64
+
+    def __init__(self, width, height, slots=3, name=None):
+        """
+        Latest-frame ring of RGBA frames in shared memory, written by one worker process and read in place by the publisher.
+        :param width: Frame width in pixels.
+        :param height: Frame height in pixels.
+        :param slots: Frames in the ring, the reader has slots - 2 frames of headroom before a slot is reused.
+        :param name: Shared memory block to attach to, a new block is created when None.
+        """
+        self.slots = slots
+        self.owner = name is None
+        size = self.HEADER_SIZE + slots * width * height * 4
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.name = self.memory.name
+        buffer = self.memory.buf
+        # header: published sequence, writer token, then the view the frame was rendered with
+        self.sequence = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=0)
+        self.writer = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=8)
+        self.state = np.ndarray((3,), dtype=np.float64, buffer=buffer, offset=16)
+        self.frames = np.ndarray((slots, height, width, 4), dtype=np.uint8, buffer=buffer, offset=self.HEADER_SIZE)
+        if self.owner:
+            self.sequence[0] = 0
+            self.writer[0] = 0
+
+    def set_writer(self, token):
+        """
+        Hand the ring to another writer, writes from any other token are dropped from now on.
+        """
+        self.writer[0] = token
+
+    def write(self, frame, state, token):
+        """
+        :param frame: RGBA frame to publish.
+        :param state: (azimuth, elevation, zoom) the frame was rendered with.
+        :param token: Token of the writing worker.
+        :return: False when the ring belongs to another writer.
+        """
+        if self.writer[0] != token:
+            return False
+        sequence = int(self.sequence[0]) + 1
+        np.copyto(self.frames[sequence % self.slots], frame)
+        self.state[:] = state
+        self.sequence[0] = sequence
+        return True
+
+    def read(self):
+        """
+        :return: Tuple of (sequence, frame), the frame is a view into shared memory and None before the first write.
+        """
+        sequence = int(self.sequence[0])
+        if sequence == 0:
+            return sequence, None
+        return sequence, self.frames[sequence % self.slots]
+
+    def is_torn(self, sequence):
+        """
+        Whether the writer may have started overwriting the slot of the given sequence.
+        """
+        return int(self.sequence[0]) - sequence >= self.slots - 1
+
+    def close(self):
+        # numpy views keep the buffer exported, drop them before closing the mapping
+        self.sequence = self.writer = self.state = self.frames = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -0,0 +1,143 @@
+import math
+import threading
+
+import numpy as np
+import cv2
+
+
+class SkyAtlas:
+    def __init__(self, width, height, base_fovx, base_fovy, sky_color, compositor, levels=(1,)):
+        """
+        Panoramic pre-render of the sky covering the full azimuth circle.
+        :param width: Width of the served frames.
+        :param height: Height of the served frames.
+        :param levels: Zoom levels an atlas is rendered for, built lazily.
+        """
+        self.width = width
+        self.height = height
+        self.base_fovx = base_fovx
+        self.base_fovy = base_fovy
+        self.sky_color = sky_color
+        self.compositor = compositor
+        self.levels = sorted(levels)
+        # the view centre is kept within [0, pi/2] so the panorama needs half a field of view margin
+        self.altitude_top = math.pi / 2 + base_fovy / 2
+        self.altitude_bottom = -base_fovy / 2
+        self.objects = []
+        self.atlases = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.building = False
+        self.on_ready = None
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.crop = np.empty((0, 0, 3), dtype=np.uint8)
+
+    def set_objects(self, objects, on_ready=None):
+        """
+        Replace the sky content. Rendered atlases keep being served while their successors are built in the
+        background, so a sky update never stalls a render.
+        :param objects: List of (azimuth, altitude, sprite) tuples.
+        :param on_ready: Called from the build thread once the new atlases are swapped in.
+        """
+        with self.lock:
+            self.objects = objects
+            self.generation += 1
+            if not self.atlases:
+                return
+            self.on_ready = on_ready
+            if self.building:
+                return
+            self.building = True
+        threading.Thread(target=self.rebuild, daemon=True, name="sky-atlas").start()
+
+    def rebuild(self):
+        while True:
+            with self.lock:
+                generation, objects, levels = self.generation, self.objects, list(self.atlases)
+            atlases = {level: self.render_atlas(level, objects) for level in levels}
+            with self.lock:
+                # the objects changed again while building, build the latest ones
+                if generation != self.generation:
+                    continue
+                self.atlases = {**self.atlases, **atlases}
+                self.building = False
+                on_ready = self.on_ready
+            if on_ready is not None:
+                on_ready()
+            return
+
+    def scale(self, level):
+        return self.width * level / self.base_fovx, self.height * level / self.base_fovy
+
+    def level_for(self, zoom):
+        for level in self.levels:
+            if level >= zoom:
+                return level
+        return self.levels[-1]
+
+    def build(self, level):
+        with self.lock:
+            generation, objects = self.generation, self.objects
+        atlas = self.render_atlas(level, objects)
+        with self.lock:
+            # set_objects may run on another thread, an atlas of outdated objects is not kept
+            if generation == self.generation:
+                self.atlases[level] = atlas
+        return atlas
+
+    def render_atlas(self, level, objects):
+        scale_x, scale_y = self.scale(level)
+        atlas_w = int(round(2 * math.pi * scale_x))
+        atlas_h = int(round((self.altitude_top - self.altitude_bottom) * scale_y))
+        atlas = np.full((atlas_h, atlas_w, 3), fill_value=self.sky_color, dtype=np.uint8)
+        for azimuth, altitude, sprite in objects:
+            x = int((azimuth + math.pi) % (2 * math.pi) * scale_x)
+            y = int((self.altitude_top - altitude) * scale_y)
+            self.compositor.blend(atlas, sprite, x, y)
+            # sprites straddling the seam also show up on the other side
+            if x < sprite.width:
+                self.compositor.blend(atlas, sprite, x + atlas_w, y)
+            elif x > atlas_w - sprite.width:
+                self.compositor.blend(atlas, sprite, x - atlas_w, y)
+        return atlas
+
+    def get_atlas(self, level):
+        atlas = self.atlases.get(level)
+        if atlas is None:
+            atlas = self.build(level)
+        return atlas
+
+    def copy_wrapped(self, atlas, x0, y0, crop_w, crop_h, out):
+        atlas_w = atlas.shape[1]
+        rows = slice(y0, y0 + crop_h)
+        x0 %= atlas_w
+        first = min(crop_w, atlas_w - x0)
+        out[:, :first] = atlas[rows, x0:x0 + first]
+        if first < crop_w:
+            out[:, first:] = atlas[rows, :crop_w - first]
+
+    def view(self, azimuth, elevation, zoom, out=None):
+        """
+        Serve the sky seen at the given orientation and zoom.
+        :param out: Frame to write into, a buffer owned by the atlas by default.
+        :return: The written frame.
+        """
+        out = self.frame if out is None else out
+        level = self.level_for(zoom)
+        atlas = self.get_atlas(level)
+        scale_x, scale_y = self.scale(level)
+        crop_w = min(int(round(self.width * level / zoom)), atlas.shape[1])
+        crop_h = min(int(round(self.height * level / zoom)), atlas.shape[0])
+        x0 = int(round((azimuth + math.pi) * scale_x - crop_w / 2))
+        y0 = int(round((self.altitude_top - elevation) * scale_y - crop_h / 2))
+        y0 = max(min(y0, atlas.shape[0] - crop_h), 0)
+
+        if crop_w == self.width and crop_h == self.height:
+            self.copy_wrapped(atlas, x0, y0, crop_w, crop_h, out)
+            return out
+
+        if self.crop.shape[0] != crop_h or self.crop.shape[1] != crop_w:
+            self.crop = np.empty((crop_h, crop_w, 3), dtype=np.uint8)
+        self.copy_wrapped(atlas, x0, y0, crop_w, crop_h, self.crop)
+        interpolation = cv2.INTER_AREA if crop_w > self.width else cv2.INTER_LINEAR
+        return cv2.resize(self.crop, (self.width, self.height), out, interpolation=interpolation)
@@ -0,0 +1,68 @@
+import numpy as np
+import cv2
+
+
+class Sprite:
+    def __init__(self, image):
+        """
+        Premultiply an image for compositing.
+        :param image: RGBA (or opaque RGB) uint8 image.
+        """
+        self.height, self.width = image.shape[:2]
+        if image.shape[-1] == 4:
+            alpha = image[:, :, 3:4].astype(np.uint16)
+        else:
+            alpha = np.full((self.height, self.width, 1), 255, dtype=np.uint16)
+        color = image[:, :, :3].astype(np.uint16)
+        self.premultiplied = ((color * alpha + 127) // 255).astype(np.uint8)
+        self.inverse_alpha = np.repeat(255 - alpha, 3, axis=2).astype(np.uint8)
+
+    @classmethod
+    def from_premultiplied(cls, image):
+        """
+        :param image: RGBA uint8 image whose colour is already multiplied by its alpha.
+        """
+        sprite = cls.__new__(cls)
+        sprite.height, sprite.width = image.shape[:2]
+        sprite.premultiplied = np.ascontiguousarray(image[:, :, :3])
+        sprite.inverse_alpha = np.repeat(255 - image[:, :, 3:4], 3, axis=2)
+        return sprite
+
+
+class SpriteCompositor:
+    def __init__(self):
+        self.buffer = np.empty((0, 0, 3), dtype=np.uint8)
+
+    def scratch(self, height, width):
+        if self.buffer.shape[0] < height or self.buffer.shape[1] < width:
+            self.buffer = np.empty((max(height, self.buffer.shape[0]), max(width, self.buffer.shape[1]), 3), dtype=np.uint8)
+        return self.buffer[:height, :width]
+
+    def blend(self, canvas, sprite, x, y):
+        """
+        Draw a sprite centered at (x, y), clipping it at the canvas edges.
+        """
+        canvas_h, canvas_w = canvas.shape[:2]
+        top = y - sprite.height // 2
+        left = x - sprite.width // 2
+        y_min = max(top, 0)
+        x_min = max(left, 0)
+        y_max = min(top + sprite.height, canvas_h)
+        x_max = min(left + sprite.width, canvas_w)
+        if y_min >= y_max or x_min >= x_max:
+            return
+
+        region = canvas[y_min:y_max, x_min:x_max]
+        rows = slice(y_min - top, y_max - top)
+        cols = slice(x_min - left, x_max - left)
+
+        # out = premultiplied + round(dst * (255 - alpha) / 255), saturating 8-bit ops written in place
+        background = cv2.multiply(region, sprite.inverse_alpha[rows, cols], self.scratch(y_max - y_min, x_max - x_min), 1 / 255)
+        cv2.add(background, sprite.premultiplied[rows, cols], region)
+
+    def blend_many(self, canvas, sprite, positions):
+        """
+        Draw the same sprite at every (x, y) in positions, in order.
+        """
+        for x, y in positions:
+            self.blend(canvas, sprite, int(x), int(y))
@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+import cv2
+
+
+class StarSplatter:
+    # flux is quantized to 8 bits at this many steps per unit before tone mapping, 255 steps reach alpha 250
+    FLUX_STEPS = 64
+    # below this share of touched pixels only those are tone mapped, above it whole rows are
+    SPARSE_SHARE = 1 / 16
+
+    def __init__(self, width, height, color, brightest=-1.5, faintest=9.0, bins=22, sigma=0.7, saturation=3.0,
+                 gamma=0.4, max_radius=6):
+        """
+        Draws stars as Gaussian point spread functions scaled by their magnitude, all stars of a frame at once.
+        :param color: RGB colour of a saturated star.
+        :param brightest: Magnitude of the first bin, brighter stars share it.
+        :param faintest: Magnitude of the last bin, fainter stars share it.
+        :param bins: Number of magnitude bins, one precomputed kernel each.
+        :param sigma: PSF width in pixels of a star at the saturation magnitude.
+        :param saturation: Magnitude whose peak reaches 1 - 1/e of the star colour.
+        :param gamma: Flux exponent, below 1 keeps faint stars visible against the sky.
+        :param max_radius: Largest kernel radius, the halo of the brightest stars is cut there.
+        """
+        self.width = width
+        self.height = height
+        self.color = color
+        self.brightest = brightest
+        self.faintest = faintest
+        self.bins = bins
+        self.bin_size = (faintest - brightest) / (bins - 1)
+        self.padding = max_radius
+        # padded so kernels at the edges need no clipping, the padding is cut off before tone mapping
+        self.flux = np.zeros((height + 2 * max_radius, width + 2 * max_radius), dtype=np.float32)
+        self.alpha = np.empty((height, width), dtype=np.uint8)
+        steps = np.arange(256) / self.FLUX_STEPS
+        self.tone_curve = np.rint(255 * (1 - np.exp(-steps))).astype(np.uint8)
+        self.alpha3 = np.empty((height, width, 3), dtype=np.uint8)
+        self.inverse_alpha3 = np.empty((height, width, 3), dtype=np.uint8)
+        self.foreground = np.empty((height, width, 3), dtype=np.uint8)
+        self.color_plane = np.full((height, width, 3), fill_value=color, dtype=np.uint8)
+        self.kernels = []
+        for index in range(bins):
+            magnitude = brightest + index * self.bin_size
+            peak = 10 ** (-0.4 * gamma * (magnitude - saturation))
+            # bright stars bloom, their PSF widens with the peak the way an overexposed core spreads
+            spread = sigma * max(1.0, peak) ** 0.5
+            radius = min(max_radius, max(1, int(math.ceil(2.5 * spread))))
+            offsets = np.arange(-radius, radius + 1)
+            dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+            kernel = peak * np.exp(-(dx * dx + dy * dy) / (2 * spread * spread))
+            flat_offsets = (dy * self.flux.shape[1] + dx).ravel()
+            self.kernels.append((flat_offsets, kernel.ravel().astype(np.float32)))
+
+    def magnitude_bins(self, magnitudes):
+        bins = np.rint((np.asarray(magnitudes, dtype=np.float64) - self.brightest) / self.bin_size)
+        return np.clip(np.nan_to_num(bins, nan=self.bins - 1), 0, self.bins - 1).astype(np.int64)
+
+    def draw(self, canvas, xs, ys, magnitudes):
+        """
+        Add stars to an RGB canvas.
+        :param xs: Pixel columns of the star centres.
+        :param ys: Pixel rows of the star centres.
+        :param magnitudes: Apparent magnitude of every star.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.any():
+            return
+        xs, ys = xs[inside], ys[inside]
+        bins = self.magnitude_bins(np.asarray(magnitudes)[inside])
+        top = max(int(ys.min()) - self.padding, 0)
+        bottom = min(int(ys.max()) + self.padding + 1, self.height)
+
+        stride = self.flux.shape[1]
+        centres = (ys + self.padding) * stride + xs + self.padding
+        flux = self.flux.reshape(-1)
+        touched = []
+        for index in np.unique(bins).tolist():
+            flat_offsets, kernel = self.kernels[index]
+            members = centres[bins == index]
+            taps = (members[:, None] + flat_offsets).ravel()
+            np.add.at(flux, taps, np.tile(kernel, len(members)))
+            touched.append(taps)
+
+        touched = np.concatenate(touched)
+        if len(touched) < self.SPARSE_SHARE * (bottom - top) * self.width:
+            self.draw_sparse(canvas, np.unique(touched))
+        else:
+            self.draw_dense(canvas, top, bottom)
+
+    def draw_sparse(self, canvas, touched):
+        flux = self.flux.reshape(-1)
+        values = flux[touched]
+        flux[touched] = 0
+        rows = touched // self.flux.shape[1] - self.padding
+        columns = touched % self.flux.shape[1] - self.padding
+        inside = (rows >= 0) & (rows < self.height) & (columns >= 0) & (columns < self.width)
+        rows, columns, values = rows[inside], columns[inside], values[inside]
+        steps = np.minimum(np.rint(values * self.FLUX_STEPS), 255).astype(np.intp)
+        alpha = self.tone_curve[steps].astype(np.uint16)[:, None]
+        pixels = canvas[rows, columns].astype(np.uint16)
+        color = np.asarray(self.color, dtype=np.uint16)
+        canvas[rows, columns] = ((pixels * (255 - alpha) + color * alpha + 127) // 255).astype(np.uint8)
+
+    def draw_dense(self, canvas, top, bottom):
+        # tone map the touched rows: alpha = 1 - exp(-flux) through a lookup table, then blend the star colour in with it
+        rows = self.flux[top + self.padding:bottom + self.padding, self.padding:self.padding + self.width]
+        alpha = cv2.convertScaleAbs(rows, self.alpha[top:bottom], self.FLUX_STEPS)
+        alpha = cv2.LUT(alpha, self.tone_curve, alpha)
+        alpha3 = cv2.merge([alpha, alpha, alpha], self.alpha3[top:bottom])
+        inverse_alpha3 = cv2.bitwise_not(alpha3, self.inverse_alpha3[top:bottom])
+        foreground = cv2.multiply(alpha3, self.color_plane[top:bottom], self.foreground[top:bottom], 1 / 255)
+        region = canvas[top:bottom]
+        # the canvas rows become their own background in place, as the sprite compositor does with its scratch
+        cv2.multiply(region, inverse_alpha3, region, 1 / 255)
+        cv2.add(region, foreground, region)
+        self.flux[top:bottom + 2 * self.padding].fill(0)
@@ -0,0 +1,57 @@
+import math
+import numpy as np
+import cv2
+
+
+class TerrainRenderer:
+    def __init__(self, width, height, color, texture=None):
+        """
+        :param color: Land colour, used when there is no texture.
+        :param texture: Land covering the azimuth circle at zoom 1 followed by a repeat of its first width columns,
+            shape (height, tile width + width, 3), so every view is one slice.
+        """
+        self.width = width
+        self.height = height
+        self.color = color
+        self.columns = np.arange(width, dtype=np.float64)
+        self.rows = np.arange(height, dtype=np.int32)[:, None]
+        self.land = np.full((height, width, 3), fill_value=color, dtype=np.uint8)
+        self.mask = np.empty((height, width), dtype=bool)
+        self.texture = texture
+        self.tile_width = None if texture is None else texture.shape[1] - width
+
+    def horizon(self, azimuth, elevation, fovx, fovy):
+        """
+        Compute the first land row of every column.
+        :return: Array of row indices in [0, height], height meaning no land in the column.
+        """
+        land_height = self.height * (1 - (2 * elevation / fovy))
+        amplitude = self.width / 20
+        az = azimuth + self.columns * fovx / self.width
+        first_row = (land_height + amplitude * np.sin(2 * az)).astype(np.int64)
+        # negative rows count from the bottom edge, the same way slice indexing does
+        first_row = np.where(first_row < 0, np.maximum(first_row + self.height, 0), first_row)
+        return np.minimum(first_row, self.height)
+
+    def land_view(self, azimuth):
+        if self.texture is None:
+            return self.land
+        # the texture scrolls with the azimuth at its zoom 1 scale
+        offset = int(azimuth % (2 * math.pi) / (2 * math.pi) * self.tile_width) % self.tile_width
+        return self.texture[:, offset:offset + self.width]
+
+    def draw(self, canvas, azimuth, elevation, fovx, fovy):
+        first_row = self.horizon(azimuth, elevation, fovx, fovy)
+        top = int(first_row.min())
+        bottom = int(first_row.max())
+        land = self.land_view(azimuth)
+
+        # rows below the lowest horizon point are all land, fill them in one go
+        if bottom < self.height:
+            if self.texture is None:
+                cv2.rectangle(canvas, (0, bottom), (self.width - 1, self.height - 1), self.color, -1)
+            else:
+                np.copyto(canvas[bottom:], land[bottom:])
+        if bottom > top:
+            mask = np.greater_equal(self.rows[top:bottom], first_row, out=self.mask[top:bottom])
+            cv2.copyTo(land[top:bottom], mask.view(np.uint8), canvas[top:bottom])
@@ -0,0 +1,51 @@
+from src.telescopes.telescope_mock import TelescopeMock
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.utils.profiler import Profiler
+
+
+class SimulcastLayer:
+    def __init__(self, name, telescope: TelescopeMock, assistant: TelescopeAssistant, interval=1, profiler: Profiler = None):
+        """
+        A lower resolution of a telescope's stream, rendered natively at its own size instead of downscaled.
+        :param name: Layer name, e.g. "540p", names its track and its profiler stages.
+        :param telescope: Telescope rendering this layer, it follows the view of the full resolution one.
+        :param assistant: Overlay of this layer.
+        :param interval: Host frames between refreshes, lower layers are refreshed at lower rates.
+        :param profiler: Profiler of the host, times publishing this layer.
+        """
+        self.name = name
+        self.telescope = telescope
+        self.assistant = assistant
+        self.interval = max(int(interval), 1)
+        self.profiler = profiler or Profiler()
+        self.ticks = 0
+        self.view_version = None
+        self.frame_version = None
+        self.published = 0
+
+    def set_sky(self, sky):
+        self.telescope.set_sky(sky)
+        self.assistant.set_sky(sky)
+
+    def process_frame(self, source: TelescopeMock, publisher, keep_alive):
+        """
+        Every interval frames follow the view of the full resolution telescope and publish this layer's frame if it changed.
+        :param source: Full resolution telescope.
+        :param publisher: Publisher of the session, the frame goes to the track of this layer.
+        :param keep_alive: Publish even an unchanged frame, the session sends its keep-alive frame.
+        """
+        self.ticks += 1
+        if self.ticks < self.interval and not keep_alive:
+            return
+        self.ticks = 0
+        # the render runs on the render threads, its frame is picked up at the next refresh
+        if source.state_version != self.view_version:
+            self.view_version = source.state_version
+            self.telescope.follow(source)
+        frame = self.assistant.get_frame()
+        changed = self.assistant.frame_version != self.frame_version
+        self.frame_version = self.assistant.frame_version
+        if publisher is not None and (changed or keep_alive):
+            with self.profiler.span(f"publish.{self.name}"):
+                publisher.feed_frame(frame, self.name)
+            self.published += 1
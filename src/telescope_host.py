@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from src.telescope_session import TelescopeSession
+from src.simulcast_layer import SimulcastLayer
+from src.telescopes.telescope_mock import TelescopeMock
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.utils.celestial_data_loader import CelestialDataLoader
+from src.utils.celestial_data_service import CelestialDataService
+from src.utils.resource_loader import ResourceLoader
+from src.utils.frame_scheduler import FrameScheduler
+from src.utils.motion_controller import MotionController
+from src.utils.command_router import CommandRouter
+from src.utils.profiler import Profiler
+from src.utils.warm_start import WarmStart
+
+
+class TelescopeHost:
+    def __init__(self, config, loop, celestial_data_loader=None):
+        """
+        Runs many telescopes on one event loop, sharing sprites, sky data, render threads and the frame scheduler.
+        :param config: Application config, common to all hosted telescopes.
+        :param loop: Event loop the telescopes are driven from.
+        :param celestial_data_loader: Sky data for all telescopes, fetched here when None.
+        """
+        self.config = config
+        self.loop = loop
+        self.warm_start = None
+        if config.get("WARM_START_PATH"):
+            self.warm_start = WarmStart(config["WARM_START_PATH"])
+            self.warm_start.load(ResourceLoader.RESOURCES)
+        warm_start = self.warm_start or WarmStart(None)
+        self.resource_loader = ResourceLoader(2 * TelescopeMock.STAR_SIZE, mips=warm_start.mips, textures=warm_start.textures)
+        self.celestial_data_loader = celestial_data_loader
+        if self.celestial_data_loader is None:
+            self.celestial_data_loader = CelestialDataLoader((config["LATITUDE"], config["LONGITUDE"]),
+                                                             config.get("STAR_CATALOGUE"), CelestialDataService.from_config(config),
+                                                             warm_start.equatorial)
+        self.render_executor = ThreadPoolExecutor(max_workers=config.get("RENDER_THREADS", 2), thread_name_prefix="render")
+        self.scheduler = FrameScheduler(config["FRAME_PERIOD"], config.get("IDLE_FRAME_PERIOD", 1.0),
+                                        config.get("ACTIVE_FRAME_HOLD", 2.0))
+        self.router = CommandRouter(loop)
+        self.profiler = Profiler(config.get("PROFILING_SAMPLING", False), config.get("PROFILING_DIR", "profiles"))
+        self.profiler.add_counter("frames", lambda: self.scheduler.frames)
+        self.profiler.add_counter("missed_deadlines", lambda: self.scheduler.missed_deadlines)
+        self.profiler.add_counter("published_frames", lambda: sum(session.published for session in self.sessions))
+        self.profiler.add_counter("coalesced_renders", lambda: sum(session.telescope.render_queue.coalesced
+                                                                   for session in self.sessions))
+        self.sessions = []
+        self.routes = {}
+        self.next_session = 0
+        self.last_tick = None
+        self.sky_period = config.get("EPHEMERIS_PERIOD", 0)
+        self.next_sky_update = 0
+        self.sky_update = None
+
+    def add_telescope(self, name) -> TelescopeSession:
+        telescope = TelescopeMock(self.config, self.resource_loader, self.celestial_data_loader, self.profiler)
+        telescope.set_render_executor(self.render_executor)
+        assistant = TelescopeAssistant(telescope, celestial_data_loader=self.celestial_data_loader, profiler=self.profiler)
+        motion = MotionController(telescope, self.config.get("SLEW_RATE", 2.0), self.config.get("SLEW_ACCELERATION", 8.0),
+                                  self.config.get("ZOOM_RATE", 4.0), self.config.get("ZOOM_ACCELERATION", 16.0))
+        session = TelescopeSession(name, telescope, assistant, motion, self.scheduler, self.config.get("IDLE_FRAME_PERIOD", 1.0),
+                                   self.profiler)
+        for width, height, interval in self.config.get("SIMULCAST_LAYERS", []):
+            session.layers.append(self.add_layer(telescope, width, height, interval))
+        self.sessions.append(session)
+        return session
+
+    def add_layer(self, telescope: TelescopeMock, width, height, interval) -> SimulcastLayer:
+        name = f"{height}p"
+        scale = height / telescope.stream_height
+        config = dict(self.config, TELESCOPE_STREAM_WIDTH=width, TELESCOPE_STREAM_HEIGHT=height)
+        layer_telescope = TelescopeMock(config, self.resource_loader, self.celestial_data_loader, self.profiler, scale,
+                                        f"render.{name}")
+        layer_telescope.set_render_executor(self.render_executor)
+        layer_telescope.follow(telescope)
+        assistant = TelescopeAssistant(layer_telescope, celestial_data_loader=self.celestial_data_loader,
+                                       profiler=self.profiler, scale=scale, stage=f"assistant.{name}")
+        return SimulcastLayer(name, layer_telescope, assistant, interval, self.profiler)
+
+    def route(self, tid, session: TelescopeSession):
+        session.tid = tid
+        self.routes[tid] = session
+        self.router.route(tid, session)
+
+    def remove_telescope(self, tid):
+        session = self.routes.pop(tid, None)
+        if session is None:
+            return None
+        self.router.unroute(tid)
+        self.sessions.remove(session)
+        self.next_session = 0
+        return session
+
+    async def run(self):
+        if self.warm_start is not None and not self.warm_start.loaded:
+            # written once the telescopes built their textures, off the event loop
+            self.loop.run_in_executor(None, self.save_warm_start)
+        await self.scheduler.run(self.process_frame)
+
+    def save_warm_start(self):
+        try:
+            self.warm_start.save(self.resource_loader, self.celestial_data_loader)
+            self.warm_start.loaded = True
+            print(f"saved warm start snapshot to {self.warm_start.path}")
+        except OSError as e:
+            print(f"failed to save warm start snapshot {self.warm_start.path}: {e}")
+
+    def process_frame(self):
+        with self.profiler.span("tick"):
+            return self.tick()
+
+    def tick(self):
+        now = self.loop.time()
+        if self.sky_period > 0 and now >= self.next_sky_update:
+            self.update_sky()
+            self.next_sky_update = now + self.sky_period
+
+        dt = 0 if self.last_tick is None else min(now - self.last_tick, 0.1)
+        self.last_tick = now
+        if not self.sessions:
+            return False
+        # rotate the starting telescope so none of them always queues its render last
+        start = self.next_session
+        self.next_session = (start + 1) % len(self.sessions)
+        changed = False
+        for session in self.sessions[start:] + self.sessions[:start]:
+            changed = session.process_frame(now, dt) or changed
+        return changed
+
+    def update_sky(self):
+        # propagated and indexed off the event loop, every telescope switches to it in one callback
+        if self.sky_update is not None and not self.sky_update.done():
+            return
+        self.sky_update = self.loop.run_in_executor(None, self.celestial_data_loader.sky_at, datetime.now(timezone.utc))
+        self.sky_update.add_done_callback(self.set_sky)
+
+    def set_sky(self, future):
+        if future.cancelled():
+            return
+        try:
+            sky = future.result()
+        except Exception as e:
+            print(f"sky update failed: {e}")
+            return
+        for session in self.sessions:
+            session.set_sky(sky)
+
+    def on_message(self, client, userdata, msg):
+        # runs on the paho network thread, the router decodes here and batches handlers onto the event loop
+        self.router.submit(msg.topic, msg.payload)
+
+    def handle_message(self, topic, payload):
+        self.router.submit(topic, payload)
+
+    def close(self):
+        self.render_executor.shutdown(wait=True)
@@ -0,0 +1,132 @@
+import time
+from src.telescopes.telescope import Telescope
+from src.assistant.telescope_assistant import TelescopeAssistant
+from src.utils.frame_scheduler import FrameScheduler
+from src.utils.motion_controller import MotionController
+from src.utils.profiler import Profiler
+
+
+class TelescopeSession:
+    def __init__(self, name, telescope: Telescope, assistant: TelescopeAssistant, motion: MotionController,
+                 scheduler: FrameScheduler, idle_period=1.0, profiler: Profiler = None):
+        """
+        One hosted telescope: its commands, motion and stream, driven by the host's frame ticks.
+        :param name: Name the telescope is announced with.
+        :param scheduler: Frame scheduler shared by all telescopes of the host.
+        :param idle_period: Seconds between keep-alive frames while this telescope is static.
+        :param profiler: Profiler of the host, times the assistant and publish stages and takes samples.
+        """
+        self.name = name
+        self.telescope = telescope
+        self.assistant = assistant
+        self.motion = motion
+        self.scheduler = scheduler
+        self.idle_period = idle_period
+        self.profiler = profiler or Profiler()
+        self.tid = None
+        self.publisher = None
+        self.layers = []
+        self.frame_version = None
+        self.next_publish = 0
+        self.published = 0
+        self.metrics_time = time.monotonic()
+        self.metrics_counters = (0, 0, 0)
+        self.layer_published = {}
+
+    def set_sky(self, sky):
+        self.telescope.set_sky(sky)
+        self.assistant.set_sky(sky)
+        for layer in self.layers:
+            layer.set_sky(sky)
+
+    def process_frame(self, now, dt):
+        """
+        Advance the mount and publish the frame if it changed or a keep-alive frame is due.
+        :return: True when the frame changed.
+        """
+        if self.motion.is_moving():
+            self.motion.tick(dt)
+            # keep the full frame rate until the mount settles
+            self.scheduler.notify()
+
+        with self.profiler.span("assistant"):
+            frame = self.assistant.get_frame()
+        changed = self.assistant.frame_version != self.frame_version
+        self.frame_version = self.assistant.frame_version
+        # other telescopes may keep the host at full rate, a static one only sends keep-alive frames
+        keep_alive = now >= self.next_publish
+        for layer in self.layers:
+            layer.process_frame(self.telescope, self.publisher, keep_alive)
+        if self.publisher is not None and (changed or keep_alive):
+            with self.profiler.span("publish"):
+                self.publisher.feed_frame(frame)
+            self.published += 1
+            self.motion.frame_published()
+            self.next_publish = now + self.idle_period
+        return changed
+
+    def command_move(self, da, de, dz):
+        self.motion.enqueue(da, de, dz)
+        self.scheduler.notify()
+
+    def command_spot(self, interesting):
+        self.assistant.set_interesting(interesting)
+        for layer in self.layers:
+            layer.assistant.set_interesting(interesting)
+        self.telescope.move(0, 0, 0)
+        self.scheduler.notify()
+
+    def command_profile(self, mode, seconds):
+        self.profiler.sample(mode, seconds, f"{self.tid}-{mode}")
+
+    def telemetry_state(self):
+        azimuth, elevation = self.telescope.get_orientation()
+        fovx, fovy = self.telescope.get_fov()
+        return {
+            "azimuth": azimuth,
+            "elevation": elevation,
+            "zoom": self.telescope.zoom,
+            "fovx": fovx,
+            "fovy": fovy,
+            "moving": self.motion.is_moving(),
+            "interesting": self.assistant.interesting,
+        }
+
+    def telemetry_metrics(self):
+        """
+        Rates over the time since the previous call, render times since the previous call.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.metrics_time, 1e-9)
+        render_queue = self.telescope.render_queue
+        counters = (self.published, render_queue.renders if render_queue else 0, render_queue.coalesced if render_queue else 0)
+        published, renders, coalesced = (current - last for current, last in zip(counters, self.metrics_counters))
+        self.metrics_time = now
+        self.metrics_counters = counters
+        motion = self.motion.stats()
+        metrics = {
+            "fps": published / elapsed,
+            "renders_per_second": renders / elapsed,
+            "coalesced_renders": coalesced,
+            "command_latency_p50": motion["latency_p50"],
+            "command_latency_p99": motion["latency_p99"],
+            "command_queue_depth": motion["queue_depth"],
+            "missed_deadlines": self.scheduler.missed_deadlines,
+        }
+        if render_queue is not None:
+            metrics["render_time_p50"] = render_queue.render_time.percentile(50)
+            metrics["render_time_p99"] = render_queue.render_time.percentile(99)
+            render_queue.render_time.reset()
+        for layer in self.layers:
+            published = layer.published - self.layer_published.get(layer.name, 0)
+            self.layer_published[layer.name] = layer.published
+            metrics[f"{layer.name}_fps"] = published / elapsed
+            publish_time = self.profiler.stages.get(f"publish.{layer.name}")
+            if publish_time is not None:
+                metrics[f"{layer.name}_publish_time_p50"] = publish_time.percentile(50)
+            render_queue = layer.telescope.render_queue
+            if render_queue is not None:
+                metrics[f"{layer.name}_render_time_p50"] = render_queue.render_time.percentile(50)
+                metrics[f"{layer.name}_render_time_p99"] = render_queue.render_time.percentile(99)
+                render_queue.render_time.reset()
+        return metrics
@@ -0,0 +1,249 @@
+import collections
+import multiprocessing
+import time
+
+import numpy as np
+
+from src.telescope_worker import run_worker
+from src.render.shared_frame_ring import SharedFrameRing
+from src.utils.frame_scheduler import FrameScheduler
+from src.utils.command_router import CommandRouter
+from src.utils.profiler import Profiler
+
+
+class ShardedTelescope:
+    def __init__(self, name, scheduler: FrameScheduler):
+        self.name = name
+        self.scheduler = scheduler
+        self.tid = None
+        self.publisher = None
+        self.layers = []
+        self.ring = None
+        self.frame = None
+        self.worker = None
+        self.sequence = 0
+        self.next_publish = 0
+        self.published = 0
+        self.metrics_time = time.monotonic()
+        self.metrics_published = 0
+
+    def forward(self, command, args):
+        if self.worker is None:
+            return
+        self.worker.commands.put(("command", self.tid, command, args))
+        self.scheduler.notify()
+
+    def command_move(self, da, de, dz):
+        self.forward("move", (da, de, dz))
+
+    def command_spot(self, interesting):
+        self.forward("spot", (interesting,))
+
+    def command_profile(self, mode, seconds):
+        # samples the worker process, where the telescope renders
+        self.forward("profile", (mode, seconds))
+
+    def telemetry_state(self):
+        if self.ring is None:
+            return {}
+        azimuth, elevation, zoom = self.ring.state.tolist()
+        worker = self.worker.index if self.worker is not None else None
+        return {"azimuth": azimuth, "elevation": elevation, "zoom": zoom, "worker": worker}
+
+    def telemetry_metrics(self):
+        now = time.monotonic()
+        fps = (self.published - self.metrics_published) / max(now - self.metrics_time, 1e-9)
+        self.metrics_time = now
+        self.metrics_published = self.published
+        return {"fps": fps, "missed_deadlines": self.scheduler.missed_deadlines}
+
+
+class WorkerHandle:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.commands = None
+        self.telescopes = set()
+        self.crashes = collections.deque()
+        self.retired = False
+
+
+class TelescopeSupervisor:
+    def __init__(self, config, loop, workers, celestial_data_loader=None, max_restarts=3, restart_window=60.0,
+                 supervise_interval=1.0):
+        """
+        Sharded mode of TelescopeHost: telescopes render in worker processes and publish from this one.
+        Frames are read in place from a shared memory ring per telescope.
+        :param config: Application config, common to all hosted telescopes.
+        :param loop: Event loop the publishers run on.
+        :param workers: Number of worker processes.
+        :param celestial_data_loader: Sky data handed to the workers, each worker fetches its own when None.
+        :param max_restarts: Crashes within restart_window after which a worker is retired and its telescopes moved.
+        :param restart_window: Seconds crashes are counted over.
+        :param supervise_interval: Seconds between worker liveness checks.
+        """
+        self.config = config
+        self.loop = loop
+        self.celestial_data_loader = celestial_data_loader
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.supervise_interval = supervise_interval
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = [WorkerHandle(i) for i in range(workers)]
+        self.scheduler = FrameScheduler(config["FRAME_PERIOD"], config.get("IDLE_FRAME_PERIOD", 1.0),
+                                        config.get("ACTIVE_FRAME_HOLD", 2.0))
+        self.idle_period = config.get("IDLE_FRAME_PERIOD", 1.0)
+        self.router = CommandRouter(loop)
+        # render stages are timed in the workers, this one only sees the publishing side
+        self.profiler = Profiler()
+        self.profiler.add_counter("frames", lambda: self.scheduler.frames)
+        self.profiler.add_counter("missed_deadlines", lambda: self.scheduler.missed_deadlines)
+        self.profiler.add_counter("published_frames", lambda: sum(session.published for session in self.sessions))
+        self.profiler.add_counter("torn_frames", lambda: self.torn_frames)
+        self.sessions = []
+        self.routes = {}
+        self.next_token = 0
+        self.next_supervise = 0
+        self.restarts = 0
+        self.torn_frames = 0
+
+    def add_telescope(self, name) -> ShardedTelescope:
+        session = ShardedTelescope(name, self.scheduler)
+        self.sessions.append(session)
+        return session
+
+    def route(self, tid, session: ShardedTelescope):
+        session.tid = tid
+        session.ring = SharedFrameRing(self.config["TELESCOPE_STREAM_WIDTH"], self.config["TELESCOPE_STREAM_HEIGHT"])
+        self.routes[tid] = session
+        self.router.route(tid, session)
+
+    def start(self):
+        for worker in self.workers:
+            self.spawn(worker)
+        for session in self.routes.values():
+            self.assign(session, self.least_loaded())
+
+    def spawn(self, worker: WorkerHandle):
+        worker.commands = self.context.Queue()
+        worker.process = self.context.Process(target=run_worker, name=f"telescope-worker-{worker.index}",
+                                              args=(dict(self.config), worker.commands, self.celestial_data_loader),
+                                              daemon=True)
+        worker.process.start()
+
+    def assign(self, session: ShardedTelescope, worker: WorkerHandle):
+        if session.worker is not None:
+            session.worker.telescopes.discard(session.tid)
+            session.worker.commands.put(("remove", session.tid))
+        self.next_token += 1
+        # the old worker's writes are dropped from here on even if it has not seen the remove yet
+        session.ring.set_writer(self.next_token)
+        session.worker = worker
+        worker.telescopes.add(session.tid)
+        worker.commands.put(("add", session.tid, session.name, session.ring.name, self.next_token))
+
+    def live_workers(self):
+        return [worker for worker in self.workers if not worker.retired]
+
+    def least_loaded(self):
+        return min(self.live_workers(), key=lambda worker: len(worker.telescopes))
+
+    def supervise(self):
+        now = time.monotonic()
+        for worker in self.live_workers():
+            if worker.process.is_alive():
+                continue
+            print(f"telescope worker {worker.index} exited with code {worker.process.exitcode}")
+            worker.crashes.append(now)
+            while worker.crashes and now - worker.crashes[0] > self.restart_window:
+                worker.crashes.popleft()
+            telescopes = [self.routes[tid] for tid in worker.telescopes]
+            worker.telescopes.clear()
+            for session in telescopes:
+                session.worker = None
+            if len(worker.crashes) > self.max_restarts and len(self.live_workers()) > 1:
+                print(f"telescope worker {worker.index} keeps crashing, moving its telescopes")
+                worker.retired = True
+            else:
+                self.spawn(worker)
+                self.restarts += 1
+            for session in telescopes:
+                self.assign(session, worker if not worker.retired else self.least_loaded())
+        self.rebalance()
+
+    def rebalance(self):
+        """
+        Move telescopes from the busiest to the idlest worker until their counts differ by at most one.
+        """
+        workers = self.live_workers()
+        while True:
+            busiest = max(workers, key=lambda worker: len(worker.telescopes))
+            idlest = min(workers, key=lambda worker: len(worker.telescopes))
+            if len(busiest.telescopes) - len(idlest.telescopes) <= 1:
+                return
+            tid = next(iter(busiest.telescopes))
+            self.assign(self.routes[tid], idlest)
+
+    async def run(self):
+        self.start()
+        try:
+            await self.scheduler.run(self.process_frame)
+        finally:
+            self.close()
+
+    def process_frame(self):
+        now = self.loop.time()
+        if now >= self.next_supervise:
+            self.supervise()
+            self.next_supervise = now + self.supervise_interval
+
+        changed = False
+        for session in self.routes.values():
+            sequence, frame = session.ring.read()
+            fresh = sequence != session.sequence
+            if frame is None or session.publisher is None or not (fresh or now >= session.next_publish):
+                continue
+            # copied out of the ring first, a slot the writer lapped during the copy is skipped and read again next tick
+            if session.frame is None or session.frame.shape != frame.shape:
+                session.frame = np.empty_like(frame)
+            np.copyto(session.frame, frame)
+            if session.ring.is_torn(sequence):
+                self.torn_frames += 1
+                continue
+            with self.profiler.span("publish"):
+                session.publisher.feed_frame(session.frame)
+            session.published += 1
+            session.sequence = sequence
+            session.next_publish = now + self.idle_period
+            changed = changed or fresh
+        return changed
+
+    def stats(self):
+        return {
+            "workers": len(self.live_workers()),
+            "restarts": self.restarts,
+            "torn_frames": self.torn_frames,
+            "telescopes": {worker.index: len(worker.telescopes) for worker in self.live_workers()},
+        }
+
+    def on_message(self, client, userdata, msg):
+        # runs on the paho network thread, the router decodes here and batches handlers onto the event loop
+        self.router.submit(msg.topic, msg.payload)
+
+    def handle_message(self, topic, payload):
+        self.router.submit(topic, payload)
+
+    def close(self):
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.commands.put(("stop",))
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.process = None
+        for session in self.routes.values():
+            session.ring.close()
+        self.routes = {}
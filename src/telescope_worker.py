@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from src.telescope_host import TelescopeHost
+from src.render.shared_frame_ring import SharedFrameRing
+
+
+class RingPublisher:
+    def __init__(self, ring: SharedFrameRing, telescope, token):
+        """
+        Publishes a hosted telescope's frames into its shared memory ring instead of a LiveKit room.
+        :param token: Writer token the supervisor assigned the telescope to this worker with.
+        """
+        self.ring = ring
+        self.telescope = telescope
+        self.token = token
+
+    def feed_frame(self, frame):
+        azimuth, elevation = self.telescope.get_orientation()
+        self.ring.write(frame, (azimuth, elevation, self.telescope.zoom), self.token)
+
+    def is_current(self):
+        return self.ring.writer[0] == self.token
+
+
+class TelescopeWorker:
+    def __init__(self, config, loop, celestial_data_loader=None):
+        """
+        Worker process side of the sharded mode, a TelescopeHost fed by supervisor messages.
+        """
+        self.loop = loop
+        # the frame rings carry the full resolution only, sharded telescopes are streamed without simulcast layers
+        self.host = TelescopeHost(dict(config, SIMULCAST_LAYERS=[]), loop, celestial_data_loader)
+        self.task = None
+
+    def handle(self, message):
+        match message[0]:
+            case "add":
+                self.add_telescope(*message[1:])
+            case "remove":
+                self.remove_telescope(message[1])
+            case "command":
+                session = self.host.routes.get(message[1])
+                if session is not None:
+                    getattr(session, f"command_{message[2]}")(*message[3])
+            case "stop":
+                self.task.cancel()
+
+    def add_telescope(self, tid, name, ring_name, token):
+        self.remove_telescope(tid)
+        ring = SharedFrameRing(self.host.config["TELESCOPE_STREAM_WIDTH"], self.host.config["TELESCOPE_STREAM_HEIGHT"],
+                               name=ring_name)
+        session = self.host.add_telescope(name)
+        self.host.route(tid, session)
+        if ring.read()[0] > 0:
+            # the telescope ran on another worker before, continue from the view it published last
+            azimuth, elevation, zoom = ring.state.tolist()
+            session.telescope.set_zoom(zoom)
+            session.telescope.set_orientation(azimuth, elevation)
+        session.publisher = RingPublisher(ring, session.telescope, token)
+        self.host.scheduler.notify()
+
+    def remove_telescope(self, tid):
+        session = self.host.remove_telescope(tid)
+        if session is not None:
+            session.publisher.ring.close()
+
+    def drop_moved_telescopes(self):
+        for session in list(self.host.sessions):
+            if not session.publisher.is_current():
+                self.remove_telescope(session.tid)
+
+    def receive(self, commands):
+        while True:
+            message = commands.get()
+            self.loop.call_soon_threadsafe(self.handle, message)
+            if message[0] == "stop":
+                return
+
+    async def run(self, commands):
+        threading.Thread(target=self.receive, args=(commands,), daemon=True).start()
+        self.task = asyncio.ensure_future(self.host.run())
+        try:
+            while not self.task.done():
+                await asyncio.sleep(1.0)
+                self.drop_moved_telescopes()
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for session in list(self.host.sessions):
+                self.remove_telescope(session.tid)
+            self.host.close()
+
+
+def run_worker(config, commands, celestial_data_loader=None):
+    """
+    Entry point of a worker process.
+    :param config: Application config as a plain dict.
+    :param commands: Queue of supervisor messages: ("add", tid, name, ring_name, token), ("remove", tid),
+        ("command", tid, command, args) with args decoded by the supervisor's CommandRouter and ("stop",).
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    worker = TelescopeWorker(config, loop, celestial_data_loader)
+    loop.run_until_complete(worker.run(commands))
+    loop.close()
@@ -46,7 +46,23 @@ class Telescope(ABC):
     def get_frame(self):
         """
         Return the current video frame.
-        :return: An instance of opencv canvas.
+        :return: An instance of opencv canvas with RGBA pixels.
+        """
+        pass
+
+    @abstractmethod
+    def get_frame_number(self):
+        """
+        Return the number of the current video frame.
+        :return: Integer that changes whenever get_frame returns a new image.
+        """
+        pass
+
+    @abstractmethod
+    def get_frame_info(self):
+        """
+        Return the current video frame together with the view it was rendered from.
+        :return: Tuple of (frame, frame_number, (azimuth, elevation), (fovx, fovy)).
         """
         pass
 
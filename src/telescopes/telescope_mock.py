@@ -3,18 +3,45 @@ from src.telescopes.telescope import Telescope
 import numpy as np
 import math
 import cv2
+import threading
 from src.utils.noise_generator import NoiseGenerator
 from src.utils.celestial_data_loader import CelestialDataLoader
+from src.utils.celestial_data_service import CelestialDataService
 from src.utils.resource_loader import ResourceLoader
+from src.render.terrain_renderer import TerrainRenderer
+from src.render.sprite_compositor import SpriteCompositor
+from src.render.star_splatter import StarSplatter
+from src.render.sky_atlas import SkyAtlas
+from src.render.celestial_sky import CelestialSky
+from src.render.frame_pool import FramePool
+from src.render.render_queue import RenderQueue
+from src.utils.profiler import Profiler
 
 class TelescopeMock(Telescope):
-    def __init__(self, config):
-        self.SKY_COLOR = (25, 25, 112)
-        self.LAND_COLOR = (0, 100, 0)
-        self.STAR_COLOR = (255, 255, 224)
-        self.STAR_SIZE = 30
+    SKY_COLOR = (25, 25, 112)
+    LAND_COLOR = (0, 100, 0)
+    STAR_COLOR = (255, 255, 224)
+    STAR_SIZE = 30
+    # per channel brightening of the sky at full noise
+    SKY_TEXTURE_STRENGTH = (10, 10, 50)
+    TERRAIN_TEXTURE_SCALE = 120.0
+    SKY_TEXTURE_SCALE = 300.0
 
-        self.resource_loader = ResourceLoader(2*self.STAR_SIZE)
+    def __init__(self, config, resource_loader=None, celestial_data_loader=None, profiler=None, scale=1.0,
+                 stage="render"):
+        """
+        :param config: Application config.
+        :param resource_loader: Sprites to share with other telescopes, loaded here when None.
+        :param celestial_data_loader: Sky data to share with other telescopes, fetched here when None.
+        :param profiler: Profiler the render stages are timed with, shared with other telescopes.
+        :param scale: Sprite size relative to the full resolution stream, below 1 for lower simulcast layers.
+        :param stage: Profiler stage of a render, its parts are timed as sub-stages.
+        """
+        self.resource_loader = resource_loader or ResourceLoader(2*self.STAR_SIZE)
+        self.profiler = profiler or Profiler()
+        self.scale = scale
+        self.stage = stage
+        self.compositor = SpriteCompositor()
 
         self.stream_width = config["TELESCOPE_STREAM_WIDTH"]
         self.stream_height = config["TELESCOPE_STREAM_HEIGHT"]
@@ -24,16 +51,41 @@ class TelescopeMock(Telescope):
         self.longitude = config["LONGITUDE"]
         self.max_zoom = config["MAX_ZOOM"]
 
-        self.celestial_data_loader = CelestialDataLoader((self.latitute, self.longitude))
-        self.celestial_data_loader.fetch_data()
-        self.celestials = self.celestial_data_loader.parse_data()
+        self.texture_seed = config.get("TEXTURE_SEED", 0)
+        self.sky_texture = config.get("SKY_TEXTURE", False)
+        terrain_texture = None
+        if config.get("TERRAIN_TEXTURE", False):
+            terrain_texture = self.resource_loader.get_texture(
+                ("terrain", self.stream_width, self.stream_height, self.base_fovx, self.texture_seed), self.draw_terrain_texture)
+        self.terrain_renderer = TerrainRenderer(self.stream_width, self.stream_height, self.LAND_COLOR, terrain_texture)
+        self.star_splatter = None
+        if config.get("STAR_PSF", True):
+            self.star_splatter = StarSplatter(self.stream_width, self.stream_height, self.STAR_COLOR)
+        self.canvas = np.empty((self.stream_height, self.stream_width, 3), dtype=np.uint8)
+        self.frame_pool = FramePool(self.stream_width, self.stream_height)
+        self.state_lock = threading.RLock()
+        self.state_version = 0
+        self.rendered_version = 0
+        self.render_queue = None
+
+        self.sky_atlas = None
+        if config.get("SKY_ATLAS", False):
+            self.sky_atlas = SkyAtlas(self.stream_width, self.stream_height, self.base_fovx, self.base_fovy,
+                                      self.SKY_COLOR, self.compositor, config.get("SKY_ATLAS_ZOOM_LEVELS", [1]))
+
+        self.celestial_data_loader = celestial_data_loader
+        if self.celestial_data_loader is None:
+            self.celestial_data_loader = CelestialDataLoader((self.latitute, self.longitude), config.get("STAR_CATALOGUE"),
+                                                             CelestialDataService.from_config(config))
+        self.index_sky(CelestialSky.from_celestials(self.celestial_data_loader.parse_data()))
     
         self.azimuth = 0
         self.elevation = math.pi / 6
         self.set_zoom(1)
 
         self.empty_sky = self.draw_empty_sky()
-        self.frame = self.draw()
+        self.frame_number = 0
+        self.render()
 
     def get_resolution(self):
         return (self.stream_width, self.stream_height)
@@ -48,45 +100,114 @@ class TelescopeMock(Telescope):
         return (self.latitute, self.longitude)
     
     def set_orientation(self, azimuth, elevation):
-        self.azimuth = azimuth
-        self.elevation = elevation
-        self.frame = self.draw()
+        with self.state_lock:
+            self.azimuth = azimuth
+            self.elevation = elevation
+            self.state_version += 1
+        self.redraw()
 
     def get_frame(self):
-        return self.frame
+        return self.rendered[0]
+
+    def get_frame_number(self):
+        return self.rendered[1]
+
+    def get_frame_info(self):
+        return self.rendered
+
+    def set_render_executor(self, executor):
+        self.render_queue = RenderQueue(self.render, executor)
+
+    def redraw(self):
+        if self.render_queue is None:
+            self.render()
+        else:
+            self.render_queue.request()
+
+    def render(self):
+        view = self.snapshot()
+        with self.profiler.span(self.stage):
+            frame = self.profiler.profiled(self.draw, view)
+        self.frame_number += 1
+        # one assignment so readers on other threads never see a frame with another frame's metadata
+        self.rendered = (frame, self.frame_number, (view[0], view[1]), (view[3], view[4]))
+        self.rendered_version = view[8]
+
+    def snapshot(self):
+        with self.state_lock:
+            return (self.azimuth, self.elevation, self.zoom, self.fovx, self.fovy,
+                    self.sky.index, self.sky.sprites, self.sky.magnitudes, self.state_version)
+
+    def follow(self, telescope):
+        """
+        Take over the view of another telescope, e.g. a lower simulcast layer following the full resolution one.
+        """
+        azimuth, elevation, zoom = telescope.snapshot()[:3]
+        with self.state_lock:
+            self.set_zoom(zoom)
+            self.set_orientation(azimuth, elevation)
+
+    def set_sky(self, sky: CelestialSky):
+        self.index_sky(sky)
+        self.redraw()
+
+    def update_sky(self, time):
+        self.set_sky(self.celestial_data_loader.sky_at(time))
+
+    def index_sky(self, sky: CelestialSky):
+        with self.state_lock:
+            self.sky = sky
+            self.state_version += 1
+        if self.sky_atlas is not None and self.star_splatter is None:
+            self.sky_atlas.set_objects(self.atlas_objects(), self.atlas_ready)
     
+    def atlas_ready(self):
+        # the atlas of an updated sky was built in the background, without a render queue the next render shows it
+        if self.render_queue is not None:
+            self.render_queue.request()
+
     def set_zoom(self, zoom):
-        self.zoom = max(min(zoom, self.max_zoom), 1)
-        self.fovx = self.base_fovx / self.zoom
-        self.fovy = self.base_fovy / self.zoom
+        with self.state_lock:
+            self.zoom = max(min(zoom, self.max_zoom), 1)
+            self.fovx = self.base_fovx / self.zoom
+            self.fovy = self.base_fovy / self.zoom
+            self.state_version += 1
     
     def move(self, da, de, dz):
-        self.set_zoom(self.zoom + dz)
-        azimuth = self.azimuth + da
-        if azimuth > math.pi:
-            azimuth -= 2 * math.pi
-        if azimuth < -math.pi:
-            azimuth += 2 * math.pi
-        elevation = max(min(self.elevation + de, math.pi / 2 - self.fovy / 2), 0)
-        self.set_orientation(azimuth, elevation)
+        with self.state_lock:
+            self.set_zoom(self.zoom + dz)
+            azimuth = self.azimuth + da
+            if azimuth > math.pi:
+                azimuth -= 2 * math.pi
+            if azimuth < -math.pi:
+                azimuth += 2 * math.pi
+            elevation = max(min(self.elevation + de, math.pi / 2 - self.fovy / 2), 0)
+            self.set_orientation(azimuth, elevation)
 
     def draw_empty_sky(self):
-        canvas = np.full((self.stream_height, self.stream_width, 3), fill_value=self.SKY_COLOR, dtype=np.uint8)
-        # noise = NoiseGenerator(self.stream_width, self.stream_height, scale=300.0).generate_perlin_noise()
-        # noise = (noise * 10).astype(np.uint8)  
-        # canvas[:, :, 0] += noise
-        # canvas[:, :, 1] += noise
-        # canvas[:, :, 2] += 5*noise
-        return canvas
+        if not self.sky_texture:
+            return np.full((self.stream_height, self.stream_width, 3), fill_value=self.SKY_COLOR, dtype=np.uint8)
+        return self.resource_loader.get_texture(("sky", self.stream_width, self.stream_height, self.texture_seed),
+                                                self.draw_sky_texture)
+
+    def draw_sky_texture(self):
+        noise = NoiseGenerator(self.stream_width, self.stream_height, scale=self.SKY_TEXTURE_SCALE, octaves=4,
+                               seed=self.texture_seed).generate_perlin_noise()
+        sky = np.asarray(self.SKY_COLOR, dtype=np.float32) + noise[:, :, None] * np.asarray(self.SKY_TEXTURE_STRENGTH, dtype=np.float32)
+        return sky.astype(np.uint8)
+
+    def draw_terrain_texture(self):
+        """
+        Land around the whole azimuth circle at zoom 1, with the first stream_width columns repeated at the end.
+        """
+        tile_width = int(round(2 * math.pi * self.stream_width / self.base_fovx))
+        noise = NoiseGenerator(tile_width + self.stream_width, self.stream_height, scale=self.TERRAIN_TEXTURE_SCALE,
+                               octaves=5, seed=self.texture_seed + 1, tile_width=tile_width).generate()
+        shade = np.clip(1 + 0.6 * noise, 0, 2)[:, :, None]
+        return np.clip(np.asarray(self.LAND_COLOR, dtype=np.float32) * shade + 12 * noise[:, :, None], 0, 255).astype(np.uint8)
     
-    def draw_terrain(self):
-        land_height = self.stream_height * (1 - (2 * self.elevation / self.fovy))
-        amplitude = self.stream_width / 20
-        for w in range(self.stream_width):
-            az = self.azimuth + w * self.fovx / self.stream_width
-            land_first_pixel = int(land_height + amplitude * math.sin(2 * az))
-            if land_first_pixel < self.stream_height:
-                self.canvas[land_first_pixel:, w] = self.LAND_COLOR
+    def draw_terrain(self, azimuth, elevation, fovx, fovy):
+        self.terrain_renderer.draw(self.canvas, azimuth, elevation, fovx, fovy)
 
     def circular_diff(self, base_angle, target_angle):
         diff = target_angle - base_angle
@@ -96,58 +217,64 @@ class TelescopeMock(Telescope):
             diff += 2 * math.pi
         return diff
     
-    def draw_transparent_object(self, x, y, image):
-        if image is None or image.shape[-1] != 4:
-            return
-            
-        size = image.shape[0]
-        half_size = size // 2
-
-        y_min = y - half_size
-        y_max = y + half_size
-        x_min = x - half_size
-        x_max = x + half_size
-
-        canvas_h, canvas_w = self.canvas.shape[:2]
-        if y_min < 0 or y_max > canvas_h or x_min < 0 or x_max > canvas_w:
-            return
-
-        alpha = image[:, :, 3] / 255.0
-        for c in range(3):
-            self.canvas[y_min:y_max, x_min:x_max, c] = (
-                alpha * image[:, :, c] + (1 - alpha) * self.canvas[y_min:y_max, x_min:x_max, c]
-            )
+    def draw_transparent_object(self, x, y, sprite):
+        self.compositor.blend(self.canvas, sprite, x, y)
 
     def draw_star(self, x, y):
-        star = self.resource_loader.get_image("star")
+        star = self.resource_loader.get_sprite("star")
         self.draw_transparent_object(x, y, star)
             
     def draw_moon(self, x, y):
-        moon = self.resource_loader.get_image("moon")
+        moon = self.resource_loader.get_sprite("moon")
         self.draw_transparent_object(x, y, moon)
 
     def draw_planet(self, x, y):
-        planet = self.resource_loader.get_image("planet")
+        planet = self.resource_loader.get_sprite("planet")
         self.draw_transparent_object(x, y, planet)
 
-    def draw_celestial(self):
-        for celestial in self.celestials:
-            relative_azimuth = self.circular_diff(self.azimuth, celestial.gha)
-            relative_elevation = celestial.hc - self.elevation
-            if abs(relative_azimuth) > self.fovx / 2 or abs(relative_elevation) > self.fovy / 2:
+    def atlas_objects(self):
+        objects = []
+        for name in ["star", "planet", "moon"]:
+            batch = self.sky.sprites == name
+            sprite = self.resource_loader.get_sprite(name, scale=self.scale)
+            objects += [(azimuth, altitude, sprite)
+                        for azimuth, altitude in zip(self.sky.gha[batch].tolist(), self.sky.hc[batch].tolist())]
+        return objects
+
+    def draw_celestial(self, azimuth, elevation, zoom, fovx, fovy, celestial_index, celestial_sprites,
+                       celestial_magnitudes):
+        indices, xs, ys = celestial_index.query(azimuth, elevation, fovx, fovy, self.stream_width, self.stream_height)
+        sprites = celestial_sprites[indices]
+        for name in ["star", "planet", "moon"]:
+            batch = sprites == name
+            if not batch.any():
                 continue
-            x = int(self.stream_width * (0.5 + relative_azimuth / self.fovx))
-            y = int(self.stream_height * (0.5 - relative_elevation / self.fovy))
-            if celestial.object_name == "Moon":
-                self.draw_moon(x, y)
-            if celestial.object_name in ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune"]:
-                self.draw_planet(x, y)
-            else:
-                self.draw_star(x, y)
+            if name == "star" and self.star_splatter is not None:
+                # stars are points, one vectorized pass sized by magnitude, the Moon and planets keep their sprites
+                self.star_splatter.draw(self.canvas, xs[batch], ys[batch], celestial_magnitudes[indices][batch])
+                continue
+            sprite = self.resource_loader.get_sprite(name, zoom, self.scale)
+            self.compositor.blend_many(self.canvas, sprite, zip(xs[batch].tolist(), ys[batch].tolist()))
             
-    def draw(self):
-        self.canvas = self.empty_sky.copy()
-        self.draw_celestial()
-        self.draw_terrain()
-        return self.canvas.copy()
+    def draw(self, view=None):
+        azimuth, elevation, zoom, fovx, fovy, celestial_index, celestial_sprites, celestial_magnitudes, _ = \
+            view or self.snapshot()
+        with self.profiler.span(f"{self.stage}.sky"):
+            if self.sky_atlas is not None:
+                self.sky_atlas.view(azimuth, elevation, zoom, self.canvas)
+            else:
+                np.copyto(self.canvas, self.empty_sky)
+        if self.sky_atlas is None or self.star_splatter is not None:
+            # with the splatter the atlas only holds the sky, stars follow the zoom and the moon and planets must
+            # cover them, so everything is drawn per frame in the same order as without the atlas
+            with self.profiler.span(f"{self.stage}.celestials"):
+                self.draw_celestial(azimuth, elevation, zoom, fovx, fovy, celestial_index, celestial_sprites,
+                                    celestial_magnitudes)
+        with self.profiler.span(f"{self.stage}.terrain"):
+            self.draw_terrain(azimuth, elevation, fovx, fovy)
+        # the canvas is RGB, expand it straight into a pooled RGBA frame
+        with self.profiler.span(f"{self.stage}.color"):
+            frame = self.frame_pool.acquire()
+            cv2.cvtColor(self.canvas, cv2.COLOR_RGB2RGBA, frame)
+        return frame
     
\ No newline at end of file
@@ -1,4 +1,7 @@
-import requests
+import asyncio
+import json
+import random
+import aiohttp
 
 class TelescopeData:
     def __init__(self, name, location, specifications, price_per_minute, status):
@@ -80,16 +83,90 @@ class DeleteResponse:
         return cls(message=data.get("message"))
 
 class ApiClient:
-    def __init__(self, base_url):
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, base_url, timeout=10.0, retries=3, backoff=0.5, max_backoff=8.0, connections=16):
         """
         Initialize the TelescopeClient.
 
         Args:
             base_url (str): The base URL of the Telescope API.
+            timeout (float): Total timeout of one request attempt in seconds.
+            retries (int): Attempts after the first one before a request gives up.
+            backoff (float): Base of the exponential backoff between attempts in seconds.
+            max_backoff (float): Upper bound of a single backoff in seconds.
+            connections (int): Size of the connection pool, also the concurrency of batched calls.
         """
         self.base_url = base_url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connections = connections
+        self.session = None
+        self.retried = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.timeout,
+                                                 connector=aiohttp.TCPConnector(limit=self.connections))
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method, path, data=None):
+        """
+        Send a request, retrying transient failures with full jitter exponential backoff.
+        POST is only retried when the server can not have acted on it: refused connections and 429/503 answers.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path below the base URL.
+            data (dict): JSON request body.
+
+        Returns:
+            tuple: (status, body), the body parsed as JSON when possible and as text otherwise,
+            status is None when every attempt failed without a response.
+        """
+        idempotent = method != "POST"
+        url = f"{self.base_url}{path}"
+        status, body = None, None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.retried += 1
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+            try:
+                async with self.get_session().request(method, url, json=data) as response:
+                    status = response.status
+                    body = await self.read_body(response)
+                retry = status in self.RETRY_STATUSES if idempotent else status in (429, 503)
+            except aiohttp.ClientConnectorError as e:
+                status, body = None, str(e)
+                retry = True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = None, str(e) or type(e).__name__
+                retry = idempotent
+            if not retry:
+                break
+        return status, body
 
-    def post_telescope(self, data):
+    async def read_body(self, response):
+        text = await response.text()
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    async def post_telescope(self, data):
         """
         Add a new telescope.
 
@@ -99,14 +176,13 @@ class ApiClient:
         Returns:
             TelescopeResponse: The response from the API.
         """
-        url = f"{self.base_url}/telescopes/"
-        response = requests.post(url, json=data.to_dict())
-        if response.status_code == 200:
-            return TelescopeResponse.from_dict(response.json())
+        status, body = await self.request("POST", "/telescopes/", data.to_dict())
+        if status == 200 and isinstance(body, dict):
+            return TelescopeResponse.from_dict(body)
         else:
-            return {"error": response.json()}
+            return {"error": body, "status": status}
 
-    def update_telescope(self, telescope_id, data):
+    async def update_telescope(self, telescope_id, data):
         """
         Update details of a specific telescope.
 
@@ -117,14 +193,13 @@ class ApiClient:
         Returns:
             TelescopeResponse: The response from the API.
         """
-        url = f"{self.base_url}/telescopes/{telescope_id}"
-        response = requests.put(url, json=data.to_dict())
-        if response.status_code == 200:
-            return TelescopeResponse.from_dict(response.json())
+        status, body = await self.request("PUT", f"/telescopes/{telescope_id}", data.to_dict())
+        if status == 200 and isinstance(body, dict):
+            return TelescopeResponse.from_dict(body)
         else:
-            return {"error": response.json()}
+            return {"error": body, "status": status}
 
-    def delete_telescope(self, telescope_id):
+    async def delete_telescope(self, telescope_id):
         """
         Delete a specific telescope.
 
@@ -134,9 +209,49 @@ class ApiClient:
         Returns:
             DeleteResponse: The response from the API.
         """
-        url = f"{self.base_url}/telescopes/{telescope_id}"
-        response = requests.delete(url)
-        if response.status_code == 200:
+        status, body = await self.request("DELETE", f"/telescopes/{telescope_id}")
+        if status == 200:
             return DeleteResponse.from_dict({"message": "Telescope deleted successfully."})
         else:
-            return {"error": response.json()}
+            return {"error": body, "status": status}
+
+    async def register_telescopes(self, telescopes):
+        """
+        Add many telescopes concurrently over the connection pool.
+
+        Args:
+            telescopes (list[TelescopeData]): The telescopes to add.
+
+        Returns:
+            list: A TelescopeResponse or error dict per telescope, in order.
+        """
+        return await asyncio.gather(*(self.post_telescope(data) for data in telescopes))
+
+    async def deregister_telescopes(self, telescope_ids):
+        """
+        Delete many telescopes concurrently over the connection pool.
+
+        Args:
+            telescope_ids (list[str]): The IDs of the telescopes to delete.
+
+        Returns:
+            list: A DeleteResponse or error dict per telescope, in order.
+        """
+        return await asyncio.gather(*(self.delete_telescope(telescope_id) for telescope_id in telescope_ids))
+
+    async def heartbeat(self, telescopes, period):
+        """
+        Send the current details of every telescope each period until cancelled.
+
+        Args:
+            telescopes (callable): Returns a dict of telescope ID to TelescopeData.
+            period (float): Seconds between heartbeats.
+        """
+        while True:
+            await asyncio.sleep(period)
+            current = telescopes()
+            responses = await asyncio.gather(*(self.update_telescope(telescope_id, data)
+                                               for telescope_id, data in current.items()))
+            for telescope_id, response in zip(current, responses):
+                if type(response) is not TelescopeResponse:
+                    print(f"heartbeat for telescope {telescope_id} failed: {response}")
@@ -1,44 +1,131 @@
+import os
 import requests
 import math
+import numpy as np
 from datetime import datetime, timezone
+from src.utils.star_catalogue import StarCatalogue
+from src.utils.celestial_data_service import CelestialDataService
+from src.render.celestial_sky import CelestialSky
+from src.utils.ephemeris import Ephemeris, BODY_MAGNITUDES, days_since_j2000, greenwich_sidereal_angle
+
+# the almanac lists navigational stars without magnitudes, they are all bright
+DEFAULT_MAGNITUDE = 2.0
 
 class CelestialData:
-    def __init__ (self, object_name, dec, gha, hc, zn):
+    def __init__ (self, object_name, dec, gha, hc, zn, magnitude=DEFAULT_MAGNITUDE):
         self.object_name = object_name
         self.dec = dec
         self.gha = gha
         self.hc = hc
         self.zn = zn
+        self.magnitude = magnitude
 
 class CelestialDataLoader:
-    BASE_URL = "https://aa.usno.navy.mil/api/celnav"
-
-    def __init__(self, coords):
+    def __init__(self, coords, catalogue_path=None, service=None, equatorial=None):
+        """
+        :param coords: (latitude, longitude) in degrees.
+        :param catalogue_path: Offline star catalogue used when the almanac can not be fetched.
+        :param service: Shared almanac fetches and cache, a private uncached one when None.
+        :param equatorial: (names, ra, dec, magnitude) of a warm start snapshot. Without a cached almanac the sky is
+            propagated from them while the almanac is fetched in the background, instead of waiting for the fetch.
+        """
         self.coords = coords
+        self.catalogue = None
+        if catalogue_path and os.path.exists(catalogue_path):
+            self.catalogue = StarCatalogue(catalogue_path)
+        self.service = service or CelestialDataService()
+        self.equatorial = equatorial
+        self.raw_data = None
+        self.ephemeris = None
         self.data = self.fetch_data()
 
     def fetch_data(self):
-        params = {
-            "date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-            "time": datetime.now(timezone.utc).strftime("%H:%M:%S"),
-            "coords": f"{self.coords[0]},{self.coords[1]}"
-        }
+        self.ephemeris = None
+        entry = self.service.latest(self.coords) if self.equatorial is not None else None
+        if self.equatorial is not None and (entry is None or self.service.age(entry) >= self.service.max_stale):
+            # no almanac to serve without waiting for the network, start from the snapshot
+            self.service.fetch(self.coords)
+            self.fetch_time = datetime.now(timezone.utc)
+            self.raw_data = None
+            return
         try:
-            response = requests.get(self.BASE_URL, params=params)
-            response.raise_for_status()
-            self.raw_data = response.json()
-        except requests.RequestException as e:
-            raise Exception(f"Failed to fetch data: {e}")
+            self.fetch_time, self.raw_data = self.service.get(self.coords)
+        except (requests.RequestException, OSError) as e:
+            # the service also fails with OSError on an unreadable or unwritable cache
+            if self.catalogue is None:
+                raise Exception(f"Failed to fetch data: {e}")
+            print(f"Failed to fetch data: {e}, using offline catalogue {self.catalogue.path}")
+            self.fetch_time = datetime.now(timezone.utc)
+            self.raw_data = None
+
+    def refresh_data(self):
+        """
+        Adopt a newer almanac once the service revalidated a stale one.
+        """
+        entry = self.service.revalidate(self.coords)
+        if entry is not None and (self.raw_data is None or entry[0] > self.fetch_time):
+            self.fetch_time, self.raw_data = entry
+            self.ephemeris = None
     
     def get_raw_data(self):
         return self.raw_data
     
     def deg2rad(self, deg):
         return deg * (math.pi / 180)
+
+    def parse_equatorial(self):
+        """
+        Equatorial coordinates of the fetched objects, right ascension recovered from the
+        Greenwich hour angle at fetch time.
+        :return: Tuple of (names, ra, dec, magnitude), angles in radians.
+        """
+        if not self.raw_data:
+            if self.catalogue is None:
+                if self.equatorial is not None:
+                    return self.equatorial
+                return [], np.empty(0), np.empty(0), np.empty(0)
+            names = [name.lower() for name in self.catalogue.names()]
+            return names, np.asarray(self.catalogue.ra), np.asarray(self.catalogue.dec), np.asarray(self.catalogue.magnitude)
+        celestials = self.parse_data()
+        sidereal_angle = greenwich_sidereal_angle(days_since_j2000(self.fetch_time))
+        names = [celestial.object_name for celestial in celestials]
+        ra = np.mod(sidereal_angle - np.array([celestial.gha for celestial in celestials]), 2 * math.pi)
+        dec = np.array([celestial.dec for celestial in celestials])
+        magnitude = np.array([celestial.magnitude for celestial in celestials])
+        return names, ra, dec, magnitude
+
+    def propagate(self, time):
+        """
+        Positions at the given time by the local ephemeris, with the mask of objects above the horizon.
+        The Sun is left out, a daytime sky would draw it as a star.
+        """
+        self.refresh_data()
+        if self.ephemeris is None:
+            self.ephemeris = Ephemeris(self.coords[0], self.coords[1], *self.parse_equatorial())
+        names, dec, gha, hc, zn = self.ephemeris.compute(time)
+        magnitude = np.where(np.isnan(self.ephemeris.magnitude), DEFAULT_MAGNITUDE, self.ephemeris.magnitude)
+        visible = (hc > 0) & (self.ephemeris.names != "sun")
+        return names, dec, gha, hc, zn, magnitude, visible
+
+    def celestials_at(self, time) -> list[CelestialData]:
+        """
+        Objects above the horizon at the given time, propagated by the local ephemeris.
+        """
+        names, dec, gha, hc, zn, magnitude, visible = self.propagate(time)
+        return [CelestialData(names[i], dec[i], gha[i], hc[i], zn[i], magnitude[i]) for i in np.nonzero(visible)[0].tolist()]
+
+    def sky_at(self, time) -> CelestialSky:
+        """
+        celestials_at as arrays, without a Python object per body, safe to build off the event loop.
+        """
+        _, _, gha, hc, _, magnitude, visible = self.propagate(time)
+        return CelestialSky(self.ephemeris.names[visible], gha[visible], hc[visible], magnitude[visible])
     
     def parse_data(self) -> list[CelestialData]:
         celestial_data = []
         if not self.raw_data:
+            if self.catalogue is not None or self.equatorial is not None:
+                return self.celestials_at(datetime.now(timezone.utc))
             return
         if "properties" in self.raw_data and "data" in self.raw_data["properties"]:
             for entry in self.raw_data["properties"]["data"]:
@@ -54,9 +141,11 @@ class CelestialDataLoader:
                 zn = almanac.get("zn", None)
                 if not dec or not gha or not hc or not zn:
                     continue
+                magnitude = almanac.get("magnitude", BODY_MAGNITUDES.get(object_name.lower(), DEFAULT_MAGNITUDE))
                 celestial_data.append(CelestialData(object_name.lower(), 
                     self.deg2rad(dec), 
                     self.deg2rad(gha),
                     self.deg2rad(hc), 
-                    self.deg2rad(zn))) 
-        return celestial_data
\ No newline at end of file
+                    self.deg2rad(zn),
+                    magnitude))
+        return celestial_data
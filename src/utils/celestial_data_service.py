@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+import requests
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class CelestialDataService:
+    BASE_URL = "https://aa.usno.navy.mil/api/celnav"
+
+    def __init__(self, cache_dir=None, ttl=3600.0, max_stale=7 * 86400.0, timeout=10, retry_interval=60.0):
+        """
+        Almanac fetches shared by every loader of the process, cached on disk per (time bucket, coords).
+        At most one request per coords is in flight, data older than the TTL is served while it is refreshed in the background.
+        :param cache_dir: Directory of the on-disk cache, memory only when empty.
+        :param ttl: Seconds an almanac stays fresh, also the width of the cache time buckets.
+        :param max_stale: Seconds after which an almanac is no longer served and a fetch blocks.
+        :param timeout: HTTP timeout in seconds.
+        :param retry_interval: Seconds between background revalidations after a failed one.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.inflight = {}
+        self.failures = {}
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # handed to worker processes, locks and in-flight fetches stay with this process
+        state = self.__dict__.copy()
+        for name in ("lock", "inflight", "failures"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.failures = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("CELESTIAL_CACHE_DIR"), config.get("CELESTIAL_CACHE_TTL", 3600.0),
+                   config.get("CELESTIAL_CACHE_MAX_STALE", 7 * 86400.0))
+
+    def coords_key(self, coords):
+        return f"{coords[0]:.4f}_{coords[1]:.4f}"
+
+    def cache_path(self, coords, fetch_time):
+        bucket = int(fetch_time.timestamp() // self.ttl)
+        return os.path.join(self.cache_dir, f"{self.coords_key(coords)}_{bucket}.json")
+
+    def get(self, coords):
+        """
+        :param coords: (latitude, longitude) in degrees.
+        :return: Tuple of (fetch_time, almanac), the almanac as returned by the USNO API.
+        :raises requests.RequestException: No usable almanac is cached and the fetch failed.
+        """
+        entry = self.revalidate(coords)
+        if entry is not None and self.age(entry) < self.max_stale:
+            return entry
+        return self.fetch(coords).result()
+
+    def revalidate(self, coords):
+        """
+        Newest almanac for the coords without blocking, a background fetch is started when it is older than the TTL.
+        :return: Tuple of (fetch_time, almanac) or None when nothing is cached.
+        """
+        entry = self.latest(coords)
+        if entry is not None and self.age(entry) >= self.ttl:
+            failed = self.failures.get(self.coords_key(coords))
+            if failed is None or time.monotonic() - failed >= self.retry_interval:
+                self.fetch(coords)
+        return entry
+
+    def age(self, entry):
+        return (datetime.now(timezone.utc) - entry[0]).total_seconds()
+
+    def latest(self, coords):
+        """
+        Newest almanac for the coords from memory or disk without fetching, None when there is none.
+        """
+        key = self.coords_key(coords)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            entry = self.read_cache(coords)
+            if entry is not None:
+                with self.lock:
+                    self.entries.setdefault(key, entry)
+        return entry
+
+    def read_cache(self, coords):
+        if not self.cache_dir:
+            return None
+        prefix = self.coords_key(coords) + "_"
+        names = sorted((name for name in os.listdir(self.cache_dir) if name.startswith(prefix) and name.endswith(".json")),
+                       key=lambda name: int(name[len(prefix):-len(".json")]))
+        for name in reversed(names):
+            try:
+                with open(os.path.join(self.cache_dir, name), "r") as file:
+                    cached = json.load(file)
+                return datetime.fromisoformat(cached["fetch_time"]), cached["data"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping celestial cache file {name}: {e}")
+        return None
+
+    def write_cache(self, coords, fetch_time, data):
+        if not self.cache_dir:
+            return
+        path = self.cache_path(coords, fetch_time)
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"fetch_time": fetch_time.isoformat(), "data": data}, file)
+        os.replace(temporary, path)
+        prefix = self.coords_key(coords) + "_"
+        oldest = int((fetch_time.timestamp() - self.max_stale) // self.ttl)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".json") and int(name[len(prefix):-len(".json")]) < oldest:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def fetch(self, coords) -> Future:
+        """
+        Start a fetch for the coords unless one is already in flight.
+        :return: Future of (fetch_time, almanac).
+        """
+        key = self.coords_key(coords)
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self.inflight[key] = future
+        threading.Thread(target=self.refresh, args=(coords, future), daemon=True, name="celestial-fetch").start()
+        return future
+
+    def refresh(self, coords, future):
+        key = self.coords_key(coords)
+        try:
+            with self.cache_lock(coords):
+                # another process may have fetched while we waited for the lock
+                entry = self.read_cache(coords)
+                if entry is None or self.age(entry) >= self.ttl:
+                    entry = self.request(coords)
+                    self.write_cache(coords, *entry)
+            with self.lock:
+                self.entries[key] = entry
+                self.failures.pop(key, None)
+            future.set_result(entry)
+        except (requests.RequestException, OSError) as e:
+            print(f"Failed to refresh celestial data for {coords}: {e}")
+            self.failures[key] = time.monotonic()
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def cache_lock(self, coords):
+        return CacheLock(os.path.join(self.cache_dir, self.coords_key(coords) + ".lock") if self.cache_dir else None)
+
+    def request(self, coords):
+        fetch_time = datetime.now(timezone.utc)
+        params = {
+            "date": fetch_time.strftime("%Y-%m-%d"),
+            "time": fetch_time.strftime("%H:%M:%S"),
+            "coords": f"{coords[0]},{coords[1]}"
+        }
+        response = requests.get(self.BASE_URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return fetch_time, response.json()
+
+
+class CacheLock:
+    def __init__(self, path):
+        """
+        Exclusive lock on a cache key across processes, a no-op without a path or where flock is unavailable.
+        """
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if self.path is not None and fcntl is not None:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
@@ -0,0 +1,206 @@
+import json
+import math
+import struct
+import threading
+import time
+from collections import deque
+from src.utils.latency_histogram import LatencyHistogram
+
+# binary move: version byte followed by little endian float32 azimuth, elevation and zoom deltas
+MOVE_FORMAT = struct.Struct("<Bfff")
+MOVE_VERSION = 1
+MOVE_AXES = {"DX": 0, "DY": 1, "ZOOM": 2}
+
+
+class CommandError(ValueError):
+    pass
+
+
+def pack_move(da, de, dz):
+    return MOVE_FORMAT.pack(MOVE_VERSION, da, de, dz)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def decode_json(payload):
+    try:
+        payload = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise CommandError(f"invalid json: {e}")
+    if not isinstance(payload, dict):
+        raise CommandError("payload is not an object")
+    return payload
+
+
+def decode_move(payload):
+    """
+    :return: Tuple of (da, de, dz), from a packed binary move or the JSON {"type": "DX" | "DY" | "ZOOM", "value": number}.
+    """
+    if len(payload) == MOVE_FORMAT.size and payload[0] == MOVE_VERSION:
+        _, da, de, dz = MOVE_FORMAT.unpack(payload)
+        if not (math.isfinite(da) and math.isfinite(de) and math.isfinite(dz)):
+            raise CommandError("non finite move")
+        return da, de, dz
+    payload = decode_json(payload)
+    axis = MOVE_AXES.get(payload.get("type"))
+    if axis is None:
+        raise CommandError(f"unknown move type {payload.get('type')!r}")
+    value = payload.get("value")
+    if not is_number(value):
+        raise CommandError(f"move value {value!r} is not a finite number")
+    deltas = [0.0, 0.0, 0.0]
+    deltas[axis] = float(value)
+    return tuple(deltas)
+
+
+def decode_spot(payload):
+    """
+    :return: Tuple of (interesting,), from the JSON {"interesting": [name, ...]}.
+    """
+    payload = decode_json(payload)
+    interesting = payload.get("interesting")
+    if not isinstance(interesting, list) or not all(isinstance(name, str) for name in interesting):
+        raise CommandError("interesting is not a list of names")
+    return (interesting,)
+
+
+def decode_profile(payload):
+    """
+    :return: Tuple of (mode, seconds), from the JSON {"mode": "cpu" | "memory", "seconds": number}.
+    """
+    payload = decode_json(payload)
+    mode = payload.get("mode", "cpu")
+    if mode not in ("cpu", "memory"):
+        raise CommandError(f"unknown profile mode {mode!r}")
+    seconds = payload.get("seconds", 10)
+    if not is_number(seconds) or seconds <= 0:
+        raise CommandError(f"profile length {seconds!r} is not a positive number")
+    return mode, float(seconds)
+
+
+class CommandStats:
+    def __init__(self):
+        self.received = 0
+        self.rejected = 0
+        self.handled = 0
+        self.reported_rejected = 0
+        self.latency = LatencyHistogram()
+
+
+class CommandRouter:
+    COMMANDS = {
+        "move": decode_move,
+        "spot": decode_spot,
+        "profile": decode_profile,
+    }
+
+    def __init__(self, loop, report_interval=10.0):
+        """
+        Routes MQTT messages to telescope command handlers.
+        Payloads are validated and decoded on the network thread, the event loop only runs handlers, in batches.
+        :param loop: Event loop the handlers run on.
+        :param report_interval: Seconds between command statistics reports.
+        """
+        self.loop = loop
+        self.report_interval = report_interval
+        self.routes = {}
+        self.stats = {command: CommandStats() for command in self.COMMANDS}
+        self.unknown = 0
+        self.reported_unknown = 0
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.next_report = time.monotonic() + report_interval
+
+    def route(self, tid, target):
+        """
+        Register the handlers of a telescope, target provides command_<name>(*args) for every command.
+        """
+        for command, decoder in self.COMMANDS.items():
+            self.routes[f"{tid}/{command}"] = (self.stats[command], decoder, getattr(target, f"command_{command}"))
+
+    def topics(self, tid):
+        """
+        Topics to subscribe to for a telescope, only its commands and not what it publishes itself.
+        """
+        return [f"{tid}/{command}" for command in self.COMMANDS]
+
+    def unroute(self, tid):
+        for command in self.COMMANDS:
+            self.routes.pop(f"{tid}/{command}", None)
+
+    def on_message(self, client, userdata, msg):
+        self.submit(msg.topic, msg.payload)
+
+    def submit(self, topic, payload):
+        """
+        Decode a message and queue its handler, safe to call from any thread.
+        :return: False when the message was dropped.
+        """
+        received = time.monotonic()
+        route = self.routes.get(topic)
+        if route is None:
+            self.unknown += 1
+            return False
+        stats, decoder, handler = route
+        stats.received += 1
+        try:
+            args = decoder(payload)
+        except CommandError as e:
+            stats.rejected += 1
+            if stats.rejected == 1:
+                print(f"rejected command on {topic}: {e}")
+            return False
+        self.pending.append((stats, handler, args, received))
+        with self.lock:
+            if self.scheduled:
+                return True
+            self.scheduled = True
+        # one wake up of the event loop per batch instead of one per message
+        self.loop.call_soon_threadsafe(self.drain)
+        return True
+
+    def drain(self):
+        with self.lock:
+            self.scheduled = False
+        while self.pending:
+            stats, handler, args, received = self.pending.popleft()
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"command handler {handler.__qualname__} failed: {e}")
+                continue
+            stats.handled += 1
+            stats.latency.record(time.monotonic() - received)
+        now = time.monotonic()
+        if now >= self.next_report:
+            self.report()
+            self.next_report = now + self.report_interval
+
+    def snapshot(self):
+        return {
+            command: {
+                "received": stats.received,
+                "rejected": stats.rejected,
+                "handled": stats.handled,
+                "latency_p50": stats.latency.percentile(50),
+                "latency_p99": stats.latency.percentile(99),
+                "latency_max": stats.latency.max,
+            }
+            for command, stats in self.stats.items()
+        } | {"unknown": self.unknown}
+
+    def report(self):
+        for command, stats in self.stats.items():
+            if stats.latency.count == 0 and stats.rejected == stats.reported_rejected:
+                continue
+            print(f"command {command}: {stats.received} received, {stats.rejected} rejected, {stats.handled} handled, "
+                  f"dispatch latency p50 {stats.latency.percentile(50) * 1000:.2f} ms "
+                  f"p99 {stats.latency.percentile(99) * 1000:.2f} ms")
+            stats.latency.reset()
+            stats.reported_rejected = stats.rejected
+        if self.unknown != self.reported_unknown:
+            print(f"commands on unknown topics: {self.unknown - self.reported_unknown}")
+            self.reported_unknown = self.unknown
@@ -0,0 +1,171 @@
+import math
+
+import numpy as np
+
+J2000 = 2451545.0
+UNIX_EPOCH_JD = 2440587.5
+OBLIQUITY_J2000 = math.radians(23.43928)
+
+# JPL approximate Keplerian elements (1800-2050): value at J2000 and rate per Julian century for
+# a [au], e, I [deg], L [deg], longitude of perihelion [deg], longitude of ascending node [deg]
+PLANET_ELEMENTS = {
+    "mercury": [(0.38709927, 0.00000037), (0.20563593, 0.00001906), (7.00497902, -0.00594749),
+                (252.25032350, 149472.67411175), (77.45779628, 0.16047689), (48.33076593, -0.12534081)],
+    "venus": [(0.72333566, 0.00000390), (0.00677672, -0.00004107), (3.39467605, -0.00078890),
+              (181.97909950, 58517.81538729), (131.60246718, 0.00268329), (76.67984255, -0.27769418)],
+    "earth": [(1.00000261, 0.00000562), (0.01671123, -0.00004392), (-0.00001531, -0.01294668),
+              (100.46457166, 35999.37244981), (102.93768193, 0.32327364), (0.0, 0.0)],
+    "mars": [(1.52371034, 0.00001847), (0.09339410, 0.00007882), (1.84969142, -0.00813131),
+             (-4.55343205, 19140.30268499), (-23.94362959, 0.44441088), (49.55953891, -0.29257343)],
+    "jupiter": [(5.20288700, -0.00011607), (0.04838624, -0.00013253), (1.30439695, -0.00183714),
+                (34.39644051, 3034.74612775), (14.72847983, 0.21252668), (100.47390909, 0.20469106)],
+    "saturn": [(9.53667594, -0.00125060), (0.05386179, -0.00050991), (2.48599187, 0.00193609),
+               (49.95424423, 1222.49362201), (92.59887831, -0.41897216), (113.66242448, -0.28867794)],
+    "uranus": [(19.18916464, -0.00196176), (0.04725744, -0.00004397), (0.77263783, -0.00242939),
+               (313.23810451, 428.48202785), (170.95427630, 0.40805281), (74.01692503, 0.04240589)],
+    "neptune": [(30.06992276, 0.00026291), (0.00859048, 0.00005105), (1.77004347, 0.00035372),
+                (-55.12002969, 218.45945325), (44.96476227, -0.32241464), (131.78422574, -0.00508664)],
+}
+PLANETS = [name for name in PLANET_ELEMENTS if name != "earth"]
+BODIES = ["sun", "moon"] + PLANETS
+# typical apparent visual magnitudes, the solar system bodies are drawn as sprites so rough values do
+BODY_MAGNITUDES = {"sun": -26.7, "moon": -12.7, "mercury": 0.0, "venus": -4.2, "mars": 0.7, "jupiter": -2.3,
+                   "saturn": 0.6, "uranus": 5.7, "neptune": 7.8}
+
+
+def days_since_j2000(time):
+    """
+    :param time: Timezone aware datetime.
+    :return: Days elapsed since the J2000.0 epoch.
+    """
+    return time.timestamp() / 86400 + UNIX_EPOCH_JD - J2000
+
+
+def greenwich_sidereal_angle(days):
+    return math.radians((280.46061837 + 360.98564736629 * days) % 360)
+
+
+def equatorial_to_horizontal(ra, dec, latitude, longitude, days):
+    """
+    Convert equatorial coordinates to the almanac quantities of an observer.
+    :param ra: Right ascension in radians.
+    :param dec: Declination in radians.
+    :param latitude: Observer latitude in degrees.
+    :param longitude: Observer longitude in degrees, east positive.
+    :return: Tuple of (gha, hc, zn) arrays in radians.
+    """
+    gha = np.mod(greenwich_sidereal_angle(days) - ra, 2 * math.pi)
+    phi = math.radians(latitude)
+    lha = gha + math.radians(longitude)
+    sin_dec, cos_dec, cos_lha = np.sin(dec), np.cos(dec), np.cos(lha)
+    hc = np.arcsin(math.sin(phi) * sin_dec + math.cos(phi) * cos_dec * cos_lha)
+    zn = np.mod(np.arctan2(-cos_dec * np.sin(lha), sin_dec * math.cos(phi) - cos_dec * math.sin(phi) * cos_lha), 2 * math.pi)
+    return gha, hc, zn
+
+
+def ecliptic_to_equatorial(x, y, z, obliquity=OBLIQUITY_J2000):
+    y_eq = y * math.cos(obliquity) - z * math.sin(obliquity)
+    z_eq = y * math.sin(obliquity) + z * math.cos(obliquity)
+    ra = np.mod(np.arctan2(y_eq, x), 2 * math.pi)
+    dec = np.arctan2(z_eq, np.hypot(x, y_eq))
+    return ra, dec
+
+
+def heliocentric_positions(names, days):
+    """
+    Heliocentric ecliptic position of the given planets, vectorized over them.
+    :return: Tuple of (x, y, z) arrays in au.
+    """
+    centuries = days / 36525
+    elements = np.array([[value + rate * centuries for value, rate in PLANET_ELEMENTS[name]] for name in names])
+    a, e = elements[:, 0], elements[:, 1]
+    inclination, mean_longitude, perihelion, node = np.radians(elements[:, 2:]).T
+    argument = perihelion - node
+    mean_anomaly = np.mod(mean_longitude - perihelion + math.pi, 2 * math.pi) - math.pi
+
+    eccentric_anomaly = mean_anomaly + e * np.sin(mean_anomaly)
+    for _ in range(6):
+        eccentric_anomaly -= (eccentric_anomaly - e * np.sin(eccentric_anomaly) - mean_anomaly) / (1 - e * np.cos(eccentric_anomaly))
+
+    x_orbit = a * (np.cos(eccentric_anomaly) - e)
+    y_orbit = a * np.sqrt(1 - e * e) * np.sin(eccentric_anomaly)
+    cos_w, sin_w = np.cos(argument), np.sin(argument)
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(inclination), np.sin(inclination)
+    x = (cos_w * cos_node - sin_w * sin_node * cos_i) * x_orbit + (-sin_w * cos_node - cos_w * sin_node * cos_i) * y_orbit
+    y = (cos_w * sin_node + sin_w * cos_node * cos_i) * x_orbit + (-sin_w * sin_node + cos_w * cos_node * cos_i) * y_orbit
+    z = sin_w * sin_i * x_orbit + cos_w * sin_i * y_orbit
+    return x, y, z
+
+
+def moon_position(days):
+    """
+    Low precision geocentric Moon position (about 0.3 degrees, parallax ignored).
+    :return: Tuple of (ra, dec) in radians.
+    """
+    t = days / 36525
+    sin = lambda deg: math.sin(math.radians(deg))
+    longitude = (218.32 + 481267.881 * t
+                 + 6.29 * sin(135.0 + 477198.87 * t) - 1.27 * sin(259.3 - 413335.36 * t)
+                 + 0.66 * sin(235.7 + 890534.22 * t) + 0.21 * sin(269.9 + 954397.74 * t)
+                 - 0.19 * sin(357.5 + 35999.05 * t) - 0.11 * sin(186.5 + 966404.03 * t))
+    latitude = (5.13 * sin(93.3 + 483202.02 * t) + 0.28 * sin(228.2 + 960400.89 * t)
+                - 0.28 * sin(318.3 + 6003.15 * t) - 0.17 * sin(217.6 - 407332.21 * t))
+    longitude, latitude = math.radians(longitude), math.radians(latitude)
+    x = math.cos(latitude) * math.cos(longitude)
+    y = math.cos(latitude) * math.sin(longitude)
+    z = math.sin(latitude)
+    ra, dec = ecliptic_to_equatorial(np.array([x]), np.array([y]), np.array([z]))
+    return ra[0], dec[0]
+
+
+def body_positions(days):
+    """
+    Approximate geocentric positions of the Sun, the Moon and the planets.
+    :return: Tuple of (names, ra, dec), ra and dec in radians.
+    """
+    x, y, z = heliocentric_positions(PLANETS + ["earth"], days)
+    # the Sun sits opposite the Earth, planets are seen from the Earth
+    x = np.append(-x[-1], x[:-1] - x[-1])
+    y = np.append(-y[-1], y[:-1] - y[-1])
+    z = np.append(-z[-1], z[:-1] - z[-1])
+    ra, dec = ecliptic_to_equatorial(x, y, z)
+    moon_ra, moon_dec = moon_position(days)
+    return ["sun", "moon"] + PLANETS, np.insert(ra, 1, moon_ra), np.insert(dec, 1, moon_dec)
+
+
+class Ephemeris:
+    def __init__(self, latitude, longitude, names, ra, dec, magnitude=None):
+        """
+        Sky of an observer, fixed stars from equatorial coordinates and solar system bodies computed locally.
+        :param names: Lowercase object names, solar system bodies among them are recomputed.
+        :param ra: Right ascension of every object in radians.
+        :param dec: Declination of every object in radians.
+        :param magnitude: Apparent magnitude of every object, unknown when None.
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        stars = np.array([name not in BODIES for name in names], dtype=bool)
+        self.star_names = [name for name, star in zip(names, stars) if star]
+        # in the order compute returns the objects in
+        self.names = np.array(self.star_names + BODIES, dtype=str)
+        self.star_ra = np.asarray(ra, dtype=np.float64)[stars]
+        self.star_dec = np.asarray(dec, dtype=np.float64)[stars]
+        if magnitude is None:
+            star_magnitude = np.full(len(self.star_names), np.nan)
+        else:
+            star_magnitude = np.asarray(magnitude, dtype=np.float64)[stars]
+        # in the order compute returns the objects in
+        self.magnitude = np.concatenate([star_magnitude, [BODY_MAGNITUDES[name] for name in BODIES]])
+
+    def compute(self, time):
+        """
+        Positions of every object at the given time.
+        :return: Tuple of (names, dec, gha, hc, zn), angles as arrays in radians.
+        """
+        days = days_since_j2000(time)
+        body_names, body_ra, body_dec = body_positions(days)
+        ra = np.concatenate([self.star_ra, body_ra])
+        dec = np.concatenate([self.star_dec, body_dec])
+        gha, hc, zn = equatorial_to_horizontal(ra, dec, self.latitude, self.longitude, days)
+        return self.star_names + body_names, dec, gha, hc, zn
@@ -0,0 +1,95 @@
+import asyncio
+import math
+import time
+
+
+class FrameScheduler:
+    def __init__(self, period, idle_period=1.0, active_time=2.0, report_interval=10.0):
+        """
+        Fixed-deadline frame pacing that drops to a keep-alive rate while nothing happens.
+        :param period: Frame period in seconds while active.
+        :param idle_period: Frame period in seconds while the scene is static.
+        :param active_time: Seconds the full rate is held after the last activity.
+        :param report_interval: Seconds between missed deadline reports.
+        """
+        self.period = period
+        self.idle_period = max(idle_period, period)
+        self.active_time = active_time
+        self.report_interval = report_interval
+        self.loop = None
+        self.wake = None
+        self.wake_pending = False
+        self.last_activity = -math.inf
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.reported_missed_deadlines = 0
+        self.max_lateness = 0.0
+
+    def notify(self):
+        """
+        Mark the scene as changing, safe to call from any thread.
+        """
+        self.last_activity = time.monotonic()
+        # one wake-up per frame is enough, a command burst must not flood the loop's self-pipe
+        if self.loop is not None and not self.wake_pending:
+            self.wake_pending = True
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    def is_active(self):
+        return time.monotonic() - self.last_activity < self.active_time
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "missed_deadlines": self.missed_deadlines,
+            "max_lateness": self.max_lateness,
+            "active": self.is_active(),
+        }
+
+    def report(self):
+        if self.missed_deadlines == self.reported_missed_deadlines:
+            return
+        print(f"frame scheduler: {self.missed_deadlines - self.reported_missed_deadlines} missed deadlines "
+              f"in the last {self.report_interval:.0f}s, max lateness {self.max_lateness * 1000:.1f} ms")
+        self.reported_missed_deadlines = self.missed_deadlines
+        self.max_lateness = 0.0
+
+    async def run(self, tick):
+        """
+        Call tick once per frame forever, tick returns True when it produced a new image.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        deadline = self.loop.time()
+        next_report = deadline + self.report_interval
+        while True:
+            self.wake_pending = False
+            if tick():
+                self.last_activity = time.monotonic()
+            self.frames += 1
+
+            active = self.is_active()
+            period = self.period if active else self.idle_period
+            deadline += period
+            now = self.loop.time()
+            if now > deadline:
+                # skip the frames we are late for and stay on the original deadline grid
+                missed = int((now - deadline) // period) + 1
+                self.missed_deadlines += missed
+                self.max_lateness = max(self.max_lateness, now - deadline)
+                deadline += missed * period
+
+            if now >= next_report:
+                self.report()
+                next_report = now + self.report_interval
+
+            if active:
+                await asyncio.sleep(deadline - now)
+                continue
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), deadline - now)
+            except asyncio.TimeoutError:
+                continue
+            # woken up by a command, render right away and restart the grid from here
+            deadline = self.loop.time()
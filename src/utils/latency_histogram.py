@@ -0,0 +1,53 @@
+import bisect
+import math
+import threading
+
+
+class LatencyHistogram:
+    def __init__(self, lowest=1e-5, highest=10.0, buckets_per_decade=10):
+        """
+        Log-bucketed histogram, constant memory and O(log buckets) per sample.
+        :param lowest: Upper bound of the first bucket in seconds.
+        :param highest: Upper bound of the last bounded bucket in seconds, larger samples land in an overflow bucket.
+        :param buckets_per_decade: Resolution, the relative error of a percentile is about 10 ** (1 / buckets_per_decade).
+        """
+        decades = math.log10(highest / lowest)
+        self.bounds = [lowest * 10 ** (i / buckets_per_decade) for i in range(int(round(decades * buckets_per_decade)) + 1)]
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # render threads record while the event loop resets
+        self.lock = threading.Lock()
+
+    def record(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """
+        :param q: Percentile in [0, 100].
+        :return: Upper bound of the bucket holding the percentile, 0 without samples.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * len(self.counts)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
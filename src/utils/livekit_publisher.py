@@ -1,7 +1,8 @@
 import asyncio
 import numpy as np
-from livekit import api, rtc
+from livekit import rtc
 import time
+from src.render.frame_pool import frame_memoryview
 
 class Resolution:
     def __init__(self, width, height):
@@ -14,7 +15,8 @@ class LiveKitPublisher:
         self.url = url
         self.token = token
         self.room = rtc.Room(loop=self.loop)
-        self.source = None
+        # video source per simulcast layer, None for the full resolution
+        self.sources = {}
 
     async def connect(self):
         try:
@@ -26,19 +28,34 @@ class LiveKitPublisher:
             print("failed to connect to the room: %s", e)
             return False
 
-    async def start_streaming(self, resolution : Resolution):
-        self.source = rtc.VideoSource(resolution.width, resolution.height)
-        track = rtc.LocalVideoTrack.create_video_track("telescope", self.source)
+    async def start_streaming(self, resolution : Resolution, layers=()):
+        """
+        :param layers: (name, Resolution) of lower simulcast layers, each rendered natively and published as its own
+            track, so the encoder does not downscale the full resolution for them.
+        """
+        simulcast = len(layers) == 0
+        self.sources[None] = await self.publish_track("telescope", resolution, simulcast)
+        for name, layer_resolution in layers:
+            self.sources[name] = await self.publish_track(f"telescope-{name}", layer_resolution, simulcast)
+
+    async def publish_track(self, name, resolution : Resolution, simulcast):
+        source = rtc.VideoSource(resolution.width, resolution.height)
+        track = rtc.LocalVideoTrack.create_video_track(name, source)
         options = rtc.TrackPublishOptions()
         options.source = rtc.TrackSource.SOURCE_CAMERA
         options.video_codec = rtc.VideoCodec.VP8
+        options.simulcast = simulcast
         publication = await self.room.local_participant.publish_track(track, options)
         print("published track %s", publication.sid)
+        return source
 
-    def feed_frame(self, frame: rtc.VideoFrame):
-        if self.source is None:
+    def feed_frame(self, frame: np.ndarray, layer=None):
+        source = self.sources.get(layer)
+        if source is None:
             return
-        self.source.capture_frame(frame, timestamp_us=time.time_ns() // 1000)
+        height, width = frame.shape[:2]
+        video_frame = rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, frame_memoryview(frame))
+        source.capture_frame(video_frame, timestamp_us=time.time_ns() // 1000)
         
     async def close(self):
         await self.room.disconnect()
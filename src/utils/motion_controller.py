@@ -0,0 +1,126 @@
+import collections
+import time
+
+import numpy as np
+
+
+class MotionController:
+    def __init__(self, telescope, slew_rate=2.0, slew_acceleration=8.0, zoom_rate=4.0, zoom_acceleration=16.0,
+                 report_interval=10.0):
+        """
+        Merges queued move commands once per frame and slews the telescope towards the target
+        with limited speed and acceleration, like a real mount.
+        :param slew_rate: Maximum azimuth/elevation speed in radians per second, 0 moves instantly.
+        :param slew_acceleration: Azimuth/elevation acceleration in radians per second squared.
+        :param zoom_rate: Maximum zoom speed in zoom levels per second, 0 zooms instantly.
+        :param zoom_acceleration: Zoom acceleration in zoom levels per second squared.
+        """
+        self.telescope = telescope
+        self.rates = np.array([slew_rate, slew_rate, zoom_rate], dtype=np.float64)
+        self.accelerations = np.array([slew_acceleration, slew_acceleration, zoom_acceleration], dtype=np.float64)
+        self.remaining = np.zeros(3)
+        self.velocity = np.zeros(3)
+        self.queue = collections.deque()
+        self.waiting = collections.deque()
+        self.latencies = collections.deque(maxlen=1000)
+        self.report_interval = report_interval
+        self.next_report = time.monotonic() + report_interval
+        self.commands = 0
+        self.max_queue_depth = 0
+
+    def enqueue(self, da, de, dz, received=None):
+        """
+        :param received: time.monotonic() the command arrived at, the command to frame latency starts there, now when None.
+        """
+        self.queue.append((da, de, dz, time.monotonic() if received is None else received))
+
+    def is_moving(self):
+        return len(self.queue) > 0 or bool(np.any(self.remaining != 0))
+
+    def step(self, dt):
+        """
+        Advance the motion by dt seconds.
+        :return: Array of (da, de, dz) to apply this frame.
+        """
+        instant = self.rates <= 0
+        step = np.where(instant, self.remaining, 0.0)
+        moving = ~instant & (self.remaining != 0)
+        if np.any(moving):
+            remaining = self.remaining[moving]
+            rates = self.rates[moving]
+            accelerations = self.accelerations[moving]
+            velocity = self.velocity[moving]
+            # fastest speed that still allows stopping exactly at the target
+            target_velocity = np.sign(remaining) * np.minimum(rates, np.sqrt(2 * accelerations * np.abs(remaining)))
+            velocity += np.clip(target_velocity - velocity, -accelerations * dt, accelerations * dt)
+            travel = velocity * dt
+            # a velocity pointing away from the target after a reversal keeps decelerating through zero
+            arrived = (dt > 0) & (np.sign(travel) == np.sign(remaining)) & (np.abs(travel) >= np.abs(remaining))
+            travel = np.where(arrived, remaining, travel)
+            self.velocity[moving] = np.where(arrived, 0.0, velocity)
+            step[moving] = travel
+        self.remaining -= step
+        settled = np.abs(self.remaining) < 1e-9
+        self.remaining[settled] = 0.0
+        self.velocity[settled] = 0.0
+        return step
+
+    def tick(self, dt):
+        """
+        Merge the queued commands and move the telescope once, called once per frame.
+        """
+        depth = len(self.queue)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        received = []
+        for _ in range(depth):
+            da, de, dz, timestamp = self.queue.popleft()
+            self.remaining += (da, de, dz)
+            received.append(timestamp)
+        self.commands += depth
+
+        if np.any(self.remaining != 0):
+            da, de, dz = self.step(dt).tolist()
+            azimuth, elevation = self.telescope.get_orientation()
+            zoom = self.telescope.zoom
+            self.telescope.move(da, de, dz)
+            moved_elevation = self.telescope.get_orientation()[1]
+            # stop pushing an axis that ran into a mount limit
+            if abs(moved_elevation - elevation - de) > 1e-9:
+                self.remaining[1] = self.velocity[1] = 0.0
+            if abs(self.telescope.zoom - zoom - dz) > 1e-9:
+                self.remaining[2] = self.velocity[2] = 0.0
+        if received:
+            self.waiting.append((self.telescope.state_version, received))
+
+    def frame_published(self):
+        """
+        Record command to frame latency for the commands the published frame reflects.
+        """
+        now = time.monotonic()
+        version = self.telescope.rendered_version
+        while self.waiting and self.waiting[0][0] <= version:
+            _, received = self.waiting.popleft()
+            self.latencies.extend(now - timestamp for timestamp in received)
+        if now >= self.next_report:
+            self.report()
+            self.next_report = now + self.report_interval
+
+    def stats(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "commands": self.commands,
+            "queue_depth": len(self.queue),
+            "max_queue_depth": self.max_queue_depth,
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p99": float(np.percentile(latencies, 99)),
+        }
+
+    def report(self):
+        if self.commands == 0:
+            return
+        stats = self.stats()
+        print(f"motion: {stats['commands']} commands, max queue depth {stats['max_queue_depth']}, "
+              f"command to frame p50 {stats['latency_p50'] * 1000:.1f} ms p99 {stats['latency_p99'] * 1000:.1f} ms")
+        self.commands = 0
+        self.max_queue_depth = 0
+        self.latencies.clear()
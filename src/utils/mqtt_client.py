@@ -50,11 +50,10 @@ class MQTTClient:
     def add_subscriber(self, subscriber):
         self.subscribers.append(subscriber)
     
-    def publish(self, topic, payload):
+    def publish(self, topic, payload, qos=0):
         if not self.connected:
             return
-        print(f"Publishing: {topic}, {payload}")
-        self.client.publish(topic, payload)
+        self.client.publish(topic, payload, qos)
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
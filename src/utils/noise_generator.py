@@ -1,70 +1,104 @@
+import math
 import numpy as np
 
 class NoiseGenerator:
-    def __init__(self, stream_width, stream_height, scale=1.0):
+    def __init__(self, stream_width, stream_height, scale=1.0, octaves=1, persistence=0.5, lacunarity=2, seed=None,
+                 tile_width=None, chunk_rows=256):
+        """
+        Perlin noise summed over octaves (fBm), computed a band of rows at a time.
+        :param stream_width: Width of the generated texture.
+        :param stream_height: Height of the generated texture.
+        :param scale: Pixels per lattice cell of the first octave.
+        :param octaves: Number of octaves, each at lacunarity times the frequency of the previous one.
+        :param persistence: Amplitude ratio between consecutive octaves.
+        :param lacunarity: Frequency ratio between consecutive octaves.
+        :param seed: Seed of the gradient lattice, random when None.
+        :param tile_width: Pixels after which the noise repeats horizontally, e.g. the full azimuth circle.
+        :param chunk_rows: Rows computed at once, bounds the temporary memory.
+        """
         self.stream_width = stream_width
         self.stream_height = stream_height
         self.scale = scale if scale > 0 else 1.0
-
-    def generate_perlin_noise(self):
-        # Initialize the noise array
-        noise = np.zeros((self.stream_height, self.stream_width))
-
-        # Determine the frequency and amplitude of the noise
-        frequency = 1 / self.scale
+        self.octaves = max(int(octaves), 1)
+        self.persistence = persistence
+        self.lacunarity = lacunarity
+        self.tile_width = tile_width
+        self.chunk_rows = max(int(chunk_rows), 1)
+        rng = np.random.default_rng(seed)
+        self.lattices = [self._generate_gradients(rng, octave) for octave in range(self.octaves)]
+
+    def _frequencies(self, octave):
+        frequency = self.lacunarity ** octave / self.scale
+        if self.tile_width is None:
+            return frequency, frequency, None
+        # a whole number of cells per tile, so the last column meets the first one
+        cells = max(1, int(round(self.tile_width * frequency)))
+        return cells / self.tile_width, frequency, cells
+
+    def _generate_gradients(self, rng, octave):
+        # one unit gradient per lattice point, the lattice covers the texture at this octave's cell size
+        frequency_x, frequency_y, cells = self._frequencies(octave)
+        columns = cells if cells is not None else int(math.ceil(self.stream_width * frequency_x)) + 2
+        rows = int(math.ceil(self.stream_height * frequency_y)) + 2
+        angles = rng.uniform(0, 2 * math.pi, (rows, columns))
+        return np.cos(angles).astype(np.float32), np.sin(angles).astype(np.float32), frequency_x, frequency_y
+
+    def generate(self, x=0, y=0, width=None, height=None, out=None):
+        """
+        fBm noise of a window of the texture, roughly in [-1, 1]. Windows of one generator line up seamlessly.
+        :param x: First column of the window.
+        :param y: First row of the window.
+        :param out: float32 array of shape (height, width) to write into.
+        """
+        width = self.stream_width - x if width is None else width
+        height = self.stream_height - y if height is None else height
+        if out is None:
+            out = np.empty((height, width), dtype=np.float32)
+        for start in range(0, height, self.chunk_rows):
+            stop = min(start + self.chunk_rows, height)
+            self._fbm(x, y + start, width, stop - start, out[start:stop])
+        return out
+
+    def _fbm(self, x, y, width, height, out):
+        out.fill(0)
         amplitude = 1.0
+        total = 0.0
+        for gradients_x, gradients_y, frequency_x, frequency_y in self.lattices:
+            out += amplitude * self._perlin(gradients_x, gradients_y, frequency_x, frequency_y, x, y, width, height)
+            total += amplitude
+            amplitude *= self.persistence
+        out /= total
+
+    def _perlin(self, gradients_x, gradients_y, frequency_x, frequency_y, x, y, width, height):
+        sx = (x + np.arange(width, dtype=np.float64)) * frequency_x
+        sy = (y + np.arange(height, dtype=np.float64)) * frequency_y
+        x0 = np.floor(sx).astype(np.int64)
+        y0 = np.floor(sy).astype(np.int64)
+        dx = (sx - x0).astype(np.float32)[None, :]
+        dy = (sy - y0).astype(np.float32)[:, None]
+        rows, columns = gradients_x.shape
+        x0, x1 = x0 % columns, (x0 + 1) % columns
+        y0, y1 = y0 % rows, (y0 + 1) % rows
+
+        def dot(ys, xs, ox, oy):
+            return gradients_x[ys][:, xs] * (dx - ox) + gradients_y[ys][:, xs] * (dy - oy)
+
+        u = self._fade(dx)
+        v = self._fade(dy)
+        nx0 = self._lerp(dot(y0, x0, 0, 0), dot(y0, x1, 1, 0), u)
+        nx1 = self._lerp(dot(y1, x0, 0, 1), dot(y1, x1, 1, 1), u)
+        return self._lerp(nx0, nx1, v)
 
-        # Generate gradients
-        gradients = self._generate_gradients()
-
-        # Populate the noise array
-        for y in range(self.stream_height):
-            for x in range(self.stream_width):
-                # Scale coordinates
-                sx = x * frequency
-                sy = y * frequency
-
-                # Get the top-left grid point
-                x0 = int(sx)
-                y0 = int(sy)
-
-                # Get the offsets within the grid cell
-                dx = sx - x0
-                dy = sy - y0
-
-                # Determine gradient vectors for each corner
-                g00 = gradients[y0 % gradients.shape[0], x0 % gradients.shape[1]]
-                g10 = gradients[y0 % gradients.shape[0], (x0 + 1) % gradients.shape[1]]
-                g01 = gradients[(y0 + 1) % gradients.shape[0], x0 % gradients.shape[1]]
-                g11 = gradients[(y0 + 1) % gradients.shape[0], (x0 + 1) % gradients.shape[1]]
-
-                # Compute dot products
-                dot00 = np.dot(g00, [dx, dy])
-                dot10 = np.dot(g10, [dx - 1, dy])
-                dot01 = np.dot(g01, [dx, dy - 1])
-                dot11 = np.dot(g11, [dx - 1, dy - 1])
-
-                # Interpolate between dot products
-                u = self._fade(dx)
-                v = self._fade(dy)
-                nx0 = self._lerp(dot00, dot10, u)
-                nx1 = self._lerp(dot01, dot11, u)
-                nxy = self._lerp(nx0, nx1, v)
-
-                # Assign noise value
-                noise[y, x] = nxy
-
-        # Normalize noise to range [0, 1]
-        noise = (noise - np.min(noise)) / (np.max(noise) - np.min(noise))
-
+    def generate_perlin_noise(self):
+        """
+        :return: Noise of the whole texture normalized to [0, 1].
+        """
+        noise = self.generate()
+        low, high = noise.min(), noise.max()
+        noise -= low
+        noise /= max(high - low, 1e-12)
         return noise
 
-    def _generate_gradients(self):
-        # Randomly generate gradient vectors for a grid
-        gradients = np.random.rand(self.stream_height + 1, self.stream_width + 1, 2) * 2 - 1
-        gradients /= np.linalg.norm(gradients, axis=-1, keepdims=True)
-        return gradients
-
     @staticmethod
     def _fade(t):
         # Smoothstep function for interpolation
@@ -73,4 +107,4 @@ class NoiseGenerator:
     @staticmethod
     def _lerp(a, b, t):
         # Linear interpolation
-        return a + t * (b - a)
\ No newline at end of file
+        return a + t * (b - a)
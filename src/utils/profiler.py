@@ -0,0 +1,187 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from src.utils.latency_histogram import LatencyHistogram
+
+
+class Span:
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.profiler.record(self.stage, time.perf_counter() - self.start)
+
+
+class Profiler:
+    MODES = ("cpu", "memory")
+    # cProfile runs on sys.monitoring from Python 3.12, one profiler sees every thread and no other may be enabled
+    PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+    def __init__(self, sampling=False, output_dir="profiles", max_sample=60.0):
+        """
+        Per-stage latency histograms of the frame pipeline, cheap enough to stay on, and on demand profile samples.
+        :param sampling: Allow sample(), cProfile and tracemalloc slow the process down while they run.
+        :param output_dir: Directory samples are saved to.
+        :param max_sample: Longest sample in seconds.
+        """
+        self.sampling = sampling
+        self.output_dir = output_dir
+        self.max_sample = max_sample
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.sample_mode = None
+        self.sample_label = None
+        self.sample_thread = None
+        self.sample_profiles = None
+        self.sample_memory = None
+
+    def span(self, stage):
+        """
+        Context manager timing one run of a stage.
+        """
+        return Span(self, stage)
+
+    def record(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    def add_counter(self, name, value):
+        """
+        :param name: Metric name without the telescope_ prefix and _total suffix.
+        :param value: Callable returning the current count, called on export.
+        """
+        self.counters[name] = value
+
+    def exposition(self):
+        """
+        :return: All stages and counters in the Prometheus text format.
+        """
+        lines = ["# HELP telescope_stage_seconds Time spent in a frame pipeline stage.",
+                 "# TYPE telescope_stage_seconds histogram"]
+        for stage, histogram in sorted(self.stages.items()):
+            counts = list(histogram.counts)
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, counts):
+                cumulative += count
+                lines.append(f'telescope_stage_seconds_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'telescope_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative + counts[-1]}')
+            lines.append(f'telescope_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.9g}')
+            lines.append(f'telescope_stage_seconds_count{{stage="{stage}"}} {cumulative + counts[-1]}')
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE telescope_{name}_total counter")
+            lines.append(f"telescope_{name}_total {value()}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.exposition())
+        os.replace(temporary, path)
+
+    async def dump_periodically(self, path, period):
+        while True:
+            await asyncio.sleep(period)
+            self.dump(path)
+
+    async def serve(self, port, host="0.0.0.0"):
+        """
+        Serve the exposition on http://host:port/metrics until cancelled.
+        """
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(text=self.exposition(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"metrics on http://{host}:{port}/metrics")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    def sample(self, mode, seconds, label="telescope"):
+        """
+        Profile the whole process for a while and save the result to output_dir, must be called on the event loop.
+        :param mode: "cpu" for cProfile, "memory" for tracemalloc allocations.
+        :param seconds: Sample length, capped at max_sample.
+        :param label: Prefix of the saved file.
+        :return: False when sampling is disabled or a sample is already running.
+        """
+        if not self.sampling:
+            print("profile sample ignored, sampling is disabled")
+            return False
+        if self.sample_mode is not None:
+            print(f"profile sample ignored, a {self.sample_mode} sample is running")
+            return False
+        seconds = min(seconds, self.max_sample)
+        self.sample_mode = mode
+        self.sample_label = label
+        if mode == "cpu":
+            profile = cProfile.Profile()
+            self.sample_thread = threading.get_ident()
+            self.sample_profiles = [profile]
+            profile.enable()
+        else:
+            tracemalloc.start(10)
+            self.sample_memory = tracemalloc.take_snapshot()
+        print(f"sampling {mode} for {seconds:g}s")
+        asyncio.get_running_loop().call_later(seconds, self.finish_sample)
+        return True
+
+    def profiled(self, function, *args):
+        """
+        Call function, under cProfile when a cpu sample is running. Before Python 3.12 cProfile only sees its
+        own thread, so render threads profile each call separately and the sample merges them.
+        """
+        profiles = self.sample_profiles
+        if profiles is None or not self.PER_THREAD_PROFILES or threading.get_ident() == self.sample_thread:
+            # already seen by the sample profiler, a nested one would replace it on this thread
+            return function(*args)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            profiles.append(profile)
+
+    def finish_sample(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.sample_label}-{time.strftime('%Y%m%d-%H%M%S')}")
+        if self.sample_mode == "cpu":
+            profiles = self.sample_profiles
+            self.sample_profiles = None
+            self.sample_thread = None
+            profiles[0].disable()
+            stats = pstats.Stats(*profiles)
+            stats.dump_stats(f"{path}.prof")
+            stats.sort_stats("cumulative").print_stats(20)
+            print(f"cpu profile saved to {path}.prof")
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            snapshot.dump(f"{path}.tracemalloc")
+            for difference in snapshot.compare_to(self.sample_memory, "lineno")[:20]:
+                print(difference)
+            self.sample_memory = None
+            print(f"memory snapshot saved to {path}.tracemalloc")
+        self.sample_mode = None
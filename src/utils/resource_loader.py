@@ -1,24 +1,136 @@
 import cv2
-import matplotlib.pyplot as plt
+import math
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.render.sprite_compositor import Sprite
 
 class ResourceLoader:
-    def __init__(self, size):
-        self.resources = {}
-        self.resources.update({
-            "moon": ("resources/moon.png", 10),
-            "star": ("resources/star.png", 1),
-            "planet": ("resources/planet.png", 0.5)
-        })
+    # zooms are rounded to this many steps per doubling, so a slow zoom reuses cached sprites
+    ZOOM_STEPS_PER_OCTAVE = 8
+    # name -> (path, scaler, zoom exponent), a sprite grows with zoom ** exponent
+    RESOURCES = {
+        "moon": ("resources/moon.png", 10, 1.0),
+        "star": ("resources/star.png", 1, 0.5),
+        "planet": ("resources/planet.png", 0.5, 1.0)
+    }
+
+    def __init__(self, size, max_sprite_size=1024, cache_bytes=64 * 2**20, mips=None, textures=None):
+        """
+        Sprites of the sky objects at every zoom, shared by the telescopes of a process.
+        :param size: Sprite size at zoom 1 before the per resource scaler.
+        :param max_sprite_size: Largest side of a zoomed sprite.
+        :param cache_bytes: Memory bound of the zoomed sprites, least recently used ones are dropped first.
+        :param mips: Mip chains by resource name from a warm start snapshot, the images are decoded when missing.
+        :param textures: Generated textures by key from a warm start snapshot.
+        """
+        self.resources = dict(self.RESOURCES)
+        self.size = size
+        self.max_sprite_size = max_sprite_size
+        self.cache_bytes = cache_bytes
 
         self.images = {}
-        for name, (path, scaler) in self.resources.items():
-            img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-            if img is not None:
-                img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
-                img = cv2.resize(img, (int(size * scaler), int(size * scaler)))
-                self.images[name] = img
-            else:
-                print(f"Error loading image: {path}")
+        self.sprites = {}
+        self.mips = {}
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_lock = threading.Lock()
+        self.textures = dict(textures or {})
+        self.texture_lock = threading.Lock()
+        for name, (path, scaler, _) in self.resources.items():
+            levels = (mips or {}).get(name)
+            if levels is None:
+                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                if img is None:
+                    print(f"Error loading image: {path}")
+                    continue
+                levels = self.mip_chain(cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA))
+            self.mips[name] = levels
+            premultiplied = self.resample(name, int(size * scaler))
+            self.sprites[name] = Sprite.from_premultiplied(premultiplied)
+            self.images[name] = self.unpremultiply(premultiplied)
+
+    @staticmethod
+    def mip_chain(image):
+        """
+        Premultiplied RGBA levels of an image, each half the size of the previous one down to one pixel.
+        """
+        alpha = image[:, :, 3:4].astype(np.uint16)
+        level = np.concatenate([((image[:, :, :3] * alpha + 127) // 255).astype(np.uint8), image[:, :, 3:4]], axis=2)
+        levels = [level]
+        while max(level.shape[:2]) > 1:
+            height, width = level.shape[:2]
+            # filtering premultiplied colour keeps transparent texels from darkening the edges
+            level = cv2.resize(level, (max(width // 2, 1), max(height // 2, 1)), interpolation=cv2.INTER_AREA)
+            levels.append(level)
+        return levels
+
+    @staticmethod
+    def unpremultiply(image):
+        alpha = image[:, :, 3:4].astype(np.uint16)
+        color = (image[:, :, :3].astype(np.uint16) * 255 + alpha // 2) // np.maximum(alpha, 1)
+        color = np.where(alpha > 0, np.minimum(color, 255), 0)
+        return np.concatenate([color.astype(np.uint8), image[:, :, 3:4]], axis=2)
+
+    def resample(self, name, size):
+        """
+        :return: Premultiplied RGBA image of a resource at size x size pixels.
+        """
+        levels = self.mips[name]
+        # the smallest level still at least as large, or the full image when the sprite is larger
+        level = levels[0]
+        for candidate in levels:
+            if max(candidate.shape[:2]) < size:
+                break
+            level = candidate
+        interpolation = cv2.INTER_AREA if max(level.shape[:2]) >= size else cv2.INTER_LINEAR
+        return cv2.resize(level, (size, size), interpolation=interpolation)
+
+    def sprite_size(self, name, zoom, scale=1.0):
+        _, scaler, exponent = self.resources[name]
+        steps = self.ZOOM_STEPS_PER_OCTAVE
+        zoom = 2 ** (round(math.log2(max(zoom, 1)) * steps) / steps)
+        return max(1, min(int(self.size * scaler * zoom ** exponent * scale), max(self.max_sprite_size, int(self.size * scaler))))
 
     def get_image(self, name):
         return self.images[name]
+
+    def get_sprite(self, name, zoom=1, scale=1.0):
+        """
+        :param zoom: Telescope zoom the sprite is drawn at, zoomed sizes are built on first use and cached.
+        :param scale: Size relative to the full resolution stream, lower simulcast layers draw smaller sprites.
+        """
+        key = (name, self.sprite_size(name, zoom, scale))
+        if key[1] == self.sprites[name].width:
+            return self.sprites[name]
+        with self.cache_lock:
+            sprite = self.cache.get(key)
+            if sprite is not None:
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                return sprite
+            self.cache_misses += 1
+        sprite = Sprite.from_premultiplied(self.resample(*key))
+        size = sprite.premultiplied.nbytes + sprite.inverse_alpha.nbytes
+        with self.cache_lock:
+            if key not in self.cache:
+                self.cache[key] = sprite
+                self.cached_bytes += size
+            while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+                _, dropped = self.cache.popitem(last=False)
+                self.cached_bytes -= dropped.premultiplied.nbytes + dropped.inverse_alpha.nbytes
+        return sprite
+
+    def get_texture(self, key, build):
+        """
+        Generated texture shared by every user of this loader, built by the first one asking for it.
+        :param key: Hashable description of the texture, e.g. its kind and size.
+        :param build: Callable returning the texture.
+        """
+        with self.texture_lock:
+            texture = self.textures.get(key)
+            if texture is None:
+                texture = self.textures[key] = build()
+        return texture
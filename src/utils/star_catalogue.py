@@ -0,0 +1,158 @@
+import argparse
+import csv
+import json
+
+import numpy as np
+
+MAGIC = b"TSCAT001"
+ALIGNMENT = 64
+
+# column name -> dtype, every column holds one value per object
+COLUMNS = {
+    "ra": np.float64,
+    "dec": np.float64,
+    "magnitude": np.float32,
+    "kind": np.uint8,
+    "name": "S24",
+}
+
+KIND_STAR = 0
+KIND_PLANET = 1
+KIND_MOON = 2
+
+
+class StarCatalogue:
+    def __init__(self, path):
+        """
+        Open a columnar catalogue file without reading it into memory.
+        :param path: Path written by StarCatalogue.write.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a star catalogue")
+            header_size = int.from_bytes(file.read(4), "little")
+            header = json.loads(file.read(header_size))
+        self.count = header["count"]
+        self.columns = {}
+        for name, (dtype, offset) in header["columns"].items():
+            self.columns[name] = np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset, shape=(self.count,))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def ra(self):
+        return self.columns["ra"]
+
+    @property
+    def dec(self):
+        return self.columns["dec"]
+
+    @property
+    def magnitude(self):
+        return self.columns["magnitude"]
+
+    @property
+    def kind(self):
+        return self.columns["kind"]
+
+    def names(self, indices=None):
+        names = self.columns["name"] if indices is None else self.columns["name"][indices]
+        return [name.decode() for name in names]
+
+    @staticmethod
+    def write(path, ra, dec, magnitude, kind=None, name=None):
+        """
+        Write a catalogue file.
+        :param ra: Right ascension in radians.
+        :param dec: Declination in radians.
+        :param magnitude: Apparent visual magnitude.
+        :param kind: Object kind (KIND_STAR, KIND_PLANET, ...), stars by default.
+        :param name: Object names, empty by default.
+        """
+        count = len(ra)
+        data = {
+            "ra": ra,
+            "dec": dec,
+            "magnitude": magnitude,
+            "kind": np.full(count, KIND_STAR) if kind is None else kind,
+            "name": np.full(count, b"") if name is None else name,
+        }
+        arrays = {column: np.ascontiguousarray(data[column], dtype=dtype) for column, dtype in COLUMNS.items()}
+
+        def header_bytes(offsets):
+            header = {
+                "count": count,
+                "columns": {column: [arrays[column].dtype.str, offsets.get(column, 0)] for column in COLUMNS},
+            }
+            return json.dumps(header).encode()
+
+        # offsets change the header length, so lay out with a padded placeholder first
+        placeholder = header_bytes({column: 10**12 for column in COLUMNS})
+        offset = align(len(MAGIC) + 4 + len(placeholder))
+        offsets = {}
+        for column in COLUMNS:
+            offsets[column] = offset
+            offset = align(offset + arrays[column].nbytes)
+        header = header_bytes(offsets).ljust(len(placeholder))
+
+        with open(path, "wb") as file:
+            file.write(MAGIC)
+            file.write(len(header).to_bytes(4, "little"))
+            file.write(header)
+            for column in COLUMNS:
+                file.seek(offsets[column])
+                file.write(arrays[column].tobytes())
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def first_field(row, candidates):
+    for candidate in candidates:
+        if candidate in row and row[candidate].strip() != "":
+            return row[candidate].strip()
+    return None
+
+
+def convert_csv(csv_path, output_path, ra_hours=False, max_magnitude=None):
+    """
+    Convert a star catalogue CSV (HYG/Hipparcos, Yale BSC exports) into a catalogue file.
+    RA and Dec are read in degrees (RA in hours with ra_hours).
+    :return: Number of stars written.
+    """
+    ra, dec, magnitude, names = [], [], [], []
+    with open(csv_path, newline="") as file:
+        for row in csv.DictReader(file):
+            row_ra = first_field(row, ["ra", "RA", "RAdeg", "ra_deg", "RA_deg"])
+            row_dec = first_field(row, ["dec", "Dec", "DEC", "DEdeg", "dec_deg", "Dec_deg"])
+            row_mag = first_field(row, ["mag", "Vmag", "vmag", "magnitude", "Hpmag"])
+            if row_ra is None or row_dec is None or row_mag is None:
+                continue
+            if max_magnitude is not None and float(row_mag) > max_magnitude:
+                continue
+            ra.append(float(row_ra) * (15 if ra_hours else 1))
+            dec.append(float(row_dec))
+            magnitude.append(float(row_mag))
+            name = first_field(row, ["proper", "name", "Name", "ProperName", "hr", "HR", "hip", "HIP"]) or ""
+            names.append(name.encode()[:24])
+
+    StarCatalogue.write(output_path, np.radians(ra), np.radians(dec), np.array(magnitude), name=np.array(names, dtype="S24"))
+    return len(ra)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a star catalogue CSV into a memory-mapped catalogue file")
+    parser.add_argument("csv_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--ra-hours", action="store_true", help="RA column is in hours (HYG database)")
+    parser.add_argument("--max-magnitude", type=float, default=None)
+    args = parser.parse_args()
+
+    count = convert_csv(args.csv_path, args.output_path, args.ra_hours, args.max_magnitude)
+    print(f"Wrote {count} stars to {args.output_path}")
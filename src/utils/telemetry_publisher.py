@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+
+class TelemetryPublisher:
+    def __init__(self, mqtt, state_period=0.5, metrics_period=5.0, keyframe_interval=20, precision=4):
+        """
+        Periodic state and metrics of every hosted telescope on {tid}/state and {tid}/metrics, QoS 0.
+        Each message carries only the values that changed since the previous one, every keyframe_interval-th is complete.
+        :param mqtt: Connected MQTTClient.
+        :param state_period: Seconds between state messages.
+        :param metrics_period: Seconds between metrics messages.
+        :param keyframe_interval: Messages between complete snapshots, for subscribers that join late.
+        :param precision: Decimals floats are rounded to, so jitter below it does not count as a change.
+        """
+        self.mqtt = mqtt
+        self.state_period = state_period
+        self.metrics_period = metrics_period
+        self.keyframe_interval = keyframe_interval
+        self.precision = precision
+        self.last = {}
+        self.sequence = {}
+        self.messages = 0
+        self.bytes = 0
+
+    def round(self, value):
+        if isinstance(value, float):
+            return round(value, self.precision)
+        if isinstance(value, (list, tuple)):
+            return [self.round(item) for item in value]
+        return value
+
+    def encode(self, tid, kind, snapshot, now):
+        """
+        :return: JSON payload with the changed values, None when nothing changed and no keyframe is due.
+        """
+        key = (tid, kind)
+        snapshot = {name: self.round(value) for name, value in snapshot.items()}
+        sequence = self.sequence.get(key, 0)
+        full = sequence % self.keyframe_interval == 0
+        last = self.last.get(key, {})
+        values = snapshot if full else {name: value for name, value in snapshot.items() if last.get(name) != value}
+        if not values and not full:
+            return None
+        self.last[key] = snapshot
+        self.sequence[key] = sequence + 1
+        return json.dumps({"seq": sequence, "time": round(now, 3), "full": full, "values": values}, separators=(",", ":"))
+
+    def publish(self, sources, kind):
+        """
+        :param sources: Dict of telescope ID to an object with telemetry_state() and telemetry_metrics().
+        :param kind: "state" or "metrics".
+        """
+        now = time.time()
+        for tid, source in sources.items():
+            snapshot = source.telemetry_state() if kind == "state" else source.telemetry_metrics()
+            payload = self.encode(tid, kind, snapshot, now)
+            if payload is None:
+                continue
+            self.mqtt.publish(f"{tid}/{kind}", payload, qos=0)
+            self.messages += 1
+            self.bytes += len(payload)
+        for key in [key for key in self.last if key[0] not in sources]:
+            del self.last[key]
+            del self.sequence[key]
+
+    async def run(self, sources):
+        """
+        Publish until cancelled.
+        :param sources: Callable returning the dict of telescope ID to telemetry source, called every period.
+        """
+        next_metrics = time.monotonic() + self.metrics_period
+        while True:
+            await asyncio.sleep(self.state_period)
+            self.publish(sources(), "state")
+            if time.monotonic() >= next_metrics:
+                self.publish(sources(), "metrics")
+                next_metrics += self.metrics_period
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+
+VERSION = 1
+
+
+class WarmStart:
+    def __init__(self, path):
+        """
+        On-disk snapshot of what a start decodes and builds before its first frame: the sprite mip chains, generated
+        textures and the equatorial coordinates of the sky objects. Loaded at the next start instead of rebuilt.
+        :param path: .npz file of the snapshot.
+        """
+        self.path = path
+        self.mips = {}
+        self.textures = {}
+        self.equatorial = None
+        self.loaded = False
+
+    def load(self, resources):
+        """
+        Read the snapshot, sprites whose image changed since it was written are left out.
+        :param resources: ResourceLoader.resources, name -> (path, ...).
+        :return: False when there is no usable snapshot.
+        """
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != VERSION:
+                    return False
+                for name, (stamp, levels) in meta["sprites"].items():
+                    if name in resources and stamp == self.stamp(resources[name][0]):
+                        self.mips[name] = [data[f"sprite.{name}.{level}"] for level in range(levels)]
+                for index, key in enumerate(meta["textures"]):
+                    self.textures[tuple(key)] = data[f"texture.{index}"]
+                if meta["sky"]:
+                    self.equatorial = ([str(name) for name in data["sky.names"]], data["sky.ra"], data["sky.dec"],
+                                       data["sky.magnitude"])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring warm start snapshot {self.path}: {e}")
+            return False
+        self.loaded = True
+        return True
+
+    @staticmethod
+    def stamp(path):
+        try:
+            status = os.stat(path)
+        except OSError:
+            return None
+        return [status.st_size, status.st_mtime_ns]
+
+    def save(self, resource_loader, celestial_data_loader):
+        arrays = {}
+        sprites = {}
+        for name, levels in resource_loader.mips.items():
+            sprites[name] = (self.stamp(resource_loader.resources[name][0]), len(levels))
+            for level, image in enumerate(levels):
+                arrays[f"sprite.{name}.{level}"] = image
+        with resource_loader.texture_lock:
+            textures = list(resource_loader.textures.items())
+        for index, (_, texture) in enumerate(textures):
+            arrays[f"texture.{index}"] = texture
+        names, ra, dec, magnitude = celestial_data_loader.parse_equatorial()
+        if len(names) > 0:
+            arrays.update({"sky.names": np.array(names, dtype=str), "sky.ra": np.asarray(ra, dtype=np.float64),
+                           "sky.dec": np.asarray(dec, dtype=np.float64),
+                           "sky.magnitude": np.asarray(magnitude, dtype=np.float64)})
+        meta = {"version": VERSION, "sprites": sprites, "textures": [list(key) for key, _ in textures],
+                "sky": len(names) > 0}
+        arrays["meta"] = np.array(json.dumps(meta))
+        # written aside and moved in place, worker processes may save at the same time
+        temporary = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, self.path)
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+from src.utils.api import ApiClient, TelescopeResponse
+from benchmarks.api_client_benchmark import StubTelescopeServer, telescope_data
+
+
+class ApiClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = StubTelescopeServer(latency=0.0)
+        await self.server.start()
+        self.client = ApiClient(self.server.url, timeout=1.0, retries=3, backoff=0.01)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def register(self):
+        response = await self.client.post_telescope(telescope_data(0))
+        self.assertIs(type(response), TelescopeResponse)
+        self.server.requests = 0
+        self.client.retried = 0
+        return response.telescope_id
+
+    async def test_get_is_retried(self):
+        tid = await self.register()
+        self.server.statuses = [503, 502]
+        status, body = await self.client.request("GET", f"/telescopes/{tid}")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["telescope_name"], "bench 0")
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.client.retried, 2)
+
+    async def test_post_is_not_retried_on_500(self):
+        self.server.broken = True
+        response = await self.client.post_telescope(telescope_data(0))
+        self.assertEqual(response["status"], 500)
+        self.assertIn("internal error", response["error"])
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.client.retried, 0)
+
+    async def test_post_is_retried_on_429(self):
+        self.server.statuses = [429]
+        response = await self.client.post_telescope(telescope_data(0))
+        self.assertIs(type(response), TelescopeResponse)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(len(self.server.telescopes), 1)
+
+    async def test_hung_request_gives_up(self):
+        self.client = ApiClient(self.server.url, timeout=0.1, retries=1, backoff=0.01)
+        self.server.hang = 1.0
+        response = await self.client.update_telescope("missing", telescope_data(0))
+        self.assertIsNone(response["status"])
+        self.assertEqual(self.client.retried, 1)
+
+    async def test_heartbeat_updates_every_telescope(self):
+        tids = [await self.register() for _ in range(3)]
+        heartbeat = asyncio.ensure_future(self.client.heartbeat(lambda: {tid: telescope_data(0) for tid in tids}, 0.05))
+        try:
+            for _ in range(100):
+                if min(self.server.updates.get(tid, 0) for tid in tids) >= 2:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            heartbeat.cancel()
+        self.assertGreaterEqual(min(self.server.updates.get(tid, 0) for tid in tids), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import math
+import unittest
+
+import numpy as np
+
+from src.config import Config
+from src.telescopes.telescope_mock import TelescopeMock
+from src.utils.resource_loader import ResourceLoader
+from benchmarks.sky_fixtures import FIXTURE_TIME, SyntheticCelestialDataLoader
+
+AZIMUTH = 0.5
+ELEVATION = 0.6
+# half the size of the widest star splat
+STAR_RADIUS = 8
+
+
+class PointCelestialDataLoader(SyntheticCelestialDataLoader):
+    """
+    Almanac of the given objects, all at one point in the middle of the view.
+    """
+    def __init__(self, coords, names):
+        self.names = names
+        super().__init__(coords)
+
+    def fetch_data(self):
+        self.fetch_time = FIXTURE_TIME
+        self.ephemeris = None
+        almanac = {"dec": 10.0, "gha": math.degrees(AZIMUTH), "hc": math.degrees(ELEVATION), "zn": 180.0,
+                   "magnitude": -1.5}
+        self.raw_data = {"properties": {"data": [{"object": name, "almanac_data": almanac} for name in self.names]}}
+
+
+class TelescopeMockTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.config = Config()
+        cls.config.update(TELESCOPE_STREAM_WIDTH=640, TELESCOPE_STREAM_HEIGHT=360)
+        cls.resource_loader = ResourceLoader(2 * TelescopeMock.STAR_SIZE)
+
+    def render(self, names, **config):
+        """
+        :param names: Objects in catalogue order.
+        :return: Tuple of (telescope, RGB frame, x, y of the objects in the frame).
+        """
+        self.config.update(**config)
+        loader = PointCelestialDataLoader((self.config["LATITUDE"], self.config["LONGITUDE"]), names)
+        telescope = TelescopeMock(self.config, self.resource_loader, loader)
+        telescope.set_orientation(AZIMUTH, ELEVATION)
+        _, xs, ys = telescope.sky.index.query(AZIMUTH, ELEVATION, *telescope.get_fov(), *telescope.get_resolution())
+        return telescope, telescope.get_frame()[..., :3].copy(), int(xs[0]), int(ys[0])
+
+    def assert_star_behind_moon_occluded(self, **config):
+        # listed before the star, the moon is still drawn over it
+        _, both, x, y = self.render(["moon", "star 1"], **config)
+        telescope, star, _, _ = self.render(["star 1"], **config)
+        _, moon, _, _ = self.render(["moon"], **config)
+        expected = star.copy()
+        telescope.compositor.blend(expected, self.resource_loader.get_sprite("moon"), x, y)
+        around = (slice(y - STAR_RADIUS, y + STAR_RADIUS + 1), slice(x - STAR_RADIUS, x + STAR_RADIUS + 1))
+        self.assertFalse(np.array_equal(star[around], moon[around]))
+        np.testing.assert_array_equal(both[around], expected[around])
+
+    def test_star_behind_moon_occluded(self):
+        # an atlas without the splatter bakes both in its own order and pixel grid, the other modes draw them per frame
+        for atlas, psf in [(False, False), (False, True), (True, True)]:
+            with self.subTest(atlas=atlas, psf=psf):
+                self.assert_star_behind_moon_occluded(SKY_ATLAS=atlas, STAR_PSF=psf)
+
+
+if __name__ == "__main__":
+    unittest.main()